@@ -0,0 +1,150 @@
+#
+# Microlog. Copyright (c) 2023 laffra, dcharbon. All rights reserved.
+#
+"""
+Benchmark of drawing and hovering over the flamegraph of the dashboard.
+
+Runs the dashboard code in CPython, with the js.py stub standing in for the
+browser, on synthetic recordings of increasing size. The spatial index is
+compared against the linear scans over all calls that it replaced:
+
+    $ python benchmarks/flamegraph.py --sizes 10000 100000 1000000
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import sys
+import time
+from typing import Any
+from typing import Callable
+from unittest.mock import MagicMock
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+BRANCHING = 4
+DEPTH = 6
+LEAF_DURATION = 0.004
+THREADS = 2
+WIDTH = 1600
+HOVERS = 1000
+LINEAR_HOVERS = 10
+
+
+class Event:
+    """A mousemove event at a screen position."""
+
+    def __init__(self, x: float, y: float) -> None:
+        """Initialize an Event instance."""
+        self.originalEvent = self
+        self.offsetX = x
+        self.offsetY = y
+
+
+def create_calls(size: int) -> list[Any]:
+    """Create a recording with about size calls, as trees of nested calls on a few threads."""
+    from microlog.models import Call  # pylint: disable=import-outside-toplevel
+    from microlog.models import CallSite  # pylint: disable=import-outside-toplevel
+
+    sites = [CallSite("bench.py", depth, f"bench.function_{depth}") for depth in range(DEPTH)]
+    tree_size = sum(BRANCHING ** depth for depth in range(DEPTH))
+    durations = [LEAF_DURATION * BRANCHING ** (DEPTH - 1 - depth) for depth in range(DEPTH)]
+    calls = []
+
+    def add(thread_id: int, when: float, depth: int) -> None:
+        calls.append(Call(when, thread_id, sites[depth], sites[depth - 1], depth, durations[depth]))
+        if depth + 1 < DEPTH:
+            for child in range(BRANCHING):
+                add(thread_id, when + child * durations[depth + 1], depth + 1)
+
+    for tree in range(max(1, size // tree_size)):
+        thread_id = tree % THREADS
+        add(thread_id, (tree // THREADS) * durations[0], 0)
+    return calls
+
+
+def measure(function: Callable[[], Any], repeat: int = 3) -> float:
+    """Return the best time of a few runs of a function, in milliseconds."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def main() -> None:
+    """Run the benchmark and print a table of timings in milliseconds."""
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n", 1)[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    args = parser.parse_args()
+
+    sys.path[:0] = [ROOT, os.path.join(ROOT, "src")]
+    sys.modules["ltk"] = MagicMock()
+
+    # pylint: disable=import-outside-toplevel
+    from microlog.dashboard import config
+    from microlog.dashboard.flamegraph import Flamegraph
+    from microlog.dashboard.views.call import CallView
+    from microlog.models import recording
+
+    def get_onscreen_calls() -> list[int]:
+        canvas = flamegraph.flame_canvas
+        table = CallView.table
+        pixels_per_second = config.PIXELS_PER_SECOND * canvas.scale_x
+        return [
+            index
+            for index in range(len(table))
+            if table.duration[index] * pixels_per_second >= 2
+            and (table.when[index] + table.duration[index]) * pixels_per_second + canvas.offset_x >= 0
+            and table.when[index] * pixels_per_second + canvas.offset_x <= canvas.width()
+        ]
+
+    def draw_linear() -> None:
+        CallView.draw_all(flamegraph.flame_canvas, get_onscreen_calls())
+
+    def hover_linear(events: list[Event]) -> None:
+        canvas = flamegraph.flame_canvas
+        for event in events:
+            x, y, _, _ = canvas.absolute(event.offsetX, event.offsetY)
+            for index in get_onscreen_calls():
+                if CallView.get(index).inside(x, y):
+                    break
+
+    def hover_indexed(events: list[Event]) -> None:
+        for event in events:
+            flamegraph.flame_mousemove(event)
+
+    print(f"{'calls':>9} {'view':>8} {'build':>9} {'draw':>9} {'draw (linear)':>14} "
+          f"{'hover':>9} {'hover (linear)':>15}")
+    for size in args.sizes:
+        flamegraph = Flamegraph("#flame", "#timeline")
+        flamegraph.flame_canvas.canvas.attr.return_value = WIDTH
+        flamegraph.hover_view = lambda view, x, y: None
+        recording.calls = create_calls(size)
+        CallView.reset()
+        CallView.show_threads = {0, 1}
+        build = measure(flamegraph.convert_log, 1)
+        duration = max(call.when + call.duration for call in recording.calls)
+        for view, seconds in [("all", duration), ("1s", 1.0)]:
+            canvas = flamegraph.flame_canvas
+            canvas.scale_x = WIDTH / (seconds * config.PIXELS_PER_SECOND)
+            canvas.offset_x = -duration / 2 * config.PIXELS_PER_SECOND * canvas.scale_x
+            canvas.offset_y = 0
+            canvas.scale_y = 1
+            events = [
+                Event(n * WIDTH / HOVERS, (n % DEPTH) * config.LINE_HEIGHT + 1)
+                for n in range(HOVERS)
+            ]
+            linear_events = events[:LINEAR_HOVERS]
+            print(
+                f"{len(recording.calls):9,d} {view:>8} {build:9.1f} "
+                f"{measure(flamegraph.draw_flame):9.1f} {measure(draw_linear, 1):14.1f} "
+                f"{measure(lambda: hover_indexed(events)) / HOVERS:9.3f} "
+                f"{measure(lambda: hover_linear(linear_events), 1) / len(linear_events):15.3f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
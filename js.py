@@ -311,25 +311,27 @@ def object() -> Dict[str, Any]:
 
 
 def optimizedDrawPolygon(
-    context: Any, color: str, lineWidth: float, coordinates: str
+    context: Any, color: str, lineWidth: float, coordinates: Any
 ) -> Any:
     """Mock implementation of optimizedDrawPolygon function."""
     return None
 
 
-def optimizedFillRects(context: Any, coordinates: str) -> Any:
+def optimizedFillRects(context: Any, coordinates: Any, colors: Any, palette: Any) -> Any:
     """Mock implementation of optimizedFillRects function."""
     return None
 
 
 def optimizedDrawLines(
-    context: Any, lineWidth: float, color: str, coordinates: str
+    context: Any, lineWidth: float, color: str, coordinates: Any
 ) -> Any:
     """Mock implementation of optimizedDrawLines function."""
     return None
 
 
-def optimizedDrawTexts(context: Any, coordinates: str) -> Any:
+def optimizedDrawTexts(
+    context: Any, coordinates: Any, colors: Any, palette: Any, labels: str
+) -> Any:
     """Mock implementation of optimizedDrawTexts function."""
     return None
 
@@ -374,6 +376,27 @@ class MockNavigator:
         self.clipboard = MockClipboard()
 
 
+class MockEventSource:
+    """Mock implementation of the EventSource functionality."""
+
+    def __init__(self, url: str) -> None:
+        self.url = url
+        self.onmessage: Any = None
+
+    @classmethod
+    def new(cls, url: str) -> "MockEventSource":
+        """Mock implementation of new EventSource(url)."""
+        return cls(url)
+
+    def addEventListener(self, event: str, handler: Any) -> None:
+        """Mock implementation of EventSource.addEventListener()."""
+
+    def close(self) -> None:
+        """Mock implementation of EventSource.close()."""
+
+
+EventSource = MockEventSource
+
 # Global mock objects
 jQuery = MockJQuery()
 localStorage = MockLocalStorage()
@@ -31,6 +31,16 @@ class MockFFI:
         """
         return func
 
+    @staticmethod
+    def to_js(value: Any) -> Any:
+        """
+        Mock implementation of pyodide.ffi.to_js().
+
+        In PyOdide, to_js converts Python lists and dicts into JavaScript
+        arrays and objects. For testing/development, we return the value.
+        """
+        return value
+
 
 # Create the ffi mock object
 ffi = MockFFI()
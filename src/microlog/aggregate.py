@@ -0,0 +1,309 @@
+#
+# Microlog. Copyright (c) 2023 laffra, dcharbon. All rights reserved.
+#
+"""
+Aggregate statistics for recordings.
+
+Used by the server to answer aggregate queries without sending full
+recordings, and usable headless from Python:
+
+    from microlog import aggregate
+    summary = aggregate.get_summary("my-app/2025_01_01_12_00_00")
+    print(summary.top_self(10))
+"""
+
+from __future__ import annotations
+
+from collections import OrderedDict
+from collections import defaultdict
+import hashlib
+import json
+import logging
+import os
+import threading
+from typing import Any
+from typing import Iterable
+from typing import Iterator
+
+from microlog import config
+from microlog import metrics
+from microlog.models import Call
+from microlog.models import Recording
+
+
+SUMMARY_VERSION: int = 1
+SUMMARY_CACHE_SIZE: int = 256
+SLOW_IMPORT_DURATION: float = 0.1
+
+KIND_NAMES: dict[int, str] = {
+    config.EVENT_KIND_INFO: "info",
+    config.EVENT_KIND_WARN: "warn",
+    config.EVENT_KIND_DEBUG: "debug",
+    config.EVENT_KIND_ERROR: "error",
+    logging.DEBUG: "debug",
+    logging.INFO: "info",
+    logging.WARNING: "warn",
+    logging.ERROR: "error",
+    logging.CRITICAL: "critical",
+}
+
+
+def walk(calls: Iterable[Call]) -> Iterator[tuple[Call, list[Call]]]:
+    """
+    Yield each call together with the stack of calls it is nested in.
+
+    Calls are visited per thread in time order, parents before children.
+    The yielded stack is reused between iterations; copy it to keep it.
+    """
+    threads: dict[int, list[Call]] = defaultdict(list)
+    for call in calls:
+        threads[call.thread_id].append(call)
+    for thread_calls in threads.values():
+        thread_calls.sort(key=lambda call: (call.when, call.depth))
+        stack: list[Call] = []
+        for call in thread_calls:
+            while stack and stack[-1].depth >= call.depth:
+                stack.pop()
+            yield call, stack
+            stack.append(call)
+
+
+def is_slow_import(call: Call) -> bool:
+    """Return True if the call is a nested import that took too long."""
+    return (
+        call.depth > 0
+        and call.duration > SLOW_IMPORT_DURATION
+        and call.call_site.name.endswith("<module>")
+    )
+
+
+class FunctionStats:
+    """Call count, total time and self time of one function in a recording."""
+
+    def __init__(
+        self, name: str, count: int = 0, total: float = 0.0, self_time: float = 0.0
+    ) -> None:
+        """Initialize a FunctionStats instance."""
+        self.name: str = name
+        self.count: int = count
+        self.total: float = total
+        self.self_time: float = self_time
+
+    def to_dict(self) -> dict[str, Any]:
+        """Return a JSON-friendly representation."""
+        return {
+            "name": self.name,
+            "count": self.count,
+            "total": round(self.total, 3),
+            "self": round(max(0.0, self.self_time), 3),
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]) -> "FunctionStats":
+        """Create a FunctionStats from its JSON representation."""
+        return cls(data["name"], data["count"], data["total"], data["self"])
+
+    def __repr__(self) -> str:
+        """Return a string representation of the FunctionStats object."""
+        return f"<FunctionStats {self.name} count={self.count} total={self.total:.3f}>"
+
+
+class Summary:
+    """Aggregated statistics for a single recording."""
+
+    def __init__(self, name: str = "") -> None:
+        """Initialize an empty Summary."""
+        self.name: str = name
+        self.duration: float = 0.0
+        self.call_count: int = 0
+        self.functions: dict[str, FunctionStats] = {}
+        self.threads: dict[int, float] = {}
+        self.slow_imports: list[dict[str, Any]] = []
+        self.markers: dict[str, int] = {}
+
+    def top_total(self, count: int = 20) -> list[FunctionStats]:
+        """Return the functions with the highest total time."""
+        return sorted(self.functions.values(), key=lambda stats: -stats.total)[:count]
+
+    def top_self(self, count: int = 20) -> list[FunctionStats]:
+        """Return the functions with the highest self time."""
+        return sorted(self.functions.values(), key=lambda stats: -stats.self_time)[:count]
+
+    def report(self, top: int = 20) -> dict[str, Any]:
+        """Return the top-N aggregates as a JSON-friendly dict."""
+        return {
+            "name": self.name,
+            "duration": round(self.duration, 3),
+            "calls": self.call_count,
+            "top_total": [stats.to_dict() for stats in self.top_total(top)],
+            "top_self": [stats.to_dict() for stats in self.top_self(top)],
+            "threads": self.threads_to_list(),
+            "slow_imports": self.slow_imports,
+            "markers": self.markers,
+        }
+
+    def threads_to_list(self) -> list[dict[str, Any]]:
+        """Return per-thread busy time and utilization."""
+        return [
+            {
+                "thread": thread_id,
+                "busy": round(busy, 3),
+                "utilization": round(busy / self.duration, 3) if self.duration else 0.0,
+            }
+            for thread_id, busy in sorted(self.threads.items(), key=lambda item: -item[1])
+        ]
+
+    def to_dict(self) -> dict[str, Any]:
+        """Return the complete summary as a JSON-friendly dict."""
+        return {
+            "version": SUMMARY_VERSION,
+            "name": self.name,
+            "duration": self.duration,
+            "calls": self.call_count,
+            "functions": [stats.to_dict() for stats in self.top_total(len(self.functions))],
+            "threads": {str(thread_id): busy for thread_id, busy in self.threads.items()},
+            "slow_imports": self.slow_imports,
+            "markers": self.markers,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]) -> "Summary":
+        """Create a Summary from the output of to_dict."""
+        summary = cls(data["name"])
+        summary.duration = data["duration"]
+        summary.call_count = data["calls"]
+        summary.functions = {
+            stats["name"]: FunctionStats.from_dict(stats) for stats in data["functions"]
+        }
+        summary.threads = {int(thread_id): busy for thread_id, busy in data["threads"].items()}
+        summary.slow_imports = data["slow_imports"]
+        summary.markers = data["markers"]
+        return summary
+
+
+def summarize(recording: Recording, name: str = "") -> Summary:
+    """Compute the aggregates of a recording in a single pass over its calls."""
+    summary = Summary(name)
+    functions = summary.functions
+    threads: dict[int, float] = defaultdict(float)
+    for call, stack in walk(recording.calls):
+        function = call.call_site.name
+        stats = functions.get(function)
+        if stats is None:
+            stats = functions[function] = FunctionStats(function)
+        stats.count += 1
+        stats.self_time += call.duration
+        if all(parent.call_site.name != function for parent in stack):
+            stats.total += call.duration  # do not count recursive calls twice
+        if stack:
+            functions[stack[-1].call_site.name].self_time -= call.duration
+        else:
+            threads[call.thread_id] += call.duration
+        if is_slow_import(call):
+            summary.slow_imports.append({
+                "name": function.replace("..<module>", ""),
+                "when": call.when,
+                "duration": call.duration,
+            })
+        summary.duration = max(summary.duration, call.when + call.duration)
+        summary.call_count += 1
+    summary.threads = dict(threads)
+    markers: dict[str, int] = defaultdict(int)
+    for marker in recording.markers:
+        markers[KIND_NAMES.get(marker.kind, str(marker.kind))] += 1
+        summary.duration = max(summary.duration, marker.when)
+    summary.markers = dict(markers)
+    if recording.statuses:
+        summary.duration = max(summary.duration, recording.statuses[-1].when)
+    return summary
+
+
+def get_recording_path(name: str) -> str:
+    """Get the storage path of a recording."""
+    return os.path.join(config.S3_ROOT, f"{name}.zip")
+
+
+def get_summary_path(name: str) -> str:
+    """Get the storage path of the summary sidecar of a recording."""
+    return os.path.join(config.S3_ROOT, f"{name}.summary.json")
+
+
+def get_etag(name: str) -> str:
+    """
+    Get the HTTP entity tag of a stored recording. It changes whenever the
+    recording is rewritten, for instance when retention downsamples it.
+    """
+    details = config.fs.info(get_recording_path(name))
+    version = details.get("ETag") or details.get("LastModified") or details.get("mtime", "")
+    digest = hashlib.sha1(f"{name}:{details.get('size')}:{version}".encode("utf-8")).hexdigest()
+    return f'"{digest[:16]}"'
+
+
+def read_recording(name: str) -> Recording:
+    """Read and decode a recording from config.fs."""
+    import zstd  # pylint: disable=import-outside-toplevel
+
+    with (
+        metrics.storage_read("recording") as read,
+        config.fs.open(get_recording_path(name), "rb") as fd,
+    ):
+        compressed_bytes = fd.read()
+        read(len(compressed_bytes))
+    recording = Recording()
+    recording.load(zstd.decompress(compressed_bytes)) # pylint: disable=c-extension-no-member
+    return recording
+
+
+_cache: OrderedDict[str, Summary] = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def get_summary(name: str) -> Summary:
+    """
+    Get the summary of a recording, from memory, from its sidecar,
+    or by computing it from the recording and storing the sidecar.
+    """
+    with _cache_lock:
+        metrics.cache_lookup("summary", name in _cache)
+        if name in _cache:
+            _cache.move_to_end(name)
+            return _cache[name]
+    summary = read_summary(name)
+    if summary is None:
+        summary = summarize(read_recording(name), name)
+        write_summary(summary)
+    with _cache_lock:
+        _cache[name] = summary
+        while len(_cache) > SUMMARY_CACHE_SIZE:
+            _cache.popitem(last=False)
+    return summary
+
+
+def read_summary(name: str) -> Summary | None:
+    """Read the summary sidecar of a recording, if it exists and is current."""
+    try:
+        with config.fs.open(get_summary_path(name), "r") as fd:
+            data = json.loads(fd.read())
+    except (FileNotFoundError, ValueError):
+        return None
+    if data.get("version") != SUMMARY_VERSION:
+        return None
+    return Summary.from_dict(data)
+
+
+def write_summary(summary: Summary) -> None:
+    """Store the summary sidecar next to its recording."""
+    try:
+        with config.fs.open(get_summary_path(summary.name), "w") as fd:
+            fd.write(json.dumps(summary.to_dict()))
+    except OSError as e:
+        logging.warning("Microlog: Could not store summary for %s: %s", summary.name, e)
+
+
+def forget(name: str) -> None:
+    """Drop the cached summary of a recording and remove its sidecar."""
+    with _cache_lock:
+        _cache.pop(name, None)
+    path = get_summary_path(name)
+    if config.fs.exists(path):
+        config.fs.rm(path)
@@ -3,6 +3,8 @@
 #
 """Use OpenAI to analyse a recording."""
 
+import hashlib
+import json
 import logging
 import os
 import textwrap
@@ -12,17 +14,29 @@ import traceback
 from langchain_openai import ChatOpenAI
 from pydantic import SecretStr
 
+from microlog import config
+
 
 LLM_MODEL = os.environ.get("MICROLOG_LLM_MODEL", "gpt-4o")
 LLM_BASE_URL = os.environ.get("MICROLOG_LLM_BASE_URL", "https://api.openai.com/v1")
 LLM_API_KEY = os.environ.get("MICROLOG_LLM_API_KEY", os.environ.get("OPENAI_API_KEY", "OPENAI API KEY IS MISSING"))
 
 
-client = ChatOpenAI(
-    model=LLM_MODEL,
-    base_url=LLM_BASE_URL,
-    api_key=SecretStr(LLM_API_KEY),
-)
+ANALYSIS_VERSION = 1
+
+
+def create_client(
+    base_url: str = LLM_BASE_URL, api_key: str = LLM_API_KEY, model: str = LLM_MODEL
+) -> ChatOpenAI:
+    """Create a client for an OpenAI-compatible chat completions endpoint."""
+    return ChatOpenAI(
+        model=model,
+        base_url=base_url,
+        api_key=SecretStr(api_key),
+    )
+
+
+client = create_client()
 
 ERROR_KEY = textwrap.dedent("""
     Could not find an OpenAI key. Run this:
@@ -62,26 +76,87 @@ def get_system_prompt_for_microlog(name: str) -> str:
 def analyse_recording(prompt: str) -> str:
     """Use OpenAI to analyse the high level design of a Python program given its trace."""
     try:
-        start = time.time()
-        name = prompt.split("\n", 1)[0]
-        logging.info("Sending OpenAI prompt for %s", name)
-        response = client.invoke([
-            ("system", get_system_prompt_for_microlog(name)),
-            ("human", prompt)
-        ])
-        duration = int(time.time() - start)
-        logging.info("Received OpenAI response in %s for %s", duration, name)
-        return cleanup(name, str(response.content))
-    except Exception: # pylint: disable=broad-except
-        return textwrap.dedent(f"""{name}
-            # OpenAI Error
-            Could not analyse this code using OpenAI. Here is what happened:\n
-            {traceback.format_exc()}\n
-            # Help
-            {HELP}\n
-            # The prompt used by Microlog was:
-            {prompt}
-        """)
+        return request_analysis(prompt)
+    except Exception as e: # pylint: disable=broad-except
+        return describe_error(prompt, e)
+
+
+def request_analysis(prompt: str, llm: ChatOpenAI | None = None) -> str:
+    """Send the prompt to the LLM and return the analysis, raising on errors."""
+    start = time.time()
+    name = prompt.split("\n", 1)[0]
+    logging.info("Sending OpenAI prompt for %s", name)
+    response = (llm or client).invoke([
+        ("system", get_system_prompt_for_microlog(name)),
+        ("human", prompt)
+    ])
+    duration = int(time.time() - start)
+    logging.info("Received OpenAI response in %s for %s", duration, name)
+    return cleanup(name, str(response.content))
+
+
+def describe_error(prompt: str, _error: Exception) -> str:
+    """Explain why the analysis failed, in the same format as an analysis."""
+    name = prompt.split("\n", 1)[0]
+    return textwrap.dedent(f"""{name}
+        # OpenAI Error
+        Could not analyse this code using OpenAI. Here is what happened:\n
+        {traceback.format_exc()}\n
+        # Help
+        {HELP}\n
+        # The prompt used by Microlog was:
+        {prompt}
+    """)
+
+
+def get_prompt_hash(prompt: str) -> str:
+    """Return a stable hash of a prompt, used to deduplicate analyses."""
+    return hashlib.sha256(prompt.encode("utf-8")).hexdigest()
+
+
+def get_analysis_path(name: str) -> str:
+    """Get the storage path of the analysis sidecar of a recording."""
+    return os.path.join(config.S3_ROOT, f"{name}.analysis.json")
+
+
+def read_analysis(name: str) -> dict[str, str] | None:
+    """Read the analysis sidecar of a recording, if it exists and is current."""
+    try:
+        with config.fs.open(get_analysis_path(name), "r") as fd:
+            data = json.loads(fd.read())
+    except (FileNotFoundError, ValueError):
+        return None
+    if data.get("version") != ANALYSIS_VERSION:
+        return None
+    return data
+
+
+def write_analysis(name: str, prompt_hash: str, analysis: str) -> None:
+    """Store the analysis sidecar next to its recording."""
+    try:
+        with config.fs.open(get_analysis_path(name), "w") as fd:
+            fd.write(json.dumps({
+                "version": ANALYSIS_VERSION,
+                "hash": prompt_hash,
+                "analysis": analysis,
+            }))
+    except OSError as e:
+        logging.warning("Microlog: Could not store analysis for %s: %s", name, e)
+
+
+def analyse_and_store(prompt: str) -> str:
+    """
+    Return the stored analysis when the same prompt was analysed before,
+    otherwise ask the LLM and store its analysis in a sidecar.
+    """
+    name = prompt.split("\n", 1)[0]
+    prompt_hash = get_prompt_hash(prompt)
+    stored = read_analysis(name)
+    if stored and stored["hash"] == prompt_hash:
+        return stored["analysis"]
+    analysis = request_analysis(prompt)
+    write_analysis(name, prompt_hash, analysis)
+    return analysis
 
 
 def cleanup(name: str, analysis: str) -> str:
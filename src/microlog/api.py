@@ -53,6 +53,7 @@ class _Microlog:
         self.running: bool = False
         self.tracer = None
         self.status = None
+        self.live = None
 
     def is_running(self) -> bool:
         """Check if Microlog is currently running."""
@@ -61,6 +62,7 @@ class _Microlog:
     def start(self, application: str = "") -> None:
         """Start Microlog logging for the application."""
         # delayed import to avoid circular dependency
+        from microlog import stream  # noqa: I001  pylint: disable=import-outside-toplevel
         from microlog import tracer  # noqa: I001  pylint: disable=import-outside-toplevel
 
         if os.environ.get("MICROLOG_DISABLE", "false").lower() == "true":
@@ -82,6 +84,11 @@ class _Microlog:
         self.tracer = tracer.Tracer()
         self.status = tracer.StatusGenerator()
         self.log_environment()
+        if config.LIVE:
+            self.live = stream.LiveStreamer(models.recording, models.recording.get_identifier())
+            models.recording.print_in_block(
+                f"Microlog live: {config.SERVER}#live/{self.live.identifier}"
+            )
         self.running = True
 
     def log_environment(self) -> None:
@@ -116,11 +123,15 @@ class _Microlog:
         self.stop_thread(self.tracer)
         self.stop_thread(self.status)
         self.save_recording()
+        if self.live:
+            self.stop_thread(self.live)
+            self.live = None
 
     def save_recording(self) -> None:
         """Save the current recording to persistent storage."""
         try:
-            models.recording.save()
+            name = self.live.identifier if self.live else ""
+            models.recording.save(name, upload=config.UPLOAD)
         except Exception as e: # pylint: disable=broad-except
             message = f"Microlog: Could not save the current recording: {e}"
             logging.error(message)
@@ -6,6 +6,7 @@
 import os
 from pathlib import Path
 import re
+from typing import Any
 
 
 EVENT_KIND_CALL = 1
@@ -89,11 +90,35 @@ TRACER_STATUS_DELAY = float(os.environ.get("MICROLOG_STATUS_DELAY", 0.1))
 TRACER_MEMORY_DELAY = float(os.environ.get("MICROLOG_MEMORY_DELAY", 1.0))
 TRACER_SAMPLE_DELAY = float(os.environ.get("MICROLOG_SAMPLE_DELAY", 0.05))
 
+UPLOAD = os.environ.get("MICROLOG_UPLOAD", "false").lower() == "true"
+UPLOAD_CHUNK_SIZE = 64 * KB
+UPLOAD_TIMEOUT = 60.0
+
+LIVE = os.environ.get("MICROLOG_LIVE", "false").lower() == "true"
+LIVE_DELAY = float(os.environ.get("MICROLOG_LIVE_DELAY", 1.0))
+LIVE_MAX_DELAY = 30.0
+LIVE_TIMEOUT = 1.0
+LIVE_MAX_BATCH = 5000
+LIVE_MAX_BACKLOG = 50000
+LIVE_HISTORY = 1000
+LIVE_SUBSCRIBER_QUEUE = 100
+CHUNK_CALLS = 20000
+
+SERVER_PROFILE = os.environ.get("MICROLOG_SERVER_PROFILE", "false").lower() == "true"
+SERVER_PROFILE_INTERVAL = float(os.environ.get("MICROLOG_SERVER_PROFILE_INTERVAL", 300))
+SERVER_PROFILE_KEEP = 12
+
+CATALOG_REFRESH_INTERVAL = float(os.environ.get("MICROLOG_CATALOG_REFRESH_INTERVAL", 60))
+CATALOG_SCAN_WORKERS = 16
+
+RETENTION_INTERVAL = float(os.environ.get("MICROLOG_RETENTION_INTERVAL", 6 * 60 * 60))
+
 IGNORE_MODULES = [
     "runpy",
     "threading",
     "microlog",
     "microlog.api",
+    "microlog.stream",
     "microlog.tracer",
     "microlog.__main__",
     "importlib._bootstrap",
@@ -122,9 +147,23 @@ class LocalFileSystem:
         """Open a file."""
         return open(path, mode, encoding="utf-8" if "b" not in mode else None)
 
-    def rm(self, path: str) -> None:
-        """Remove a file."""
-        os.remove(path)
+    def rm(self, path: str | list[str]) -> None:
+        """Remove a file, or a list of files."""
+        for file in [path] if isinstance(path, str) else path:
+            os.remove(file)
+
+    def exists(self, path: str) -> bool:
+        """Check whether a file or directory exists."""
+        return os.path.exists(path)
+
+    def mv(self, path1: str, path2: str) -> None:
+        """Move a file, replacing the destination if it exists."""
+        os.replace(path1, path2)
+
+    def info(self, path: str) -> dict[str, Any]:
+        """Return the size and modification time of a file."""
+        stat = os.stat(path)
+        return {"name": path, "size": stat.st_size, "type": "file", "mtime": stat.st_mtime}
 
 
 local_fs = LocalFileSystem()
@@ -156,12 +195,11 @@ try:
 except Exception as e: # pylint: disable=broad-except
     import sys
     S3_ROOT = os.path.expanduser("~/microlog")
-    SERVER = f"http://localhost:{PORT}/"
+    SERVER = os.environ.get("MICROLOG_SERVER", f"http://localhost:{PORT}/")
     fs = local_fs
 
 fs.makedir(S3_ROOT, exist_ok=True)
 
-
 try:
     if version_match := re.search(
         pattern=r'version = "([^"]+)"',
@@ -0,0 +1,73 @@
+#
+# Microlog. Copyright (c) 2023 laffra, dcharbon. All rights reserved.
+#
+"""
+Cache of the decoded recordings in the Microlog dashboard.
+
+Going back and forth between two recordings is common when comparing a
+good run with a bad one. The dashboard keeps the decoded batches of the
+most recently opened recordings, together with their HTTP entity tag. To
+reopen a recording, it asks the server whether that version is still
+current, see LogServerHandler.is_not_modified, and replays the batches
+without downloading or decoding them again.
+"""
+
+from __future__ import annotations
+
+from collections import OrderedDict
+from typing import Any
+
+Batch = tuple[list[Any], list[Any], list[Any]]
+
+
+class CachedRecording:
+    """The decoded batches of a recording, for one version of that recording."""
+
+    def __init__(self, etag: str, batches: list[Batch], analysis: str) -> None:
+        """Initialize a CachedRecording with batches of calls, markers, and statuses."""
+        self.etag: str = etag
+        self.batches: list[Batch] = batches
+        self.analysis: str = analysis
+        self.size: int = sum(len(calls) + len(markers) + len(statuses) for calls, markers, statuses in batches)
+
+
+class RecordingCache:
+    """The least recently opened recordings are evicted when the cache holds more events than its budget."""
+
+    def __init__(self, budget: int) -> None:
+        """Initialize an empty RecordingCache that holds at most budget calls, markers, and statuses."""
+        self.budget: int = budget
+        self.size: int = 0
+        self.recordings: OrderedDict[str, CachedRecording] = OrderedDict()
+
+    def get(self, name: str) -> CachedRecording | None:
+        """Return the cached recording with a name, marking it as most recently used."""
+        cached = self.recordings.get(name)
+        if cached:
+            self.recordings.move_to_end(name)
+        return cached
+
+    def put(self, name: str, cached: CachedRecording) -> None:
+        """Add a recording, evicting the least recently used ones to stay within budget."""
+        self.forget(name)
+        if cached.size > self.budget:
+            return
+        self.recordings[name] = cached
+        self.size += cached.size
+        while self.size > self.budget:
+            _, evicted = self.recordings.popitem(last=False)
+            self.size -= evicted.size
+
+    def forget(self, name: str) -> None:
+        """Remove a recording, for instance when it was deleted."""
+        cached = self.recordings.pop(name, None)
+        if cached:
+            self.size -= cached.size
+
+    def __contains__(self, name: str) -> bool:
+        """Return True if a recording is cached."""
+        return name in self.recordings
+
+    def __len__(self) -> int:
+        """Return the number of cached recordings."""
+        return len(self.recordings)
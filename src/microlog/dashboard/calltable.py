@@ -0,0 +1,91 @@
+#
+# Microlog. Copyright (c) 2023 laffra, dcharbon. All rights reserved.
+#
+"""
+Columnar store of the calls shown in the flamegraph.
+
+The start, duration, and depth of each call are kept in typed arrays, and
+its function name as a number in a table of names. Colors and search
+indexes are computed once per name, not per call. Drawing and hit testing
+read these columns directly, so the dashboard only creates view objects
+for the calls the user hovers or clicks, see CallView.get.
+"""
+
+from __future__ import annotations
+
+from array import array
+from typing import Any
+from typing import Callable
+from typing import Iterable
+
+
+class CallTable:
+    """The calls of a recording as columns, indexed by their position in the recording."""
+
+    def __init__(
+        self,
+        get_color: Callable[[str], str],
+        get_match_index: Callable[[str], int],
+    ) -> None:
+        """Initialize an empty CallTable. Names are mapped to colors and search indexes once."""
+        self.get_color_of: Callable[[str], str] = get_color
+        self.get_match_index_of: Callable[[str], int] = get_match_index
+        self.models: list[Any] = []
+        self.when: array = array("d")
+        self.duration: array = array("d")
+        self.depth: array = array("I")
+        self.name: array = array("I")
+        self.names: list[str] = []
+        self.name_ids: dict[str, int] = {}
+        self.colors: list[str] = []
+        self.matches: array = array("I")
+
+    def get_name_id(self, name: str) -> int:
+        """Return the number of a function name, adding the name when it is new."""
+        name_id = self.name_ids.get(name)
+        if name_id is None:
+            name_id = self.name_ids[name] = len(self.names)
+            self.names.append(name)
+            self.colors.append(self.get_color_of(name))
+            self.matches.append(self.get_match_index_of(name))
+        return name_id
+
+    def add(self, model: Any) -> int:
+        """Add a call and return its index."""
+        self.models.append(model)
+        self.when.append(model.when)
+        self.duration.append(model.duration)
+        self.depth.append(model.depth)
+        self.name.append(self.get_name_id(model.call_site.name))
+        return len(self.models) - 1
+
+    def add_all(self, models: Iterable[Any]) -> range:
+        """Add many calls and return the range of their indexes."""
+        first = len(self.models)
+        for model in models:
+            self.add(model)
+        return range(first, len(self.models))
+
+    def get_name(self, index: int) -> str:
+        """Return the function name of a call."""
+        return self.names[self.name[index]]
+
+    def get_color(self, index: int) -> str:
+        """Return the color of a call."""
+        return self.colors[self.name[index]]
+
+    def get_match_index(self, index: int) -> int:
+        """Return the index of a call in the search bitmaps, see microlog.dashboard.matcher."""
+        return self.matches[self.name[index]]
+
+    def clear(self) -> None:
+        """Remove all calls."""
+        self.models.clear()
+        del self.when[:], self.duration[:], self.depth[:], self.name[:], self.matches[:]
+        self.names.clear()
+        self.name_ids.clear()
+        self.colors.clear()
+
+    def __len__(self) -> int:
+        """Return the number of calls in the table."""
+        return len(self.models)
@@ -1,12 +1,18 @@
 #
 # Microlog. Copyright (c) 2023 laffra, dcharbon. All rights reserved.
 #
-"""Canvas abstraction for drawing dashboard visualizations."""
+"""
+Canvas abstraction for drawing dashboard visualizations.
+
+Batches of rectangles, lines, texts, and polygons are handed to microlog.js
+as flat arrays of 32-bit floats, in screen coordinates, with colors as
+indexes into a palette. JavaScript reads them in place through the buffer
+protocol, so nothing is serialized or parsed on a redraw.
+"""
 
 from __future__ import annotations
 
-import itertools
-import json
+from array import array
 import math
 import time
 from typing import Any
@@ -16,8 +22,11 @@ from typing import Union
 
 import ltk
 import js
+from pyodide import ffi
 from microlog.dashboard import config
 
+TEXT_SEPARATOR: str = "\0"
+
 
 class Canvas:
     """Canvas abstraction for drawing dashboard visualizations."""
@@ -35,8 +44,12 @@ class Canvas:
         fixed_y: bool = False,
         fixed_scale_x: bool = False,
         fixed_scale_y: bool = False,
+        brush_callback: Callable[[float, float, bool], None] | None = None,
     ) -> None:
-        """Initialize a Canvas instance."""
+        """
+        Initialize a Canvas instance. When a brush_callback is given, dragging
+        with the shift key held selects a range instead of moving the canvas.
+        """
         self.scale_x = config.CANVAS_INITIAL_SCALE / 3
         self.scale_y = config.CANVAS_INITIAL_SCALE
         self.offset_x: float = float(config.CANVAS_INITIAL_OFFSET_X)
@@ -46,6 +59,8 @@ class Canvas:
         self.drag_callback = drag_callback
         self.zoom_callback = zoom_callback
         self.click_callback = click_callback
+        self.brush_callback = brush_callback
+        self.brush_x: float | None = None
 
         self.element_id = element_id
         self.min_offset_x = min_offset_x
@@ -68,6 +83,9 @@ class Canvas:
         self.fixed_y = fixed_y
         self.fixed_scale_x = fixed_scale_x
         self.fixed_scale_y = fixed_scale_y
+        self.palette: list[str] = []
+        self.palette_indexes: dict[str, int] = {}
+        self.js_palette: Any = None
         self.setup_event_handlers()
         self.last_wheel_event = 0
 
@@ -95,6 +113,9 @@ class Canvas:
 
     def mousedown(self, event: Any) -> None:
         """Handle mouse down event."""
+        if self.brush_callback and getattr(event.originalEvent, "shiftKey", None):
+            self.brush_x = event.originalEvent.offsetX
+            return
         self.drag_x = event.originalEvent.pageX
         self.drag_y = event.originalEvent.pageY
         self.mouse_down = True
@@ -106,6 +127,10 @@ class Canvas:
 
     def mousemove(self, event: Any) -> None:
         """Handle mouse move event."""
+        if self.brush_x is not None and self.brush_callback:
+            self.brush_callback(self.brush_x, event.originalEvent.offsetX, False)
+            event.preventDefault()
+            return
         if self.mouse_down:
             self.dragging = True
             dx = 0 if self.fixed_x else event.originalEvent.pageX - self.drag_x
@@ -128,8 +153,12 @@ class Canvas:
             self.drag_callback(dx, dy)
             self.redraw()
 
-    def mouseleave(self, _event: Any) -> None:
-        """Handle mouse leave event."""
+    def mouseleave(self, event: Any) -> None:
+        """Handle mouse leave event. A brush ends at the edge where the mouse left."""
+        if self.brush_x is not None and self.brush_callback:
+            x = min(max(0, event.originalEvent.offsetX), self.width())
+            self.brush_callback(self.brush_x, x, True)
+        self.brush_x = None
         self.drag_x = 0
         self.drag_y = 0
         self.dragging = False
@@ -158,6 +187,10 @@ class Canvas:
 
     def mouseup(self, event: Any) -> None:
         """Handle mouse up event."""
+        if self.brush_x is not None and self.brush_callback:
+            self.brush_callback(self.brush_x, event.originalEvent.offsetX, True)
+            self.brush_x = None
+            return
         if self.is_dragging():
             self.drag_x = 0
             self.drag_y = 0
@@ -333,6 +366,21 @@ class Canvas:
         self.set_fill_style(fill)
         self.context.fill()
 
+    def get_color_index(self, color: str) -> int:
+        """Return the index of a color in the palette, adding it when it is new."""
+        index = self.palette_indexes.get(color)
+        if index is None:
+            index = self.palette_indexes[color] = len(self.palette)
+            self.palette.append(color)
+            self.js_palette = None
+        return index
+
+    def get_js_palette(self) -> Any:
+        """Return the palette as a JavaScript array, converting it only when it changed."""
+        if self.js_palette is None:
+            self.js_palette = ffi.to_js(self.palette)
+        return self.js_palette
+
     def polygon(
         self,
         points: Sequence[tuple[float, float]],
@@ -340,65 +388,56 @@ class Canvas:
         color: str = "black",
     ) -> Any:
         """Draw a polygon on the canvas."""
-        coordinates = itertools.chain(
-            *[
-                (x * self.scale_x + self.offset_x, y * self.scale_y + self.offset_y)
-                for x, y in points
-            ]
-        )
-        return js.optimizedDrawPolygon(
-            self.context, color, line_width, json.dumps(list(coordinates))
-        )
+        scale_x, scale_y = self.scale_x, self.scale_y
+        offset_x, offset_y = self.offset_x, self.offset_y
+        coordinates = array("f")
+        for x, y in points:
+            coordinates.append(x * scale_x + offset_x)
+            coordinates.append(y * scale_y + offset_y)
+        return js.optimizedDrawPolygon(self.context, color, line_width, coordinates)
 
     def fill_rects(self, rects: Any) -> Any:
         """Draw multiple filled rectangles on the canvas."""
-        coordinates = itertools.chain(
-            *[
-                (
-                    math.ceil(x * self.scale_x + self.offset_x),
-                    math.ceil(y * self.scale_y + self.offset_y),
-                    math.ceil(w * self.scale_x),
-                    math.ceil(h * self.scale_y),
-                    color,
-                )
-                for x, y, w, h, color in rects
-            ]
-        )
-        return js.optimizedFillRects(self.context, json.dumps(list(coordinates)))
+        scale_x, scale_y = self.scale_x, self.scale_y
+        offset_x, offset_y = self.offset_x, self.offset_y
+        get_color_index = self.get_color_index
+        coordinates = array("f")
+        colors = array("H")
+        for x, y, w, h, color in rects:
+            coordinates.extend((x * scale_x + offset_x, y * scale_y + offset_y, w * scale_x, h * scale_y))
+            colors.append(get_color_index(color))
+        return js.optimizedFillRects(self.context, coordinates, colors, self.get_js_palette())
 
     def lines(self, lines: Any, width: float, color: str) -> Any:
         """Draw multiple lines on the canvas."""
-        coordinates = itertools.chain(
-            *[
-                (
-                    x1 * self.scale_x + self.offset_x,
-                    y1 * self.scale_y + self.offset_y,
-                    x2 * self.scale_x + self.offset_x,
-                    y2 * self.scale_y + self.offset_y,
-                )
-                for x1, y1, x2, y2 in lines
-            ]
-        )
-        return js.optimizedDrawLines(
-            self.context, width, color, json.dumps(list(coordinates))
-        )
+        scale_x, scale_y = self.scale_x, self.scale_y
+        offset_x, offset_y = self.offset_x, self.offset_y
+        coordinates = array("f")
+        for x1, y1, x2, y2 in lines:
+            coordinates.extend((
+                x1 * scale_x + offset_x,
+                y1 * scale_y + offset_y,
+                x2 * scale_x + offset_x,
+                y2 * scale_y + offset_y,
+            ))
+        return js.optimizedDrawLines(self.context, width, color, coordinates)
 
     def texts(self, texts: Any, font: str) -> Any:
         """Draw multiple texts on the canvas."""
-        coordinates = itertools.chain(
-            *[
-                (
-                    x * self.scale_x + self.offset_x,
-                    y * self.scale_y + self.offset_y,
-                    text,
-                    color,
-                    w * self.scale_x,
-                )
-                for x, y, text, color, w in texts
-            ]
-        )
+        scale_x, scale_y = self.scale_x, self.scale_y
+        offset_x, offset_y = self.offset_x, self.offset_y
+        get_color_index = self.get_color_index
+        coordinates = array("f")
+        colors = array("H")
+        labels = []
+        for x, y, text, color, w in texts:
+            coordinates.extend((x * scale_x + offset_x, y * scale_y + offset_y, w * scale_x))
+            colors.append(get_color_index(color))
+            labels.append(text)
         self.set_font(font)
-        return js.optimizedDrawTexts(self.context, json.dumps(list(coordinates)))
+        return js.optimizedDrawTexts(
+            self.context, coordinates, colors, self.get_js_palette(), TEXT_SEPARATOR.join(labels)
+        )
 
     def rect(
         self,
@@ -25,7 +25,12 @@ TIMELINE_OFFSET_Y: int = STATS_OFFSET_Y + STATS_HEIGHT
 TIMELINE_HEIGHT: int = 40
 FLAME_OFFSET_Y: int = TIMELINE_OFFSET_Y + TIMELINE_HEIGHT + 2
 
+LOG_ROW_HEIGHT: int = 48
+
+RECORDING_CACHE_BUDGET: int = 2_000_000
+
 BACKGROUND_COLOR: str = "#646363"
+BRUSH_COLOR: str = "#4FC3F740"
 
 CALL_HOVER_DIALOG_DELAY: int = 500
 MAX_STATUS_COUNT_FOR_MOVE: int = 1000
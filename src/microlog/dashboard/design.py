@@ -11,7 +11,8 @@ import ltk
 
 import js
 from microlog.dashboard import colors
-from microlog.dashboard.views.call import CallView
+from microlog.dashboard.views.call import get_short_name
+from microlog.models import Call
 
 class Node:
     """A node in the call graph representing a module or class."""
@@ -93,11 +94,11 @@ class Design:
     LEVEL2: int = 50
     LEVEL3: int = 100
 
-    def __init__(self, calls: list[CallView]) -> None:
+    def __init__(self, calls: list[Call]) -> None:
         """Initialize the Design with a list of calls."""
         self.nodes: dict[str, Node] = {}
         self.edges: dict[str, Edge] = {}
-        self.calls: list[CallView] = []
+        self.calls: list[Call] = []
         for call in calls:
             self.add_call(call)
         ltk.schedule(self.draw, "draw design")
@@ -132,12 +133,12 @@ class Design:
             self.edges[key] = Edge()
         return self.edges[key].connect(from_node, to_node, function, duration)
 
-    def add_call(self, call: CallView) -> None:
+    def add_call(self, call: Call) -> None:
         """Add a call to the design and update nodes/edges."""
         self.calls.append(call)
         from_node = self.get_node(call.caller_site.name, call.depth)
         to_node = self.get_node(call.call_site.name, call.depth)
-        function = call.get_short_name()
+        function = get_short_name(call)
         self.get_edge(from_node, to_node, function, call.duration)
 
     def draw(self) -> None:
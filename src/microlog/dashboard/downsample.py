@@ -0,0 +1,101 @@
+#
+# Microlog. Copyright (c) 2023 laffra, dcharbon. All rights reserved.
+#
+"""
+Min/max-preserving downsampling of status samples for the timeline.
+
+Samples are stored as columns: one array of times, and one array per
+field. They are downsampled with M4: the samples are divided into buckets
+of one pixel wide, and each bucket keeps only its first, minimum, maximum,
+and last value. That draws exactly the same line as all samples would, so
+short spikes are never dropped. Each zoom level is computed in a single
+pass over all fields, the first time it is needed, and then cached.
+"""
+
+from __future__ import annotations
+
+from array import array
+import bisect
+import math
+from typing import Any
+
+BASE_WIDTH: float = 0.01  # seconds per bucket at the finest cached level
+
+Series = dict[str, tuple[array, array]]
+
+
+def m4(times: array, columns: dict[str, array], width: float) -> Series:
+    """Downsample columns of samples, sorted by time, into buckets of a given width."""
+    series: Series = {field: (array("d"), array("d")) for field in columns}
+    count = len(times)
+    start = 0
+    while start < count:
+        end = bisect.bisect_left(times, (math.floor(times[start] / width) + 1) * width, start)
+        end = max(end, start + 1)
+        last = end - 1
+        for field, column in columns.items():
+            bucket = column[start:end]
+            lowest = start + bucket.index(min(bucket))
+            highest = start + bucket.index(max(bucket))
+            series_times, series_values = series[field]
+            for index in sorted({start, lowest, highest, last}):
+                series_times.append(times[index])
+                series_values.append(column[index])
+        start = end
+    return series
+
+
+class Downsampler:
+    """Columns of samples, with their M4 downsampling cached per zoom level."""
+
+    def __init__(self, fields: tuple[str, ...], base_width: float = BASE_WIDTH) -> None:
+        """Initialize an empty Downsampler for the given fields of its samples."""
+        self.fields: tuple[str, ...] = fields
+        self.base_width: float = base_width
+        self.times: array = array("d")
+        self.columns: dict[str, array] = {field: array("d") for field in fields}
+        self.levels: dict[int, Series] = {}
+
+    def add(self, when: float, item: Any) -> None:
+        """Add a sample, which must not be older than the samples added before it."""
+        self.times.append(when)
+        for field, column in self.columns.items():
+            column.append(getattr(item, field))
+        self.levels.clear()
+
+    def get_level(self, width: float) -> int | None:
+        """Return the cached level for buckets of a width, or None to use all samples."""
+        if width <= self.base_width:
+            return None
+        return math.ceil(math.log2(width / self.base_width))
+
+    def get_series(self, width: float) -> Series:
+        """Return the downsampled columns for buckets of at least a given width."""
+        level = self.get_level(width)
+        if level is None:
+            return {field: (self.times, column) for field, column in self.columns.items()}
+        if level not in self.levels:
+            self.levels[level] = m4(self.times, self.columns, self.base_width * 2 ** level)
+        return self.levels[level]
+
+    def get(self, start: float, end: float, width: float) -> Series:
+        """
+        Return the downsampled columns between start and end, including one
+        sample on either side, so lines run to the edges of the viewport.
+        """
+        visible: Series = {}
+        for field, (times, values) in self.get_series(width).items():
+            first = max(0, bisect.bisect_left(times, start) - 1)
+            last = bisect.bisect_right(times, end) + 1
+            visible[field] = (times[first:last], values[first:last])
+        return visible
+
+    def clear(self) -> None:
+        """Remove all samples."""
+        self.times = array("d")
+        self.columns = {field: array("d") for field in self.fields}
+        self.levels.clear()
+
+    def __len__(self) -> int:
+        """Return the number of samples."""
+        return len(self.times)
@@ -3,20 +3,30 @@
 from typing import Any
 from typing import Callable
 
+import html
+import itertools
 import ltk
 import js
 import re
 
+from microlog.dashboard import colors
 from microlog.dashboard import config
+from microlog.dashboard import icicle
+from microlog.dashboard import ranges
 from microlog.dashboard import markdown
-from microlog.dashboard.colors import colorize
+from microlog.dashboard import spatial
 from microlog.dashboard.canvas import Canvas
 from microlog.dashboard.dialog import dialog
+from microlog.dashboard.loglist import LogEntry
+from microlog.dashboard.logview import LogView
 from microlog.dashboard.views import timeline
 from microlog.dashboard.views.call import CallView
+from microlog.dashboard.views.call import is_slow_import
 from microlog.dashboard.views.marker import MarkerView
 from microlog.dashboard.views.status import StatusView
 from microlog.models import recording
+from microlog.models import to_gb
+from microlog import tiles
 
 
 class Flamegraph:
@@ -26,10 +36,17 @@ class Flamegraph:
         self.flame_element_id = flame_element_id
         self.timeline = timeline.Timeline()
         self.hover = None
-        self.calls: list[CallView] = []
+        self.call_index: spatial.SpatialIndex = spatial.SpatialIndex()
+        self.pyramid: tiles.Pyramid | None = None
         self.statuses: list[StatusView] = []
         self.markers: list[MarkerView] = []
-        self.stacks: dict[int, str] = {}
+        self.log_view: LogView = LogView("#tabs-log")
+        self.diff_blocks: list[icicle.Block] = []
+        self.stack_frames: list[icicle.Frame] = []
+        self.select_function: Callable[[str], None] | None = None
+        self.brush: tuple[float, float] | None = None
+        self.range_index: ranges.RangeIndex = ranges.RangeIndex()
+        self.indexed_markers: int = 0
         self.timeline_canvas: Canvas = self.create_canvas(
             self.timeline_element_id,
             0,
@@ -39,7 +56,8 @@ class Flamegraph:
             self.zoom_timeline,
             self.timeline_mousemove,
             fixed_y=True,
-            fixed_scale_y=True
+            fixed_scale_y=True,
+            brush=self.brush_timeline,
         )
         self.flame_canvas: Canvas = self.create_canvas(
             self.flame_element_id,
@@ -84,6 +102,7 @@ class Flamegraph:
         mousemove: Callable[[Any], None],
         fixed_y: bool = False,
         fixed_scale_y: bool = False,
+        brush: Callable[[float, float, bool], None] | None = None,
     ) -> Any:
         """Create and configure a Canvas object for drawing."""
         return (
@@ -97,6 +116,7 @@ class Flamegraph:
                 min_offset_y=0,
                 fixed_y=fixed_y,
                 fixed_scale_y=fixed_scale_y,
+                brush_callback=brush,
             )
             .on("mousemove", mousemove)
             .css("position", "absolute")
@@ -142,19 +162,16 @@ class Flamegraph:
         self.draw_markers()
         if self.markers:
             self.timeline.draw(self.timeline_canvas)
+        if self.brush:
+            self.timeline.draw_brush(self.timeline_canvas, *self.brush)
 
     def draw_statuses(self) -> None:
-        """Draw the status views on the timeline canvas."""
-        canvas_scale_x = self.flame_canvas.scale_x
-        canvas_offset_x = self.flame_canvas.offset_x
-        canvas_width = self.flame_canvas.width()
+        """Draw the status series of the viewport, downsampled to one bucket per pixel."""
+        start, end = self.get_visible_range()
+        seconds_per_pixel = 1 / (config.PIXELS_PER_SECOND * self.flame_canvas.scale_x)
         StatusView.draw_all(
             self.timeline_canvas,
-            [
-                view
-                for view in self.sample_statuses()
-                if not view.offscreen(canvas_scale_x, canvas_offset_x, canvas_width)
-            ],
+            StatusView.downsampler.get(start, end, seconds_per_pixel),
         )
 
     def draw_markers(self) -> None:
@@ -179,33 +196,170 @@ class Flamegraph:
     def draw_flame(self, _event: Any | None = None) -> None:
         """Draw the flamegraph on the flame canvas."""
         self.clear(self.flame_canvas)
-        canvas_scale_x = self.flame_canvas.scale_x
-        canvas_offset_x = self.flame_canvas.offset_x
-        canvas_width = self.flame_canvas.width()
-        CallView.draw_all(
-            self.flame_canvas,
+        if self.diff_blocks:
+            return self.draw_diff()
+        if self.stack_frames:
+            return self.draw_stacks()
+        level = self.get_level()
+        if level:
+            start, end = self.get_visible_range()
+            CallView.draw_blocks(self.flame_canvas, level.query(start, end, CallView.show_threads))
+        else:
+            CallView.draw_all(self.flame_canvas, self.get_visible_calls())
+        if self.brush:
+            self.timeline.draw_brush(self.flame_canvas, *self.brush)
+
+    def get_visible_range(self) -> tuple[float, float]:
+        """Return the time range of the viewport, in seconds."""
+        offset_x = self.flame_canvas.offset_x
+        pixels_per_second = config.PIXELS_PER_SECOND * self.flame_canvas.scale_x
+        return -offset_x / pixels_per_second, (self.flame_canvas.width() - offset_x) / pixels_per_second
+
+    def get_visible_calls(self) -> list[int]:
+        """Return the indexes of the calls of the selected threads that intersect the viewport."""
+        start, end = self.get_visible_range()
+        return self.call_index.query(start, end, CallView.show_threads)
+
+    def get_level(self) -> tiles.Level | None:
+        """
+        Return the level of detail to draw at the current zoom, merging calls
+        narrower than CallView.min_width pixels, or None when zoomed in far
+        enough to draw the calls themselves.
+        """
+        if not CallView.table:
+            return None
+        if not self.pyramid:
+            self.pyramid = tiles.Pyramid(recording.calls)
+        seconds_per_pixel = 1 / (config.PIXELS_PER_SECOND * self.flame_canvas.scale_x)
+        level = self.pyramid.get_level(seconds_per_pixel * CallView.min_width)
+        return None if level is self.pyramid.levels[0] else level
+
+    def index_calls(self, indexes: range) -> None:
+        """Add calls of CallView.table to the spatial index used for drawing and hit testing."""
+        models = CallView.table.models
+        self.call_index.add_all(
+            (models[index].thread_id, models[index].depth, models[index].when,
+             models[index].when + models[index].duration, index)
+            for index in indexes
+        )
+
+    def find_call(self, x: float, y: float) -> CallView | None:
+        """Return the call of a selected thread at the given logical position, if any."""
+        for index in self.call_index.find(
+            int(y // config.LINE_HEIGHT), x / config.PIXELS_PER_SECOND, CallView.show_threads
+        ):
+            if self.flame_canvas.to_screen_dimension(
+                CallView.table.duration[index] * config.PIXELS_PER_SECOND
+            ) > CallView.min_width:
+                return CallView.get(index)
+        return None
+
+    def show_diff(self, tree: dict[str, Any]) -> None:
+        """Show a differential flamegraph, see microlog.diff, instead of a recording."""
+        self.diff_blocks = icicle.layout(tree)
+        self.draw()
+
+    def show_stacks(self, frames: list[icicle.Frame], select_function: Callable[[str], None]) -> None:
+        """
+        Show a left-heavy or sandwich flamegraph, see microlog.stacks, instead
+        of a recording. Clicking a function calls select_function with its name.
+        """
+        self.stack_frames = frames
+        self.select_function = select_function
+        self.flame_canvas.offset_y = 0
+        self.draw()
+
+    def get_visible_blocks(self, blocks: list[Any]) -> list[Any]:
+        """Return the diff blocks or stack frames that are wide enough to draw."""
+        min_width = self.flame_canvas.from_screen_dimension(CallView.min_width)
+        return [
+            block
+            for block in blocks
+            if block.w * config.PIXELS_PER_SECOND > min_width
+        ]
+
+    def draw_diff(self) -> None:
+        """Draw the differential flamegraph, red for slower and blue for faster stack paths."""
+        self.draw_blocks(self.diff_blocks, lambda block: icicle.get_color(block.base, block.target))
+
+    def draw_stacks(self) -> None:
+        """Draw the left-heavy or sandwich flamegraph, colored by function like the recording."""
+        self.draw_blocks(self.stack_frames, lambda frame: colors.get_color(frame.name))
+
+    def draw_blocks(self, blocks: list[Any], get_color: Callable[[Any], str]) -> None:
+        """Draw the visible diff blocks or stack frames as an icicle."""
+        blocks = self.get_visible_blocks(blocks)
+        pixels_per_second = config.PIXELS_PER_SECOND
+        line_height = config.LINE_HEIGHT
+        self.flame_canvas.fill_rects(
+            (
+                block.x * pixels_per_second,
+                block.depth * line_height,
+                block.w * pixels_per_second,
+                line_height - 1,
+                get_color(block),
+            )
+            for block in blocks
+        )
+        dx = self.flame_canvas.from_screen_dimension(4)
+        self.flame_canvas.texts(
             [
-                view
-                for view in self.calls
-                if not view.offscreen(canvas_scale_x, canvas_offset_x, canvas_width)
+                (
+                    block.x * pixels_per_second + dx,
+                    block.depth * line_height + line_height - 8,
+                    block.name.rsplit(".", 1)[-1],
+                    "#111",
+                    block.w * pixels_per_second - 2 * dx,
+                )
+                for block in blocks
             ],
+            config.FONT_REGULAR,
         )
 
-    def sample_statuses(self) -> list[Any]:
-        """Sample statuses to reduce the number of views drawn on the timeline."""
-        if not self.statuses:
-            return []
-        statuses = [self.statuses[0]]
-        sample = int(max(1, 1 / self.flame_canvas.scale_x / 4))
-        for n, status in enumerate(self.statuses):
-            if n % sample == 0:
-                statuses.append(status)
-        statuses.append(self.statuses[-1])
-        return statuses
+    def find_block(self, blocks: list[Any], x: float, y: float) -> Any | None:
+        """Return the visible diff block or stack frame at a screen position, if any."""
+        seconds, depth, _, _ = self.flame_canvas.absolute(x, y)
+        seconds /= config.PIXELS_PER_SECOND
+        depth = int(depth // config.LINE_HEIGHT)
+        for block in self.get_visible_blocks(blocks):
+            if block.depth == depth and block.x <= seconds <= block.x + block.w:
+                return block
+        return None
+
+    def click_diff(self, x: float, y: float) -> None:
+        """Show how the time spent at the clicked stack path changed."""
+        block = self.find_block(self.diff_blocks, x, y)
+        if block:
+            dialog.show(self.flame_canvas, x, y, block.describe().replace("\n", "<br>"))
+        else:
+            dialog.hide()
+
+    def click_stacks(self, x: float, y: float) -> None:
+        """Select the clicked function of a left-heavy or sandwich flamegraph."""
+        dialog.hide()
+        frame = self.find_block(self.stack_frames, x, y)
+        if frame and self.select_function:
+            self.select_function(frame.name)
 
     def flame_mousemove(self, event: Any) -> None:
-        """Handle mouse movement over the flame canvas."""
-        self.mousemove_canvas(self.flame_canvas, self.calls, event)
+        """Handle mouse movement over the flame canvas, using the spatial index."""
+        canvas = self.flame_canvas
+        if canvas.is_dragging() or not hasattr(event.originalEvent, "offsetX"):
+            return
+        if self.stack_frames:
+            return self.hover_frame(event.originalEvent.offsetX, event.originalEvent.offsetY)
+        x, y, _, _ = canvas.absolute(event.originalEvent.offsetX, event.originalEvent.offsetY)
+        call = self.find_call(x, y)
+        if call:
+            self.hover_view(call, x, y)
+
+    def hover_frame(self, x: float, y: float) -> None:
+        """Describe the stack frame under the mouse."""
+        frame = self.find_block(self.stack_frames, x, y)
+        if frame:
+            dialog.show(self.flame_canvas, x, y, frame.describe().replace("\n", "<br>"))
+        else:
+            dialog.hide()
 
     def timeline_mousemove(self, event: Any) -> None:
         """Handle mouse movement over the timeline canvas."""
@@ -226,21 +380,107 @@ class Flamegraph:
             if not view.offscreen(
                 canvas_scale_x, canvas_offset_x, canvas_width
             ) and view.inside(x, y):
-                if self.hover is not view:
-                    if self.hover:
-                        self.hover.mouseleave(x, y)
-                    view.mouseenter(x, y)
-                    self.hover = view
-                view.mousemove(x, y)
+                self.hover_view(view, x, y)
+
+    def hover_view(self, view: Any, x: float, y: float) -> None:
+        """Move the hover to a view and forward the mouse movement to it."""
+        if self.hover is not view:
+            if self.hover:
+                self.hover.mouseleave(x, y)
+            view.mouseenter(x, y)
+            self.hover = view
+        view.mousemove(x, y)
 
     def click_flame(self, x: float, y: float) -> None:
         """Handle click events on the flame canvas."""
-        self.click_canvas(self.flame_canvas, self.calls, x, y)
+        if self.diff_blocks:
+            return self.click_diff(x, y)
+        if self.stack_frames:
+            return self.click_stacks(x, y)
+        call = self.find_call(*self.flame_canvas.absolute(x, y)[:2])
+        if call:
+            self.log_view.scroll_to_time(call.when)
+        self.click_canvas(self.flame_canvas, [call] if call else [], x, y)
 
     def click_timeline(self, x: float, y: float) -> None:
-        """Handle click events on the timeline canvas."""
+        """Handle click events on the timeline canvas. A click also removes the brush."""
+        if self.brush:
+            self.brush = None
+            ltk.find(".range-statistics").css("display", "none")
         self.click_canvas(self.timeline_canvas, self.markers, x, y)
 
+    def brush_timeline(self, x1: float, x2: float, done: bool) -> None:
+        """
+        Select the time range between two screen positions on the timeline.
+        The brush is kept in seconds, so it stays in place on both canvases
+        when they are dragged or zoomed. Its statistics are shown when done.
+        """
+        start, _, _, _ = self.timeline_canvas.absolute(min(x1, x2))
+        end, _, _, _ = self.timeline_canvas.absolute(max(x1, x2))
+        pixels_per_second = config.PIXELS_PER_SECOND
+        self.brush = (max(0.0, start / pixels_per_second), end / pixels_per_second)
+        if self.brush[1] <= self.brush[0]:
+            self.brush = None
+        self.draw_timeline()
+        if done:
+            self.draw_flame()
+            if self.brush:
+                self.show_range_statistics(self.get_range_statistics(*self.brush))
+
+    def get_range_statistics(self, start: float, end: float) -> ranges.RangeStatistics:
+        """
+        Return the statistics of a time range. Calls and markers are added to
+        the range index on the first query after they were loaded.
+        """
+        index = self.range_index
+        models = CallView.table.models
+        for model in itertools.islice(models, len(index), None):
+            index.add_call(
+                model.when,
+                model.duration,
+                model.thread_id,
+                model.depth,
+                model.call_site.name,
+                model.caller_site.name if model.depth else None,
+            )
+        for marker in itertools.islice(self.markers, self.indexed_markers, None):
+            index.add_log(marker.when, marker.kind)
+        self.indexed_markers = len(self.markers)
+        return index.get_statistics(start, end, StatusView.sample_index)
+
+    def show_range_statistics(self, statistics: ranges.RangeStatistics) -> None:
+        """Show the statistics of the brushed time range next to the timeline."""
+        def get_rows(items: list[tuple[Any, float]], unit: Callable[[float], str]) -> str:
+            return "".join(
+                f"<tr><td title='{html.escape(str(key))}'>{html.escape(str(key))}</td><td>{unit(value)}</td></tr>"
+                for key, value in items
+            )
+
+        def seconds(value: float) -> str:
+            return f"{value:.3f}s"
+
+        def percentage(value: float) -> str:
+            return f"{value * 100:.0f}%"
+
+        delta = statistics.memory_delta
+        logs = [(MarkerView.names.get(kind, str(kind)), count) for kind, count in statistics.logs.items() if count]
+        ltk.find(".range-statistics").css("display", "block").html(f"""
+            <b>{statistics.start:.3f}s - {statistics.end:.3f}s</b>
+            ({statistics.end - statistics.start:.3f}s)<br>
+            CPU={statistics.cpu:.0f}%,
+            Memory={"+" if delta >= 0 else "-"}{to_gb(abs(int(delta)))}
+            <table>
+                <tr><th>Total time</th><th></th></tr>
+                {get_rows(statistics.total, seconds)}
+                <tr><th>Self time</th><th></th></tr>
+                {get_rows(statistics.self_time, seconds)}
+                <tr><th>Threads busy</th><th></th></tr>
+                {get_rows(list(statistics.threads.items()), percentage)}
+                <tr><th>Logs</th><th></th></tr>
+                {get_rows(logs, str)}
+            </table>
+        """)
+
     def click_canvas(self, canvas: Any, views: list[Any], x: float, y: float) -> bool:
         """Handle click events on a given canvas and its views."""
         x, y, _, _ = canvas.absolute(x, y)
@@ -258,16 +498,30 @@ class Flamegraph:
         self.timeline_canvas.reset()
         self.flame_canvas.reset()
         self.hover = None
+        self.diff_blocks = []
+        self.stack_frames = []
+        self.select_function = None
+        self.brush = None
+        self.range_index.clear()
+        self.indexed_markers = 0
+        ltk.find(".range-statistics").css("display", "none")
+        self.call_index = spatial.SpatialIndex()
+        self.pyramid = None
         CallView.reset()
         StatusView.reset()
         MarkerView.reset()
 
     def convert_log(self) -> None:
         """
-        Convert the current recording into lists of CallView, StatusView, and
-        MarkerView instances.
+        Convert the current recording into the columns of CallView.table and
+        lists of StatusView and MarkerView instances.
         """
-        self.calls = [CallView(self.flame_canvas, model) for model in recording.calls]
+        CallView.reset()
+        self.call_index = spatial.SpatialIndex()
+        self.range_index.clear()
+        self.indexed_markers = 0
+        self.index_calls(CallView.add_all(self.flame_canvas, recording.calls))
+        self.pyramid = tiles.Pyramid(recording.calls)
         self.statuses = [
             StatusView(self.timeline_canvas, model) for model in recording.statuses
         ]
@@ -275,24 +529,54 @@ class Flamegraph:
             MarkerView(self.timeline_canvas, model) for model in recording.markers
         ]
 
-    def add_marker_to_log_tab(
-        self, log_entries: list[tuple[float, str, str]], index: int
-    ) -> None:
-        """Add a marker entry to the log tab if available."""
-        if self.statuses and index < len(self.statuses):
-            log_entries.append(
-                (self.statuses[index].when, str(self.statuses[index]), "")
-            )
+    def append(self, calls: list[Any], markers: list[Any], statuses: list[Any]) -> None:
+        """
+        Append a batch of a live or streamed recording. Only the new calls
+        are drawn on the flame canvas; the timeline is cheap enough to
+        redraw entirely.
+        """
+        recording.calls.extend(calls)
+        recording.markers.extend(markers)
+        recording.statuses.extend(statuses)
+        first_batch = not CallView.table
+        new_calls = CallView.add_all(self.flame_canvas, calls)
+        new_markers = [MarkerView(self.timeline_canvas, model) for model in markers]
+        self.index_calls(new_calls)
+        if self.pyramid and not self.pyramid.extend(calls):
+            self.pyramid = None  # live calls arrive as they end, built again when drawn
+        self.markers.extend(new_markers)
+        self.statuses.extend(StatusView(self.timeline_canvas, model) for model in statuses)
+        if new_markers:
+            self.log_view.add_all([self.get_marker_log_entry(marker) for marker in new_markers])
+        if first_batch:
+            self.draw()
+            return
+        self.draw_timeline()
+        start, end = self.get_visible_range()
+        CallView.draw_all(
+            self.flame_canvas,
+            [
+                index
+                for index, model in zip(new_calls, calls)
+                if model.thread_id in CallView.show_threads
+                and model.when < end and model.when + model.duration > start
+            ],
+            clear=False,
+        )
 
-    def add_message_to_log_tab(
-        self,
-        log_entries: list[tuple[float, str, str]],
-        when: float,
-        message: str,
-        stack: str = "",
-    ) -> None:
-        """Add a custom message entry to the log tab."""
-        log_entries.append((when, message, stack))
+    def add_status_to_log_tab(self, log_entries: list[LogEntry], index: int) -> None:
+        """Add a status entry to the log tab if available."""
+        if self.statuses and index < len(self.statuses):
+            log_entries.append(LogEntry(self.statuses[index].when, str(self.statuses[index])))
+
+    def get_marker_log_entry(self, marker: MarkerView) -> LogEntry:
+        """Return the log tab entry of a marker. Markdown and stack are formatted when shown."""
+        return LogEntry(
+            marker.when,
+            marker.message,
+            convert=self.convert_markdown,
+            get_stack=marker.format_stack,
+        )
 
     def convert_markdown(self, text: str) -> str:
         html = markdown.markdown(text)
@@ -302,9 +586,16 @@ class Flamegraph:
     def load(self) -> None:
         """Load and process the current recording, updating the visualizations and log tab."""
         self.convert_log()
+        self.load_log()
+        self.hover = None
+        js.jQuery(self.flame_element_id).empty()
+        js.jQuery(self.timeline_element_id).empty()
+
+    def load_log(self) -> None:
+        """Fill the log tab with the markers, statuses, and slow imports of the recording."""
         status_index = 0
-        log_entries: list[tuple[float, str, str]] = []
-        self.add_marker_to_log_tab(log_entries, 0)
+        log_entries: list[LogEntry] = []
+        self.add_status_to_log_tab(log_entries, 0)
         for marker in self.markers:
             if self.statuses:
                 while (
@@ -312,81 +603,22 @@ class Flamegraph:
                     and status_index < len(self.statuses) - 1
                 ):
                     status_index += 1
-            log_entries.append(
-                (
-                    marker.when,
-                    self.convert_markdown(marker.message),
-                    marker.format_stack(),
-                )
-            )
-            self.add_marker_to_log_tab(log_entries, status_index)
-        for call in [call for call in self.calls if call.slow_import()]:
-            self.add_message_to_log_tab(
-                log_entries,
+            log_entries.append(self.get_marker_log_entry(marker))
+            self.add_status_to_log_tab(log_entries, status_index)
+        for call in [call for call in recording.calls if is_slow_import(call)]:
+            log_entries.append(LogEntry(
                 call.when,
                 f"😡 Slow import {call.call_site.name.replace('..<module>', '')} " \
                     f"took {call.duration}s",
-            )
-        self.add_log_entries(log_entries)
-        self.add_marker_to_log_tab(log_entries, -1)
-        self.hover = None
-        js.jQuery(self.flame_element_id).empty()
-        js.jQuery(self.timeline_element_id).empty()
-
-    def add_log_entries(self, log_entries: list[tuple[float, str, str]]) -> None:
-        """Add log entries to the log tab in batches to avoid blocking the UI."""
-        js.jQuery("#tabs-log").empty()
-        log_entries.sort(key=lambda entry: entry[0])
-        batch_size = 10
-        total_entries = len(log_entries)
-
-        def process_batch(start_index: int) -> None:
-            end_index = min(start_index + batch_size, total_entries)
-            batch = log_entries[start_index:end_index]
-
-            js.jQuery("#tabs-log").append(*map(lambda entry: self.get_log_entry(*entry), batch))
-            if end_index < total_entries:
-                js.setTimeout(ltk.proxy(lambda: process_batch(end_index)))
-            else:
-                js.jQuery(".log-stack").click(
-                    ltk.proxy(lambda event: self.show_log_stack(event)) # pylint: disable=unnecessary-lambda
-                )
-
-        if log_entries:
-            js.setTimeout(ltk.proxy(lambda: process_batch(0)), 1000)
-        else:
-            js.jQuery("#tabs-log").append("No log entries found")
-
-    def get_log_entry(self, when: float, entry: str, stack: str) -> str:
-        """Format a single log entry as HTML."""
-        stack_index = len(self.stacks)
-        self.stacks[stack_index] = stack or "Missing stack for this log entry"
-        stack_entry = [
-            ltk.Span("Stack")
-                .addClass("log-stack")
-                .attr("index", stack_index),
-            ltk.Div()
-                .addClass("log-stack-toggle")
-                .attr("id", f"log-stack-{stack_index}"),
-        ] if stack else []
-        return (
-            ltk.Div()
-                .addClass("log-entry")
-                .append(
-                    ltk.Span(f"At&nbsp;{when:0.2f}s")
-                        .addClass("log-when"),
-                    *stack_entry,
-                    ltk.Div(ltk.Paragraph(colorize(entry)))
-                        .addClass("log-message")
-                )
-        )
-
-    def show_log_stack(self, event: Any) -> None:
-        """Display the stack trace for a log entry when clicked."""
-        target = js.jQuery(event.target)
-        index = int(target.attr("index") or "0")
-        stack = self.stacks.get(index, "").replace("\n", "<br>")
-        js.jQuery(f"#log-stack-{index}").html(f"<br>{stack}")
+            ))
+        self.add_status_to_log_tab(log_entries, -1)
+        self.log_view.set_entries(log_entries)
+
+    def show_progress(self, fraction: float) -> None:
+        """Show which fraction of a recording has been loaded, hiding the bar when done."""
+        js.jQuery(".loading-progress") \
+            .css("width", f"{fraction * 100:.1f}%") \
+            .css("display", "block" if fraction < 1 else "none")
 
     def loading(self, name: str) -> None:
         """Display a loading message while processing a recording."""
@@ -0,0 +1,102 @@
+#
+# Microlog. Copyright (c) 2023 laffra, dcharbon. All rights reserved.
+#
+"""
+Statistics of similar calls in the Microlog dashboard.
+
+Calls are grouped by their call site and caller site when a recording is
+loaded. Each group keeps its count, total, mean, standard deviation, and
+its calls sorted by duration, so the call popup does not scan the whole
+recording, and anomalies are found with a binary search.
+"""
+
+from __future__ import annotations
+
+import bisect
+import math
+from typing import Any
+from typing import Hashable
+
+ANOMALY_MIN_EXCESS: float = 0.1  # seconds above the mean
+ANOMALY_MIN_RATIO: float = 1.3  # times the mean
+
+
+class Group:
+    """The durations of calls of the same function from the same caller."""
+
+    __slots__ = ("items", "durations", "count", "total", "mean", "stddev", "dirty")
+
+    def __init__(self) -> None:
+        """Initialize an empty Group."""
+        self.items: list[Any] = []
+        self.durations: list[float] = []
+        self.count: int = 0
+        self.total: float = 0.0
+        self.mean: float = 0.0
+        self.stddev: float = 0.0
+        self.dirty: bool = False
+
+    def add(self, item: Any, duration: float) -> None:
+        """Add an item with its duration. Statistics are updated on the next lookup."""
+        self.items.append((duration, item))
+        self.dirty = True
+
+    def update(self) -> None:
+        """Sort the items by duration and compute the statistics."""
+        if not self.dirty:
+            return
+        self.items.sort(key=lambda entry: entry[0])
+        self.durations = [duration for duration, _ in self.items]
+        self.count = len(self.durations)
+        self.total = math.fsum(self.durations)
+        self.mean = self.total / self.count if self.count else 0.0
+        variance = math.fsum((duration - self.mean) ** 2 for duration in self.durations)
+        self.stddev = math.sqrt(variance / self.count) if self.count else 0.0
+        self.dirty = False
+
+    def get_anomaly_threshold(self) -> float:
+        """Return the duration above which a call is an anomaly."""
+        return max(self.mean + ANOMALY_MIN_EXCESS, self.mean * ANOMALY_MIN_RATIO)
+
+    def is_anomaly(self, duration: float) -> bool:
+        """Return True if a call with the given duration is an anomaly in this group."""
+        return duration > self.get_anomaly_threshold()
+
+    def get_anomalies(self) -> list[Any]:
+        """Return the anomalies, slowest first."""
+        first = bisect.bisect_right(self.durations, self.get_anomaly_threshold())
+        return [item for _, item in reversed(self.items[first:])]
+
+    def count_anomalies(self) -> int:
+        """Return the number of anomalies."""
+        return self.count - bisect.bisect_right(self.durations, self.get_anomaly_threshold())
+
+    def get_slowest(self, limit: int | None = None) -> list[Any]:
+        """Return the slowest items, or all of them without a limit, slowest first."""
+        first = 0 if limit is None else max(0, len(self.items) - limit)
+        return [item for _, item in reversed(self.items[first:])]
+
+
+class GroupIndex:
+    """Groups of similar calls, by key."""
+
+    def __init__(self) -> None:
+        """Initialize an empty GroupIndex."""
+        self.groups: dict[Hashable, Group] = {}
+
+    def add(self, key: Hashable, item: Any, duration: float) -> None:
+        """Add an item with its duration to the group of a key."""
+        group = self.groups.get(key)
+        if group is None:
+            group = self.groups[key] = Group()
+        group.add(item, duration)
+
+    def get(self, key: Hashable) -> Group:
+        """Return the up-to-date group of a key, which is empty for unknown keys."""
+        group = self.groups.get(key) or Group()
+        group.update()
+        return group
+
+    def clear(self) -> None:
+        """Forget all groups."""
+        self.groups.clear()
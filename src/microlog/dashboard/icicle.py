@@ -0,0 +1,143 @@
+#
+# Microlog. Copyright (c) 2023 laffra, dcharbon. All rights reserved.
+#
+"""
+Layout of the aggregated flamegraphs in the Microlog dashboard.
+
+The server merges calls by stack path, see microlog.stacks. Differential,
+left-heavy, and sandwich flamegraphs lay out the resulting trees as
+icicles, with the widest children first.
+"""
+
+from __future__ import annotations
+
+from typing import Any
+from typing import Iterator
+
+
+class Block:
+    """A stack path of a differential flamegraph, positioned in seconds and depth."""
+
+    __slots__ = ("x", "depth", "w", "name", "base", "target")
+
+    def __init__(
+        self, x: float, depth: int, w: float, name: str, base: float, target: float
+    ) -> None:
+        """Initialize a Block instance."""
+        self.x: float = x
+        self.depth: int = depth
+        self.w: float = w
+        self.name: str = name
+        self.base: float = base
+        self.target: float = target
+
+    def describe(self) -> str:
+        """Return a description of the change at this stack path."""
+        if self.base:
+            change = f"{(self.target - self.base) / self.base * 100:+.1f}%"
+        else:
+            change = "new"
+        return (
+            f"{self.name}\n"
+            f"base: {self.base:.3f}s\n"
+            f"target: {self.target:.3f}s\n"
+            f"change: {self.target - self.base:+.3f}s ({change})"
+        )
+
+    def __repr__(self) -> str:
+        """Return a string representation of the Block object."""
+        return f"<Block {self.name} @{self.x:.3f}+{self.w:.3f} depth={self.depth}>"
+
+
+class Frame:
+    """A stack path of a left-heavy or sandwich flamegraph, positioned in seconds and depth."""
+
+    __slots__ = ("x", "depth", "w", "name", "count")
+
+    def __init__(self, x: float, depth: int, w: float, name: str, count: int) -> None:
+        """Initialize a Frame instance."""
+        self.x: float = x
+        self.depth: int = depth
+        self.w: float = w
+        self.name: str = name
+        self.count: int = count
+
+    def describe(self) -> str:
+        """Return a description of the calls at this stack path."""
+        return f"{self.name}\ntotal: {self.w:.3f}s\ncalls: {self.count:,}"
+
+    def __repr__(self) -> str:
+        """Return a string representation of the Frame object."""
+        return f"<Frame {self.name} @{self.x:.3f}+{self.w:.3f} depth={self.depth}>"
+
+
+def place(
+    tree: dict[str, Any], width: str, include_root: bool = False
+) -> Iterator[tuple[dict[str, Any], float, int]]:
+    """
+    Yield the nodes of a tree with their start and depth. Children are
+    placed next to each other, widest first, so the heaviest stack paths
+    end up on the left. Nodes without width are left out.
+    """
+    todo: list[tuple[dict[str, Any], float, int]] = [(tree, 0.0, 0 if include_root else -1)]
+    while todo:
+        node, x, depth = todo.pop()
+        if depth >= 0:
+            yield node, x, depth
+        for child in sorted(node["children"], key=lambda child: -child[width]):
+            if child[width] > 0:
+                todo.append((child, x, depth + 1))
+                x += child[width]
+
+
+def layout(tree: dict[str, Any]) -> list[Block]:
+    """
+    Lay out a diff tree as an icicle. Widths are the target times, so the
+    shape is the flamegraph of the target. Stack paths that no longer run
+    in the target are not shown.
+    """
+    blocks = [
+        Block(x, depth, node["target"], node["name"], node["base"], node["target"])
+        for node, x, depth in place(tree, "target")
+    ]
+    blocks.sort(key=lambda block: (block.depth, block.x))
+    return blocks
+
+
+def layout_stacks(tree: dict[str, Any]) -> list[Frame]:
+    """Lay out a stack trie, see microlog.stacks.StackNode.to_dict, as a left-heavy flamegraph."""
+    frames = [
+        Frame(x, depth, node["total"], node["name"], node["count"])
+        for node, x, depth in place(tree, "total")
+    ]
+    frames.sort(key=lambda frame: (frame.depth, frame.x))
+    return frames
+
+
+def layout_sandwich(callers: dict[str, Any], callees: dict[str, Any]) -> list[Frame]:
+    """
+    Lay out a sandwich view, see microlog.stacks.StackTrie.sandwich. The
+    function is in the middle row, with its callers stacked upwards above
+    it and its callees below it.
+    """
+    above = list(place(callers, "total", include_root=True))
+    middle = max((depth for _, _, depth in above), default=0)
+    frames = [
+        Frame(x, middle - depth, node["total"], node["name"], node["count"])
+        for node, x, depth in above
+    ]
+    frames.extend(
+        Frame(x, middle + 1 + depth, node["total"], node["name"], node["count"])
+        for node, x, depth in place(callees, "total")
+    )
+    frames.sort(key=lambda frame: (frame.depth, frame.x))
+    return frames
+
+
+def get_color(base: float, target: float) -> str:
+    """Return red for slower, blue for faster, and white for unchanged stack paths."""
+    change = (target - base) / max(base, target, 1e-9)
+    shade = int(255 * (1 - min(1.0, abs(change))))
+    if change > 0:
+        return f"rgb(255,{shade},{shade})"
+    return f"rgb({shade},{shade},255)"
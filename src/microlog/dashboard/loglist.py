@@ -0,0 +1,135 @@
+#
+# Microlog. Copyright (c) 2023 laffra, dcharbon. All rights reserved.
+#
+"""
+Entries of the log tab in the Microlog dashboard.
+
+The log tab only renders the rows that are scrolled into view, see
+microlog.dashboard.logview. This module keeps the entries sorted by time,
+converts their messages to HTML only when they are first rendered, and
+filters them through an index of the words in their messages.
+"""
+
+from __future__ import annotations
+
+from array import array
+import bisect
+import re
+from typing import Callable
+from typing import Sequence
+
+WORD = re.compile(r"\w+")
+
+
+class LogEntry:
+    """A row of the log tab, with its HTML created on first use."""
+
+    __slots__ = ("when", "message", "convert", "get_stack", "html")
+
+    def __init__(
+        self,
+        when: float,
+        message: str,
+        convert: Callable[[str], str] | None = None,
+        get_stack: Callable[[], str] | None = None,
+    ) -> None:
+        """Initialize a LogEntry. The message is converted to HTML with convert, if given."""
+        self.when: float = when
+        self.message: str = message
+        self.convert: Callable[[str], str] | None = convert
+        self.get_stack: Callable[[], str] | None = get_stack
+        self.html: str | None = None
+
+    def get_html(self) -> str:
+        """Return the HTML of the message, converting it the first time."""
+        if self.html is None:
+            self.html = self.convert(self.message) if self.convert else self.message
+        return self.html
+
+    def __repr__(self) -> str:
+        """Return a string representation of the LogEntry object."""
+        return f"<LogEntry {self.when:.3f} {self.message[:40]!r}>"
+
+
+class LogIndex:
+    """Log entries sorted by time, with an index of the words in their messages."""
+
+    def __init__(self) -> None:
+        """Initialize an empty LogIndex."""
+        self.entries: list[LogEntry] = []
+        self.times: list[float] = []
+        self.words: dict[str, array] | None = None
+        self.filters: dict[str, list[int]] = {}
+
+    def add(self, entry: LogEntry) -> None:
+        """Add an entry, appending in constant time when it is the most recent one."""
+        self.filters.clear()
+        if not self.times or entry.when >= self.times[-1]:
+            self.entries.append(entry)
+            self.times.append(entry.when)
+            if self.words is not None:
+                self.index_words(len(self.entries) - 1)
+            return
+        index = bisect.bisect_right(self.times, entry.when)
+        self.entries.insert(index, entry)
+        self.times.insert(index, entry.when)
+        self.words = None
+
+    def add_all(self, entries: Sequence[LogEntry]) -> None:
+        """Add many entries."""
+        for entry in sorted(entries, key=lambda entry: entry.when):
+            self.add(entry)
+
+    def index_words(self, index: int) -> None:
+        """Add the words of the message of an entry to the word index."""
+        assert self.words is not None
+        for word in set(WORD.findall(self.entries[index].message.lower())):
+            postings = self.words.get(word)
+            if postings is None:
+                postings = self.words[word] = array("I")
+            postings.append(index)
+
+    def get_words(self) -> dict[str, array]:
+        """Return the word index, building it on first use."""
+        if self.words is None:
+            self.words = {}
+            for index in range(len(self.entries)):
+                self.index_words(index)
+        return self.words
+
+    def filter(self, query: str) -> list[int]:
+        """
+        Return the indexes of the entries that contain a word matching each
+        term of the query, where a word matches if it contains the term.
+        """
+        terms = WORD.findall(query.lower())
+        if not terms:
+            return list(range(len(self.entries)))
+        key = " ".join(terms)
+        if key not in self.filters:
+            words = self.get_words()
+            found: set[int] | None = None
+            for term in terms:
+                matches: set[int] = set()
+                for word, postings in words.items():
+                    if term in word:
+                        matches.update(postings)
+                found = matches if found is None else found & matches
+            self.filters[key] = sorted(found or ())
+        return self.filters[key]
+
+    def find(self, rows: Sequence[int], when: float) -> int:
+        """Return the position in rows of the first entry at or after a point in time."""
+        times = self.times
+        return bisect.bisect_left(rows, when, key=lambda index: times[index])
+
+    def clear(self) -> None:
+        """Remove all entries."""
+        self.entries.clear()
+        self.times.clear()
+        self.words = None
+        self.filters.clear()
+
+    def __len__(self) -> int:
+        """Return the number of entries."""
+        return len(self.entries)
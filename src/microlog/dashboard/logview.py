@@ -0,0 +1,156 @@
+#
+# Microlog. Copyright (c) 2023 laffra, dcharbon. All rights reserved.
+#
+"""
+Virtualized log tab of the Microlog dashboard.
+
+Only the rows that are scrolled into view exist in the DOM. Rows have a
+fixed height, so the visible rows follow from the scroll position, and a
+spacer element gives the scrollbar the height of all rows. Messages are
+converted to HTML as their rows are first rendered.
+"""
+
+from __future__ import annotations
+
+import math
+from typing import Any
+from typing import Sequence
+
+import ltk
+
+from microlog.dashboard import config
+from microlog.dashboard.colors import colorize
+from microlog.dashboard.loglist import LogEntry
+from microlog.dashboard.loglist import LogIndex
+
+OVERSCAN_ROWS: int = 10
+
+
+class LogView:
+    """Renders the rows of the log tab that are scrolled into view."""
+
+    def __init__(self, selector: str = "#tabs-log") -> None:
+        """Initialize a LogView. The DOM is created on first use."""
+        self.selector: str = selector
+        self.index: LogIndex = LogIndex()
+        self.rows: list[int] = []
+        self.query: str = ""
+        self.current: int = -1
+        self.pending_row: int | None = None
+        self.container: Any = None
+
+    def setup(self) -> None:
+        """Create the notes, filter, details, and scrolling areas in the container."""
+        self.container = ltk.find(self.selector)
+        self.container.empty().append(
+            ltk.Div().addClass("log-notes"),
+            ltk.Div(
+                ltk.Input("")
+                    .attr("placeholder", "Filter log entries")
+                    .addClass("log-filter")
+                    .on("keyup", ltk.proxy(lambda event: self.set_filter(ltk.find(event.target).val()))),
+                ltk.Div()
+                    .addClass("log-details")
+                    .on("click", ltk.proxy(lambda event: ltk.find(".log-details").empty())),
+            ).addClass("log-header"),
+            ltk.Div(
+                ltk.Div().addClass("log-rows"),
+            ).addClass("log-spacer"),
+        )
+        self.container.on("scroll", ltk.proxy(lambda event: self.render()))
+        self.container.on(
+            "click", ".log-stack", ltk.proxy(lambda event: self.show_stack(ltk.find(event.target)))
+        )
+
+    def set_entries(self, entries: Sequence[LogEntry]) -> None:
+        """Replace all entries, and the notes above them, and scroll to the top."""
+        self.index.clear()
+        if self.container is not None:
+            ltk.find(".log-notes, .log-details").empty()
+        self.index.add_all(entries)
+        self.current = -1
+        self.refresh(scroll_top=0)
+
+    def add_all(self, entries: Sequence[LogEntry]) -> None:
+        """Add entries, such as the markers of a live recording, keeping the scroll position."""
+        self.index.add_all(entries)
+        self.refresh()
+
+    def clear(self) -> None:
+        """Remove all entries."""
+        self.set_entries([])
+
+    def set_filter(self, query: str) -> None:
+        """Show only the entries that match a query, see LogIndex.filter."""
+        if query != self.query:
+            self.query = query
+            self.refresh(scroll_top=0)
+
+    def refresh(self, scroll_top: float | None = None) -> None:
+        """Recompute the visible rows after the entries or the filter changed."""
+        if self.container is None:
+            self.setup()
+        self.rows = self.index.filter(self.query)
+        ltk.find(".log-spacer").css("height", len(self.rows) * config.LOG_ROW_HEIGHT)
+        if scroll_top is not None:
+            self.container.scrollTop(scroll_top)
+        self.render()
+
+    def get_spacer_top(self) -> float:
+        """Return the position of the first row in the scrolling area."""
+        return float(ltk.find(".log-spacer")[0].offsetTop or 0)
+
+    def render(self) -> None:
+        """Render the rows that are scrolled into view, plus a few on either side."""
+        if self.container is None:
+            return
+        if not self.rows:
+            ltk.find(".log-rows").css("top", 0).html(
+                "No log entries found" if not self.index.entries else "No log entries match"
+            )
+            return
+        row_height = config.LOG_ROW_HEIGHT
+        scroll_top = float(self.container.scrollTop() or 0) - self.get_spacer_top()
+        height = float(self.container.height() or 0)
+        first = max(0, math.floor(scroll_top / row_height) - OVERSCAN_ROWS)
+        last = min(len(self.rows), math.ceil((scroll_top + height) / row_height) + OVERSCAN_ROWS)
+        ltk.find(".log-rows").css("top", first * row_height).html(
+            "".join(self.get_row_html(index) for index in self.rows[first:last])
+        )
+
+    def get_row_html(self, index: int) -> str:
+        """Return the HTML of the row of an entry."""
+        entry = self.index.entries[index]
+        stack = f'<span class="log-stack" index="{index}">Stack</span>' if entry.get_stack else ""
+        current = " log-current" if index == self.current else ""
+        return (
+            f'<div class="log-entry{current}" style="height:{config.LOG_ROW_HEIGHT}px">'
+            f'<span class="log-when">At&nbsp;{entry.when:0.2f}s</span>{stack}'
+            f'<div class="log-message">{colorize(entry.get_html())}</div>'
+            "</div>"
+        )
+
+    def show_stack(self, link: Any) -> None:
+        """Show the stack of the entry of a clicked link above the rows."""
+        entry = self.index.entries[int(link.attr("index") or "0")]
+        stack = (entry.get_stack() if entry.get_stack else "").replace("\n", "<br>")
+        ltk.find(".log-details").html(
+            f"At&nbsp;{entry.when:0.2f}s<br>{stack or 'Missing stack for this log entry'}"
+        )
+
+    def scroll_to_time(self, when: float) -> None:
+        """Scroll to the first entry at or after a point in time, and highlight it."""
+        if self.container is None or not self.rows:
+            return
+        row = min(self.index.find(self.rows, when), len(self.rows) - 1)
+        self.current = self.rows[row]
+        self.pending_row = row
+        self.show()
+
+    def show(self) -> None:
+        """Apply a pending scroll when the log tab becomes visible, and render."""
+        if self.pending_row is not None and self.container is not None:
+            self.container.scrollTop(self.get_spacer_top() + self.pending_row * config.LOG_ROW_HEIGHT)
+            if self.container.height():
+                self.pending_row = None
+        self.render()
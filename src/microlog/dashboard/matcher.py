@@ -0,0 +1,88 @@
+#
+# Microlog. Copyright (c) 2023 laffra, dcharbon. All rights reserved.
+#
+"""
+Cached evaluation of span search queries in the Microlog dashboard.
+
+Many calls share the same function, so a query is evaluated only once per
+unique text, such as a call site name or a marker. The results are kept
+as a bitmap per query string, with one byte per text, so drawing looks up
+a byte instead of running a regular expression for every call.
+"""
+
+from __future__ import annotations
+
+from collections import OrderedDict
+import re
+from typing import Callable
+from typing import Hashable
+
+MAX_QUERIES: int = 16
+
+Predicate = Callable[[str], bool]
+
+
+def compile_regex(query: str) -> Predicate:
+    """Match texts with a regular expression, or as plain text if the query is not one."""
+    try:
+        pattern = re.compile(query)
+    except re.error:
+        pattern = re.compile(re.escape(query))
+    return lambda text: pattern.search(text) is not None
+
+
+def compile_substring(query: str) -> Predicate:
+    """Match texts that contain the query."""
+    return lambda text: query in text
+
+
+class Matcher:
+    """Remembers which texts match each recent search query."""
+
+    def __init__(
+        self, compile_query: Callable[[str], Predicate], max_queries: int = MAX_QUERIES
+    ) -> None:
+        """Initialize a Matcher with a function that turns a query into a predicate."""
+        self.compile_query: Callable[[str], Predicate] = compile_query
+        self.max_queries: int = max_queries
+        self.indexes: dict[Hashable, int] = {}
+        self.texts: list[str] = []
+        self.bitmaps: OrderedDict[str, bytearray] = OrderedDict()
+
+    def add(self, key: Hashable, text: str) -> int:
+        """Register the text of a key, and return the index of the key in the bitmaps."""
+        index = self.indexes.get(key)
+        if index is None:
+            index = self.indexes[key] = len(self.texts)
+            self.texts.append(text.lower())
+        return index
+
+    def get_bitmap(self, query: str) -> bytearray:
+        """
+        Return the bitmap of a query, evaluating it only for the texts added
+        since the query was last used. An empty query matches everything.
+        """
+        bitmap = self.bitmaps.get(query)
+        if bitmap is None:
+            bitmap = self.bitmaps[query] = bytearray()
+            while len(self.bitmaps) > self.max_queries:
+                self.bitmaps.popitem(last=False)
+        else:
+            self.bitmaps.move_to_end(query)
+        if len(bitmap) < len(self.texts):
+            if query:
+                predicate = self.compile_query(query.lower())
+                bitmap.extend(predicate(text) for text in self.texts[len(bitmap):])
+            else:
+                bitmap.extend(b"\1" * (len(self.texts) - len(bitmap)))
+        return bitmap
+
+    def matches(self, query: str, index: int) -> bool:
+        """Return True if the text at an index matches a query."""
+        return not query or bool(self.get_bitmap(query)[index])
+
+    def clear(self) -> None:
+        """Forget all texts and bitmaps."""
+        self.indexes.clear()
+        self.texts.clear()
+        self.bitmaps.clear()
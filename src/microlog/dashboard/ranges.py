@@ -0,0 +1,312 @@
+#
+# Microlog. Copyright (c) 2023 laffra, dcharbon. All rights reserved.
+#
+"""
+Statistics of a time range of a recording, for the brush on the timeline.
+
+The time that a group of calls, such as all calls of one function, spent
+up to a point in time is the sum of the durations of the calls of that
+group that ended before it, plus the elapsed part of its calls that are
+still running. The durations are kept as prefix sums in order of end time,
+so the first part is a binary search. Calls at the same depth of a thread
+do not overlap, so at most one call per depth and thread is running, found
+with a binary search in the calls of that depth sorted by start time. The
+time spent in a range is the difference between its end and its start.
+
+The total time of a function only counts its outermost calls. Recursive
+calls, inside another call of the same function, are kept in a separate
+group whose time is subtracted, so nested time is not counted twice.
+"""
+
+from __future__ import annotations
+
+from array import array
+import bisect
+from collections import defaultdict
+import heapq
+from typing import Any
+from typing import Callable
+from typing import Hashable
+
+from microlog.dashboard.samples import SampleIndex
+
+TOP_FUNCTIONS: int = 10
+
+
+class Groups:
+    """Calls grouped by a key, with prefix sums of their durations in order of end time."""
+
+    def __init__(self, ends: array, durations: array) -> None:
+        """Initialize empty Groups over the end times and durations of all calls."""
+        self.ends: array = ends
+        self.durations: array = durations
+        self.calls: dict[Hashable, array] = {}
+        self.sums: dict[Hashable, array] = {}
+        self.dirty: set[Hashable] = set()
+
+    def add(self, key: Hashable, call: int) -> None:
+        """Add a call to a group."""
+        calls = self.calls.get(key)
+        if calls is None:
+            calls = self.calls[key] = array("I")
+        calls.append(call)
+        self.dirty.add(key)
+
+    def update(self) -> None:
+        """Sort the groups that received calls and recompute their prefix sums."""
+        ends = self.ends
+        durations = self.durations
+        for key in self.dirty:
+            calls = self.calls[key] = array("I", sorted(self.calls[key], key=ends.__getitem__))
+            sums = self.sums[key] = array("d", [0.0])
+            total = 0.0
+            for call in calls:
+                total += durations[call]
+                sums.append(total)
+        self.dirty.clear()
+
+    def get_completed(self, key: Hashable, when: float) -> float:
+        """Return the total duration of the calls of a group that ended at or before a point in time."""
+        index = bisect.bisect_right(self.calls[key], when, key=self.ends.__getitem__)
+        return self.sums[key][index]
+
+    def clear(self) -> None:
+        """Remove all groups."""
+        self.calls.clear()
+        self.sums.clear()
+        self.dirty.clear()
+
+
+class RangeStatistics:
+    """What happened in a time range of a recording."""
+
+    def __init__(self, start: float, end: float) -> None:
+        """Initialize empty RangeStatistics for a time range."""
+        self.start: float = start
+        self.end: float = end
+        self.cpu: float = 0.0
+        self.memory_delta: float = 0.0
+        self.total: list[tuple[str, float]] = []
+        self.self_time: list[tuple[str, float]] = []
+        self.threads: dict[Any, float] = {}
+        self.logs: dict[int, int] = {}
+
+    def __repr__(self) -> str:
+        """Return a string representation of the RangeStatistics object."""
+        return f"<RangeStatistics {self.start:.3f}-{self.end:.3f} cpu={self.cpu:.0f}%>"
+
+
+class RangeIndex:
+    """Calls and log entries of a recording, indexed for statistics of any time range."""
+
+    def __init__(self) -> None:
+        """Initialize an empty RangeIndex."""
+        self.when: array = array("d")
+        self.end: array = array("d")
+        self.duration: array = array("d")
+        self.depth: array = array("I")
+        self.thread: list[Any] = []
+        self.name: list[str] = []
+        self.parent: list[str | None] = []
+        self.functions: Groups = Groups(self.end, self.duration)
+        self.callers: Groups = Groups(self.end, self.duration)
+        self.threads: Groups = Groups(self.end, self.duration)
+        self.recursion: Groups = Groups(self.end, self.duration)
+        self.recursive: bytearray = bytearray()
+        self.depths: dict[tuple[Any, str], tuple[int, int]] = {}
+        self.unchecked: list[int] = []
+        self.rows: dict[tuple[Any, int], array] = {}
+        self.unsorted_rows: set[tuple[Any, int]] = set()
+        self.logs: dict[int, list[float]] = defaultdict(list)
+
+    def add_call(
+        self, when: float, duration: float, thread: Any, depth: int, name: str, parent: str | None
+    ) -> None:
+        """Add a call. The parent is the name of the calling function, or None at depth 0."""
+        call = len(self.when)
+        self.when.append(when)
+        self.end.append(when + duration)
+        self.duration.append(duration)
+        self.depth.append(depth)
+        self.thread.append(thread)
+        self.name.append(name)
+        self.parent.append(parent)
+        self.recursive.append(0)
+        self.functions.add(name, call)
+        depths = self.depths.get((thread, name))
+        if depths is None:
+            self.depths[(thread, name)] = depth, depth
+        elif depths != (depth, depth):
+            self.depths[(thread, name)] = min(depths[0], depth), max(depths[1], depth)
+            self.unchecked.append(call)
+        if parent is not None:
+            self.callers.add(parent, call)
+        if depth == 0:
+            self.threads.add(thread, call)
+        row = self.rows.get((thread, depth))
+        if row is None:
+            row = self.rows[(thread, depth)] = array("I")
+        if row and when < self.when[row[-1]]:
+            self.unsorted_rows.add((thread, depth))
+        row.append(call)
+
+    def add_log(self, when: float, kind: int) -> None:
+        """Add a log entry of a given kind."""
+        times = self.logs[kind]
+        if times and when < times[-1]:
+            bisect.insort(times, when)
+        else:
+            times.append(when)
+
+    def update(self) -> None:
+        """Prepare the calls added since the last update for queries."""
+        for key in self.unsorted_rows:
+            self.rows[key] = array("I", sorted(self.rows[key], key=self.when.__getitem__))
+        self.unsorted_rows.clear()
+        for call in self.unchecked:
+            self.check_recursion(call)
+        self.unchecked.clear()
+        self.functions.update()
+        self.callers.update()
+        self.threads.update()
+        self.recursion.update()
+
+    def check_recursion(self, call: int) -> None:
+        """
+        Mark a call inside another call of the same function as recursive,
+        and the calls of its function inside it. Calls are not added in a
+        particular order, so the outer call may be added after the inner one.
+        Only calls of functions seen at other depths of their thread are
+        checked, and only those depths are searched.
+        """
+        thread, depth, name = self.thread[call], self.depth[call], self.name[call]
+        low, high = self.depths[(thread, name)]
+        when, end = self.when[call], self.end[call]
+        starts = self.when
+        for outer_depth in range(depth - 1, low - 1, -1):
+            row = self.rows.get((thread, outer_depth))
+            index = bisect.bisect_right(row, when, key=starts.__getitem__) - 1 if row else -1
+            if index >= 0 and self.name[row[index]] == name and self.end[row[index]] >= end:
+                self.mark_recursive(call)
+                break
+        for inner_depth in range(depth + 1, high + 1):
+            row = self.rows.get((thread, inner_depth)) or array("I")
+            index = bisect.bisect_left(row, when, key=starts.__getitem__)
+            while index < len(row) and starts[row[index]] < end:
+                inner = row[index]
+                if self.name[inner] == name and self.end[inner] <= end:
+                    self.mark_recursive(inner)
+                index += 1
+
+    def mark_recursive(self, call: int) -> None:
+        """Exclude a call from the total time of its function."""
+        if not self.recursive[call]:
+            self.recursive[call] = 1
+            self.recursion.add(self.name[call], call)
+
+    def get_running(self, when: float) -> list[int]:
+        """Return the calls that started before a point in time and end after it."""
+        running = []
+        starts = self.when
+        for row in self.rows.values():
+            index = bisect.bisect_right(row, when, key=starts.__getitem__) - 1
+            if index >= 0 and self.end[row[index]] > when:
+                running.append(row[index])
+        return running
+
+    def get_times(
+        self,
+        groups: Groups,
+        get_key: Callable[[int], Hashable | None],
+        start: tuple[float, list[int]],
+        end: tuple[float, list[int]],
+    ) -> dict[Hashable, float]:
+        """
+        Return the time each group of calls spent in a time range. Its start
+        and end are given with the calls running at that time.
+        """
+        times: dict[Hashable, float] = {}
+        for key in groups.calls:
+            times[key] = groups.get_completed(key, end[0]) - groups.get_completed(key, start[0])
+        for (when, running), sign in ((start, -1), (end, 1)):
+            for call in running:
+                key = get_key(call)
+                if key is not None:
+                    times[key] += sign * (when - self.when[call])
+        return times
+
+    def get_statistics(
+        self, start: float, end: float, samples: SampleIndex | None = None, top: int = TOP_FUNCTIONS
+    ) -> RangeStatistics:
+        """
+        Return the statistics of a time range. CPU and memory come from the
+        status samples, with fields "cpu" and "memory", if given. Without
+        samples in the range, the CPU is that of the sample before it.
+        """
+        self.update()
+        statistics = RangeStatistics(start, end)
+        if samples:
+            before = samples.get_at(start) or samples.items[-1]
+            if samples.count(start, end):
+                statistics.cpu = samples.mean("cpu", start, end)
+            else:
+                statistics.cpu = before.cpu  # a range shorter than the sampling interval
+            after = samples.get_at(end) or samples.items[-1]
+            statistics.memory_delta = after.memory - before.memory
+        first = start, self.get_running(start)
+        last = end, self.get_running(end)
+        total = self.get_times(self.functions, self.name.__getitem__, first, last)
+        nested = self.get_times(self.callers, self.parent.__getitem__, first, last)
+        recursive = self.get_times(
+            self.recursion,
+            lambda call: self.name[call] if self.recursive[call] else None,
+            first,
+            last,
+        )
+        self_time = {name: seconds - nested.get(name, 0.0) for name, seconds in total.items()}
+        outermost = {name: seconds - recursive.get(name, 0.0) for name, seconds in total.items()}
+        statistics.total = self.get_top(outermost, top)
+        statistics.self_time = self.get_top(self_time, top)
+        duration = max(end - start, 1e-9)
+        busy = self.get_times(
+            self.threads,
+            lambda call: self.thread[call] if self.depth[call] == 0 else None,
+            first,
+            last,
+        )
+        statistics.threads = {thread: seconds / duration for thread, seconds in busy.items() if seconds > 0}
+        statistics.logs = {
+            kind: bisect.bisect_right(times, end) - bisect.bisect_left(times, start)
+            for kind, times in self.logs.items()
+        }
+        return statistics
+
+    @classmethod
+    def get_top(cls, times: dict[Hashable, float], top: int) -> list[tuple[Any, float]]:
+        """Return the keys with the most time, most time first."""
+        rounded = ((key, round(seconds, 6)) for key, seconds in times.items())
+        return heapq.nlargest(
+            top,
+            ((key, seconds) for key, seconds in rounded if seconds > 0),
+            key=lambda item: item[1],
+        )
+
+    def clear(self) -> None:
+        """Remove all calls and log entries."""
+        del self.when[:], self.end[:], self.duration[:], self.depth[:], self.recursive[:]
+        self.thread.clear()
+        self.name.clear()
+        self.parent.clear()
+        self.functions.clear()
+        self.callers.clear()
+        self.threads.clear()
+        self.recursion.clear()
+        self.depths.clear()
+        self.unchecked.clear()
+        self.rows.clear()
+        self.unsorted_rows.clear()
+        self.logs.clear()
+
+    def __len__(self) -> int:
+        """Return the number of calls."""
+        return len(self.when)
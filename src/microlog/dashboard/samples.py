@@ -0,0 +1,89 @@
+#
+# Microlog. Copyright (c) 2023 laffra, dcharbon. All rights reserved.
+#
+"""
+Time-range statistics over the status samples of a recording.
+
+Samples are kept sorted by time, with prefix sums of their numeric fields,
+so the sample at a point in time, and the count, sum, or mean of a field
+over any time range, are found with a binary search instead of a scan.
+"""
+
+from __future__ import annotations
+
+import bisect
+from typing import Any
+
+
+class SampleIndex:
+    """Samples sorted by time, with prefix sums of some of their fields."""
+
+    def __init__(self, fields: tuple[str, ...]) -> None:
+        """Initialize an empty SampleIndex that sums the given fields of its samples."""
+        self.fields: tuple[str, ...] = fields
+        self.times: list[float] = []
+        self.items: list[Any] = []
+        self.sums: dict[str, list[float]] = {field: [0.0] for field in fields}
+
+    def add(self, when: float, item: Any) -> None:
+        """Add a sample, appending in constant time when it is the most recent one."""
+        if not self.times or when >= self.times[-1]:
+            self.times.append(when)
+            self.items.append(item)
+            for field, sums in self.sums.items():
+                sums.append(sums[-1] + getattr(item, field))
+            return
+        index = bisect.bisect_right(self.times, when)
+        self.times.insert(index, when)
+        self.items.insert(index, item)
+        for field, sums in self.sums.items():
+            del sums[index + 1:]
+            for sample in self.items[index:]:
+                sums.append(sums[-1] + getattr(sample, field))
+
+    def get_at(self, when: float) -> Any | None:
+        """
+        Return the last sample at or before a point in time, or the first
+        sample for earlier times. Returns None after the last sample.
+        """
+        index = bisect.bisect_right(self.times, when)
+        if index == len(self.times):
+            return None
+        return self.items[max(0, index - 1)]
+
+    def get_range(self, start: float, end: float) -> tuple[int, int]:
+        """Return the slice of samples taken from start up to and including end."""
+        return bisect.bisect_left(self.times, start), bisect.bisect_right(self.times, end)
+
+    def count(self, start: float, end: float) -> int:
+        """Return the number of samples in a time range."""
+        first, last = self.get_range(start, end)
+        return max(0, last - first)
+
+    def sum(self, field: str, start: float, end: float) -> float:
+        """Return the sum of a field over the samples in a time range."""
+        first, last = self.get_range(start, end)
+        sums = self.sums[field]
+        return sums[last] - sums[first] if last > first else 0.0
+
+    def mean(self, field: str, start: float, end: float) -> float:
+        """Return the mean of a field over the samples in a time range, or 0 without samples."""
+        count = self.count(start, end)
+        return self.sum(field, start, end) / count if count else 0.0
+
+    def get_statistics(self, start: float, end: float) -> dict[str, float]:
+        """Return the number of samples and the mean of each field in a time range."""
+        statistics = {"count": float(self.count(start, end))}
+        for field in self.fields:
+            statistics[field] = self.mean(field, start, end)
+        return statistics
+
+    def clear(self) -> None:
+        """Remove all samples."""
+        self.times.clear()
+        self.items.clear()
+        self.sums = {field: [0.0] for field in self.fields}
+
+    def __len__(self) -> int:
+        """Return the number of samples."""
+        return len(self.items)
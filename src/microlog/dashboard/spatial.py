@@ -0,0 +1,119 @@
+#
+# Microlog. Copyright (c) 2023 laffra, dcharbon. All rights reserved.
+#
+"""
+Spatial index of the calls in the flamegraph.
+
+Calls are grouped in rows, one per thread and depth. The calls in a row are
+kept sorted by start time, together with the running maximum of their end
+times, which acts as a flattened interval tree: the calls that intersect a
+time range, or that contain a point in time, are found with a binary search
+instead of a scan over all calls.
+"""
+
+from __future__ import annotations
+
+import bisect
+from typing import Any
+from typing import Collection
+from typing import Hashable
+from typing import Iterable
+from typing import Iterator
+
+
+class Row:
+    """The intervals of one thread at one depth, sorted by start."""
+
+    __slots__ = ("starts", "ends", "reach", "items")
+
+    def __init__(self) -> None:
+        """Initialize an empty Row."""
+        self.starts: list[float] = []
+        self.ends: list[float] = []
+        self.reach: list[float] = []
+        self.items: list[Any] = []
+
+    def add(self, start: float, end: float, item: Any) -> None:
+        """Add an interval, appending in constant time when it starts last."""
+        if not self.starts or start >= self.starts[-1]:
+            self.starts.append(start)
+            self.ends.append(end)
+            self.reach.append(max(end, self.reach[-1]) if self.reach else end)
+            self.items.append(item)
+            return
+        index = bisect.bisect_right(self.starts, start)
+        self.starts.insert(index, start)
+        self.ends.insert(index, end)
+        self.items.insert(index, item)
+        self.reach.insert(index, end)
+        for n in range(index, len(self.reach)):
+            self.reach[n] = max(self.ends[n], self.reach[n - 1]) if n else self.ends[n]
+
+    def query(self, start: float, end: float) -> Iterator[Any]:
+        """Yield the items whose interval intersects [start, end)."""
+        first = bisect.bisect_right(self.reach, start)
+        last = bisect.bisect_left(self.starts, end)
+        ends = self.ends
+        items = self.items
+        for index in range(first, last):
+            if ends[index] > start:
+                yield items[index]
+
+    def find(self, when: float) -> Any | None:
+        """Return the item whose interval contains a point in time, or None."""
+        index = bisect.bisect_right(self.starts, when) - 1
+        while index >= 0 and self.reach[index] > when:
+            if self.ends[index] > when:
+                return self.items[index]
+            index -= 1
+        return None
+
+    def __len__(self) -> int:
+        """Return the number of intervals in this row."""
+        return len(self.items)
+
+
+class SpatialIndex:
+    """Rows of intervals, keyed by (thread, depth)."""
+
+    def __init__(self) -> None:
+        """Initialize an empty SpatialIndex."""
+        self.rows: dict[tuple[Hashable, int], Row] = {}
+
+    def add(self, thread: Hashable, depth: int, start: float, end: float, item: Any) -> None:
+        """Add the interval of an item."""
+        row = self.rows.get((thread, depth))
+        if row is None:
+            row = self.rows[(thread, depth)] = Row()
+        row.add(start, end, item)
+
+    def add_all(self, entries: Iterable[tuple[Hashable, int, float, float, Any]]) -> None:
+        """Add many (thread, depth, start, end, item) entries, sorting them first."""
+        for thread, depth, start, end, item in sorted(entries, key=lambda entry: entry[2]):
+            self.add(thread, depth, start, end, item)
+
+    def query(
+        self, start: float, end: float, threads: Collection[Hashable] | None = None
+    ) -> list[Any]:
+        """Return the items of the given threads that intersect [start, end)."""
+        items: list[Any] = []
+        for (thread, _), row in self.rows.items():
+            if threads is None or thread in threads:
+                items.extend(row.query(start, end))
+        return items
+
+    def find(
+        self, depth: int, when: float, threads: Collection[Hashable] | None = None
+    ) -> list[Any]:
+        """Return the items at a depth that contain a point in time, one per thread."""
+        found = []
+        for (thread, row_depth), row in self.rows.items():
+            if row_depth == depth and (threads is None or thread in threads):
+                item = row.find(when)
+                if item is not None:
+                    found.append(item)
+        return found
+
+    def __len__(self) -> int:
+        """Return the number of intervals in the index."""
+        return sum(len(row) for row in self.rows.values())
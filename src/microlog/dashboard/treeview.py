@@ -28,8 +28,10 @@ class TreeView:
         selection_handler: Callable[[str], None],
         delete_handler: Callable[[str, Callable[[], None]], None],
         reload_handler: Callable[[], None],
+        diff_handler: Callable[[str], None] | None = None,
     ) -> None:
         self.selection_handler: Callable[[str], None] = selection_handler
+        self.diff_handler: Callable[[str], None] | None = diff_handler
         self.delete_handler: Callable[[str, Callable[[], None]], None] = delete_handler
         self.reload_handler: Callable[[], None] = reload_handler
         self.parent: Any = parent
@@ -71,7 +73,8 @@ class TreeView:
                     .click(
                         ltk.proxy(
                             lambda event: self.click(
-                                js.jQuery(event.target).closest(".tree-row")
+                                js.jQuery(event.target).closest(".tree-row"),
+                                event.shiftKey,
                             )
                         )
                     )
@@ -134,14 +137,16 @@ class TreeView:
         node.find(".tree-label").html(f"{TOGGLE_CLOSED} {node.attr('label')}")
         js.localStorage.setItem(f"tree-toggle-{node.attr('label')}", "closed")
 
-    def click(self, node: Any) -> None:
-        """Handle click events on tree nodes."""
+    def click(self, node: Any, shift: bool = False) -> None:
+        """Handle click events on tree nodes. Shift-click compares with the selection."""
         if int(node.attr("children")):
             print("open/close", node.text())
             if node.closest(".tree-node").hasClass("closed"):
                 self.open_node(node)
             else:
                 self.close_node(node)
+        elif shift and self.diff_handler:
+            self.diff_handler(f"{node.attr('path')}/{node.attr('label')}")
         else:
             self.select_node(node)
 
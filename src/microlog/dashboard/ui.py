@@ -8,6 +8,7 @@ from __future__ import annotations
 
 import asyncio
 from collections import defaultdict
+import json
 import textwrap
 import traceback
 from typing import Any
@@ -19,8 +20,13 @@ import js
 import pyodide
 
 from microlog.dashboard.treeview import TreeView
+from microlog.dashboard.cache import Batch
+from microlog.dashboard.cache import CachedRecording
+from microlog.dashboard.cache import RecordingCache
 from microlog.dashboard import config
+from microlog.dashboard import icicle
 from microlog.dashboard import markdown
+from microlog import stream
 from microlog.models import recording
 from microlog.dashboard.design import Design
 from microlog.dashboard.flamegraph import Flamegraph
@@ -29,6 +35,13 @@ from pyodide import http
 window = ltk.find(js.window)
 body = ltk.find("body")
 
+LIVE_PREFIX = "live/"
+DIFF_PREFIX = "diff/"
+STACKS_PREFIX = "stacks/"
+FUNCTION_SEARCH_PREFIX = "fn:"
+ANALYSIS_POLL_DELAY = 2.0
+SCAN_POLL_DELAY = 2.0
+
 class Main():
     """
     Main class for the Microlog dashboard application.
@@ -42,7 +55,9 @@ class Main():
         self.create_ui()
         self.flamegraph = Flamegraph("#flameCanvas", "#timelineCanvas")
         self.design = Design([])
+        self.recordings = RecordingCache(config.RECORDING_CACHE_BUDGET)
         self.name = ""
+        self.live: Any = None
         self.setup_log_handlers()
         self.setup_search_handler()
         self.show_all_logs()
@@ -52,13 +67,125 @@ class Main():
     def load(self, name: str="") -> None:
         """Load the recording."""
         self.flamegraph.reset()
+        self.close_live()
         self.name = name
         if not self.name:
             self.name = self.get_recording_from_url()
-        if self.name:
+        ltk.find(".stacks-toggle").text("Timeline" if self.name.startswith(STACKS_PREFIX) else "Left heavy")
+        if self.name.startswith(LIVE_PREFIX):
+            self.load_live(self.name[len(LIVE_PREFIX):])
+        elif self.name.startswith(DIFF_PREFIX):
+            parts = self.name[len(DIFF_PREFIX):].split("/")
+            asyncio.create_task(self.load_diff("/".join(parts[:2]), "/".join(parts[2:4])))
+        elif self.name.startswith(STACKS_PREFIX):
+            asyncio.create_task(self.load_stacks(self.name[len(STACKS_PREFIX):]))
+        elif self.name:
             asyncio.create_task(self.load_recording(self.name))
         self.resize()
 
+    def load_live(self, name: str) -> None:
+        """
+        Follow a recording that is still running. Batches arrive as
+        Server-Sent Events and are appended to the flamegraph. When the
+        recording is saved, the complete recording is loaded instead.
+        """
+        recording.clear()
+        self.flamegraph.load()
+        self.flamegraph.show_message(f"Waiting for live data from {name}...")
+        self.live = js.EventSource.new(f"live/{name}")
+        self.live.onmessage = ltk.proxy(lambda event: self.append_live(event.data))
+        self.live.addEventListener("done", ltk.proxy(lambda event: self.finish_live(name)))
+
+    def append_live(self, data: str) -> None:
+        """Append a live batch to the flamegraph."""
+        try:
+            self.flamegraph.append(*stream.decode_batch(json.loads(data)))
+        except Exception as e: # pylint: disable=broad-except
+            print(f"Cannot handle live data: {e}")
+            traceback.print_exc()
+
+    def finish_live(self, name: str) -> None:
+        """Stop following a live recording and load the saved recording."""
+        self.close_live()
+        self.reload(name)
+
+    def close_live(self) -> None:
+        """Close the live connection, if any."""
+        if self.live:
+            self.live.close()
+            self.live = None
+
+    def diff(self, target: str) -> None:
+        """Compare the current recording with another recording."""
+        if not self.name or self.name.startswith((LIVE_PREFIX, DIFF_PREFIX)):
+            return self.reload(target)
+        self.reload(f"{DIFF_PREFIX}{self.name}/{target}")
+
+    async def load_diff(self, base: str, target: str) -> None:
+        """Load and show the differential flamegraph of two recordings."""
+        recording.clear()
+        self.flamegraph.load()
+        self.flamegraph.show_message(f"Comparing {base} with {target}...")
+        url = (
+            f"diff?base={js.encodeURIComponent(base)}"
+            f"&target={js.encodeURIComponent(target)}"
+        )
+        try:
+            response = await http.pyfetch(url)
+            self.flamegraph.show_diff(await response.json())
+        except Exception as e: # pylint: disable=broad-except
+            self.flamegraph.show_message(f"Cannot compare {base} with {target}: {e}")
+            traceback.print_exc()
+
+    def toggle_stacks(self) -> None:
+        """Switch between the timeline and the left-heavy flamegraph of the current recording."""
+        if self.name.startswith(STACKS_PREFIX):
+            self.reload(self.name[len(STACKS_PREFIX):])
+        elif self.name and not self.name.startswith((LIVE_PREFIX, DIFF_PREFIX)):
+            self.reload(f"{STACKS_PREFIX}{self.name}")
+
+    async def load_stacks(self, name: str) -> None:
+        """
+        Show the left-heavy flamegraph of a recording, where calls with the
+        same stack path are merged. Clicking a function shows its callers
+        and callees, see load_sandwich.
+        """
+        recording.clear()
+        self.flamegraph.load()
+        self.flamegraph.show_message(f"Merging the stacks of {name}...")
+        try:
+            response = await http.pyfetch(f"stacks/{name}")
+            self.flamegraph.show_stacks(
+                icicle.layout_stacks(await response.json()),
+                lambda function: asyncio.create_task(self.load_sandwich(name, function)),
+            )
+        except Exception as e: # pylint: disable=broad-except
+            self.flamegraph.show_message(f"Cannot merge the stacks of {name}: {e}")
+            traceback.print_exc()
+
+    async def load_sandwich(self, name: str, function: str) -> None:
+        """
+        Show the callers of a function above it and its callees below it.
+        Clicking the function itself goes back to the left-heavy flamegraph.
+        """
+        def select(selected: str) -> None:
+            if selected == function:
+                asyncio.create_task(self.load_stacks(name))
+            else:
+                asyncio.create_task(self.load_sandwich(name, selected))
+
+        try:
+            response = await http.pyfetch(
+                f"sandwich/{name}?function={js.encodeURIComponent(function)}"
+            )
+            data = await response.json()
+            self.flamegraph.show_stacks(
+                icicle.layout_sandwich(data["callers"], data["callees"]), select
+            )
+        except Exception as e: # pylint: disable=broad-except
+            self.flamegraph.show_message(f"Cannot show the callers and callees of {function}: {e}")
+            traceback.print_exc()
+
     async def load_recording(self, name: str) -> None:
         """
         Load a log file by name and display its flamegraph.
@@ -69,36 +196,116 @@ class Main():
         self.flamegraph.loading(name)
         self.flamegraph.draw()
         recording.clear()
-        url = f"zip/{name}"
+        self.flamegraph.load()
         try:
-            response = await http.pyfetch(url)
-            binary_data = await response.bytes()
-            self.show_flamegraph(binary_data)
-            self.design = Design(self.flamegraph.calls)
+            await self.load_chunks(name, self.recordings.get(name))
+            self.design = Design(recording.calls)
             self.show_analysis(recording.analysis)
+            await self.show_stored_analysis(name)
+            await self.show_regressions(name)
         except pyodide.http.AbortError as e:
             self.flamegraph.show_message(f"Cannot reach the Microlog server: {e}")
         except Exception as e: # pylint: disable=broad-except
             self.flamegraph.show_message(f"Cannot load the recording: {type(e)} {e}")
             traceback.print_exc()
 
+    async def load_chunks(self, name: str, cached: CachedRecording | None = None) -> None:
+        """
+        Stream a recording in time-ordered batches, see stream.iter_chunks,
+        and append each batch to the flamegraph as soon as it arrives. When
+        the server confirms the cached version is still current, the cached
+        batches are replayed instead.
+        """
+        headers = {"If-None-Match": cached.etag} if cached else {}
+        response = await http.pyfetch(f"chunks/{name}", headers=headers)
+        if cached and response.status == 304:
+            for batch in cached.batches:
+                self.flamegraph.append(*batch)
+            recording.analysis = cached.analysis
+        else:
+            if not response.ok:
+                raise ValueError(f"{response.status} {await response.string()}")
+            await self.read_chunks(name, response)
+        self.flamegraph.show_progress(1)
+        self.flamegraph.load_log()
+        self.flamegraph.draw()
+
+    async def read_chunks(self, name: str, response: http.FetchResponse) -> None:
+        """Append the batches of a chunks response as they arrive, and cache them."""
+        reader = response.js_response.body.getReader()
+        chunks = stream.ChunkReader()
+        batches: list[Batch] = []
+        self.flamegraph.show_progress(0)
+        while True:
+            result = await reader.read()
+            if result.done:
+                break
+            for calls, markers, statuses in chunks.feed(result.value.to_bytes()):
+                self.flamegraph.append(calls, markers, statuses)
+                batches.append((calls, markers, statuses))
+            self.flamegraph.show_progress(chunks.get_progress())
+        if chunks.header is None:
+            raise ValueError(f"Empty response for {name}")
+        recording.analysis = chunks.header["analysis"]
+        etag = response.js_response.headers.get("ETag")
+        if etag:
+            self.recordings.put(name, CachedRecording(etag, batches, recording.analysis))
+
     def show_all_logs(self) -> None:
         """
         Fetch and display all logs matching the current filter.
         """
         filter_string = ltk.find("#filter").val().lower()
+        if filter_string.startswith(FUNCTION_SEARCH_PREFIX):
+            return self.search_function(ltk.find("#filter").val()[len(FUNCTION_SEARCH_PREFIX):])
         url = f"logs?filter={filter_string}"
-        js.jQuery.get(
-            url,
-            ltk.proxy(
-                lambda data, *rest: self.render_logs(data.strip().split("\n") if data else [])
-            ),
-        )
+
+        def render(data: Any, _status: Any, xhr: Any) -> None:
+            self.render_logs(data.strip().split("\n") if data else [])
+            if xhr.getResponseHeader("X-Microlog-Scanning") == "true":
+                self.show_scanning(filter_string)
+
+        js.jQuery.get(url, ltk.proxy(render))
         ltk.find(".logs").empty().append(
             ltk.create("<img>").addClass("spinner").attr("src", "/images/spinner.gif"),
             ltk.create("<span>").css("color", "pink").text("Loading..."),
         )
 
+    def show_scanning(self, filter_string: str) -> None:
+        """Tell the user the server is still scanning, and show the logs again shortly."""
+        ltk.find(".logs").prepend(
+            ltk.create("<span>").css("color", "pink").text("Still scanning for recordings...")
+        )
+
+        def reload() -> None:
+            if ltk.find("#filter").val().lower() == filter_string:
+                self.show_all_logs()
+
+        js.setTimeout(ltk.proxy(reload), SCAN_POLL_DELAY * 1000)
+
+    def search_function(self, function: str) -> None:
+        """
+        Show the recordings that spent time in a function, with the total
+        time and call count of that function in each recording.
+        """
+        url = f"search?function={js.encodeURIComponent(function.strip())}"
+
+        def render(data: Any, *rest: Any) -> None:
+            results = json.loads(js.JSON.stringify(data))
+            self.render_logs([result["recording"] for result in results])
+            for result in results:
+                application, run = result["recording"].rsplit("/", 1)
+                js.jQuery(f".tree-leaf[path='{application}'][label='{run}']").attr(
+                    "title",
+                    f"{result['function']}: {result['total']:.3f}s in {result['count']:,} calls",
+                ).find(".tree-label").append(f" ({result['total']:.2f}s)")
+
+        js.jQuery.get(url, ltk.proxy(render))
+        ltk.find(".logs").empty().append(
+            ltk.create("<img>").addClass("spinner").attr("src", "/images/spinner.gif"),
+            ltk.create("<span>").css("color", "pink").text("Searching..."),
+        )
+
     def delete_log(self, name: str, done_handler: Callable[[], None]) -> None:
         """
         Delete a log file by name and call the provided handler when done.
@@ -108,6 +315,7 @@ class Main():
             done_handler (Callable): Function to call after deletion.
         """
         url = f"delete/{name}"
+        self.recordings.forget(name)
         ltk.get(url, ltk.proxy(lambda data, *rest: done_handler()))
 
     def get_recording_from_url(self) -> str:
@@ -118,6 +326,13 @@ class Main():
             str: The log file path if present, else an empty string.
         """
         hash_string = js.document.location.hash
+        if hash_string.startswith(f"#{DIFF_PREFIX}"):
+            parts = hash_string[1 + len(DIFF_PREFIX):].split("/")[:4]
+            return f"{DIFF_PREFIX}{'/'.join(parts)}"
+        for prefix in (LIVE_PREFIX, STACKS_PREFIX):
+            if hash_string.startswith(f"#{prefix}"):
+                app, name = hash_string[1 + len(prefix):].split("/")[:2]
+                return f"{prefix}{app}/{name}"
         if hash_string:
             app, name = hash_string[1:].split("/")[:2]
             return f"{app}/{name}"
@@ -156,6 +371,7 @@ class Main():
             lambda path: self.reload(path), # pylint: disable=unnecessary-lambda
             lambda path, done_handler: self.delete_log(path, done_handler), # pylint: disable=unnecessary-lambda
             self.refresh_logs,
+            lambda path: self.diff(path), # pylint: disable=unnecessary-lambda
         )
 
     def reload(self, name: str) -> None:
@@ -163,19 +379,6 @@ class Main():
         js.document.location.hash = f"#{name}"
         self.load(name)
 
-    def show_flamegraph(self, pickled_data: Any) -> None:
-        """
-        Display the flamegraph for the loaded log data.
-        """
-        if pickled_data:
-            try:
-                recording.load(pickled_data)
-            except Exception as e: # pylint: disable=broad-except
-                self.flamegraph.show_message(f"Could not load recording: {e}")
-                return
-            self.flamegraph.load()
-            self.flamegraph.draw()
-
     def refresh_logs(self, _: Any | None = None) -> None:
         """
         Refresh the log list based on the current filter.
@@ -221,8 +424,12 @@ class Main():
                 ltk.Div().css("width", "100%").css("height", 5),
                 ltk.Div().attr("id", "hairline")
                     .addClass("hairline"),
+                ltk.Div().addClass("loading-progress"),
                 ltk.Div().attr("id", "summary")
                     .addClass("summary"),
+                ltk.Div().addClass("range-statistics"),
+                ltk.Button("Left heavy", ltk.proxy(lambda _event: self.toggle_stacks()))
+                    .addClass("stacks-toggle"),
                 ltk.Input("")
                     .attr("id", "span-search")
                     .attr("placeholder", "search regex...")
@@ -378,14 +585,30 @@ class Main():
             "Here is a trace of my code:",
             trace
         ])
-        def post():
-            ltk.post(
-                "/analysis/",
-                f"{name}\n{prompt}",
-                ltk.proxy(lambda response: self.show_analysis(response)), # pylint: disable=unnecessary-lambda
-                "text"
-            )
-        ltk.schedule(post, "allow windmill to load before doing a post")
+        asyncio.create_task(self.request_analysis(f"{name}\n{prompt}"))
+
+    async def request_analysis(self, prompt: str) -> None:
+        """Submit an analysis job to the server and poll it until it is done."""
+        try:
+            response = await http.pyfetch("/analysis/", method="POST", body=prompt)
+            job = await response.json()
+            while job["status"] in ("queued", "running"):
+                await asyncio.sleep(ANALYSIS_POLL_DELAY)
+                response = await http.pyfetch(f"/job/{job['id']}")
+                job = await response.json()
+            self.show_analysis(job["result"])
+        except Exception as e: # pylint: disable=broad-except
+            name = prompt.split("\n", 1)[0]
+            self.show_analysis(f"{name}\n# Error\nCould not analyse {name}: {e}")
+        ltk.find("#ask-ai").attr("disabled", False)
+
+    async def show_stored_analysis(self, name: str) -> None:
+        """Show the analysis that was stored for this recording, if any."""
+        try:
+            response = await http.pyfetch(f"analysis/{name}")
+            self.show_analysis(await response.string())
+        except Exception as e: # pylint: disable=broad-except
+            print(f"Cannot load the analysis of {name}: {e}")
 
     def show_analysis(self, name_and_analysis: str) -> None:
         """Display the analysis from the LLM."""
@@ -396,6 +619,28 @@ class Main():
             ltk.find("#analysis").html(markdown.markdown(f"{analysis}<br><br><h1>The prompt that was used:</h1>{self.get_prompt()}"))
             ltk.find("#ask-ai").attr("disabled", False)
 
+    async def show_regressions(self, name: str) -> None:
+        """Show regressions against earlier runs of the same application at the top of the log."""
+        try:
+            response = await http.pyfetch(f"regressions/{name}")
+            report = await response.json()
+        except Exception as e: # pylint: disable=broad-except
+            print(f"Cannot check {name} for regressions: {e}")
+            return
+        if name != self.name or not report.get("regressions"):
+            return
+        ltk.find("#tabs-log .log-notes").prepend(
+            ltk.Div(
+                ltk.Paragraph(
+                    f"😡 Regressions compared to {len(report['baseline'])} earlier runs:"
+                ),
+                *[
+                    ltk.Paragraph(f" - {found['description']}")
+                    for found in report["regressions"]
+                ],
+            ).addClass("log-entry log-regressions")
+        )
+
     def create_sidebar(self) -> None:
         """Create and render the sidebar with log filter and list."""
         return (
@@ -403,7 +648,7 @@ class Main():
                 ltk.HBox(
                     ltk.Input("")
                         .attr("id", "filter")
-                        .attr("placeholder", "filter regex...")
+                        .attr("placeholder", "filter regex, or fn:function...")
                         .addClass("filter")
                 ).css("height", 38).css("background", "#545454"),
                 ltk.Div().attr("id", "logs").addClass("logs")
@@ -432,6 +677,7 @@ class Main():
     def switch_tab(self) -> None:
         """Handle tab switch events to update UI elements accordingly."""
         ltk.find(".dialog").css("display", "none")
+        self.flamegraph.log_view.show()
 
     def customize_styling(self) -> None:
         """Apply custom CSS styles to the UI elements."""
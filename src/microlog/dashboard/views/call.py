@@ -5,15 +5,18 @@
 
 from __future__ import annotations
 
-import itertools
-import re
 from typing import Any
+from typing import Iterable
 
 import ltk
 import js
 from microlog import api
+from microlog import tiles
+from microlog.dashboard import calltable
 from microlog.dashboard import colors
 from microlog.dashboard import config
+from microlog.dashboard import groups
+from microlog.dashboard import matcher
 from microlog.dashboard.canvas import Canvas
 from microlog.dashboard.dialog import dialog
 from microlog.dashboard.views import View
@@ -21,57 +24,129 @@ from microlog.dashboard.views import sanitize
 from microlog.dashboard.views import status
 from microlog.models import Call
 
+MAX_SIMILAR_CALLS: int = 100
+
+
+def is_slow_import(model: Call) -> bool:
+    """Return True if a call is an import that took more than 0.1s."""
+    return model.depth > 0 and model.duration > 0.1 and model.call_site.name.endswith("<module>")
+
+
+def get_full_name(model: Call) -> str:
+    """Return the full name of a call, with emoji if slow import."""
+    module_name, name = model.call_site.name.rsplit(".", 1)
+    if name == "<module>":
+        name = f"import {module_name}"
+    else:
+        name = model.call_site.name
+    return f"😡 {name}" if is_slow_import(model) else name
+
+
+def get_short_name(model: Call) -> str:
+    """Return a short name for a call, with emoji if slow import."""
+    parts = model.call_site.name.split(".")
+    name = parts[-1]
+    if name in ("__init__", "<module>"):
+        name = parts[-2] or parts[-3]
+    return f"😡 {name}" if is_slow_import(model) else name
+
+
+def get_label(model: Call, w: float) -> str:
+    """Return a label for a call that is w pixels wide on the screen."""
+    if w > 300:
+        return f"{get_full_name(model)} (at {model.when:0.2f} " \
+            f"duration: {model.duration:0.2f}s)"
+    elif w > 200:
+        return f"{get_short_name(model)} (at {model.when:0.2f} " \
+            f"duration: {model.duration:0.2f}s)"
+    else:
+        return get_short_name(model)
+
 
 class CallView(View):
-    """A visual representation of a function call in the call graph."""
+    """
+    A visual representation of a function call in the call graph.
+
+    Calls are added to the columns of CallView.table when a recording is
+    loaded. A CallView is only created for a call that is hovered, clicked,
+    or shown in a popup, see CallView.get.
+    """
 
     thread_index: dict[str, int] = {}
     show_threads: set[str] = set()
-    instances: list["CallView"] = []
+    views: dict[int, "CallView"] = {}
     min_width: int = 3
     selected: "CallView | None" = None
     canvas: Canvas | None = None
-
-    def __init__(self, canvas: Canvas, model: Call) -> None:
-        """Initialize a CallView instance."""
-        self.model: Call = model
+    search_matcher: matcher.Matcher = matcher.Matcher(matcher.compile_regex)
+    similar_calls: groups.GroupIndex = groups.GroupIndex()
+    table: calltable.CallTable = calltable.CallTable(
+        colors.get_color,
+        lambda name: CallView.search_matcher.add(name, CallView.get_search_text(name)),
+    )
+
+    def __init__(self, canvas: Canvas, index: int) -> None:
+        """Initialize a CallView for the call at an index of CallView.table."""
+        self.index: int = index
+        self.model: Call = CallView.table.models[index]
         View.__init__(self, canvas)
         CallView.canvas = canvas
         self.x = self.y = self.w = self.h = 0
-        self.color = colors.get_color(self.model.call_site.name)
-        self.index = len(CallView.instances)
-        CallView.instances.append(self)
+        self.color = CallView.table.get_color(index)
+        self.match_index = CallView.table.get_match_index(index)
+        self.calculate()
 
-        if self.model.thread_id not in self.thread_index:
-            self.thread_index[self.model.thread_id] = len(self.thread_index)
-            if len(self.thread_index) <= 1:
-                self.show_threads.add(self.model.thread_id)
+    @classmethod
+    def get(cls, index: int) -> "CallView":
+        """Return the view of the call at an index of CallView.table, creating it on first use."""
+        view = cls.views.get(index)
+        if view is None:
+            view = cls.views[index] = CallView(cls.canvas, index)
+        return view
 
-            def redraw(_: Any) -> None:
-                self.show_threads.clear()
-                self.show_threads.add(self.model.thread_id)
-                js.jQuery(".thread-selector").prop("checked", False)
-                js.jQuery(f"#toggle-{self.model.thread_id}").prop("checked", True)
-                canvas.redraw()
+    @classmethod
+    def add_all(cls, canvas: Canvas, models: list[Call]) -> range:
+        """Add calls to the table, the groups of similar calls, and the thread selectors."""
+        CallView.canvas = canvas
+        indexes = cls.table.add_all(models)
+        add_similar_call = cls.similar_calls.add
+        thread_index = cls.thread_index
+        for index, model in zip(indexes, models):
+            add_similar_call((model.call_site, model.caller_site), index, model.duration)
+            if model.thread_id not in thread_index:
+                cls.add_thread(canvas, model.thread_id)
+        return indexes
 
-            js.jQuery(".flamegraph-container").append(
-                (
-                    js.jQuery("<input>")
-                    .addClass("thread-selector")
-                    .prop("type", "checkbox")
-                    .prop("checked", "" if len(self.thread_index) > 1 else "checked")
-                    .attr("id", f"toggle-{self.model.thread_id}")
-                    .attr("threadId", self.model.thread_id)
-                    .css(
-                        "top",
-                        canvas.offset_y + 227 + 60 * self.thread_index[self.model.thread_id],
-                    )
-                    .on("click", ltk.proxy(redraw))
-                ),
-                js.jQuery("#timelineCanvas"),
-            )
-        self.y = self.model.depth * config.LINE_HEIGHT + \
-                60 * self.thread_index[self.model.thread_id]
+    @classmethod
+    def add_thread(cls, canvas: Canvas, thread_id: Any) -> None:
+        """Add the selector of a thread. Selecting a thread shows only that thread."""
+        cls.thread_index[thread_id] = len(cls.thread_index)
+        if len(cls.thread_index) <= 1:
+            cls.show_threads.add(thread_id)
+
+        def redraw(_: Any) -> None:
+            cls.show_threads.clear()
+            cls.show_threads.add(thread_id)
+            js.jQuery(".thread-selector").prop("checked", False)
+            js.jQuery(f"#toggle-{thread_id}").prop("checked", True)
+            canvas.redraw()
+
+        js.jQuery(".flamegraph-container").append(
+            (
+                js.jQuery("<input>")
+                .addClass("thread-selector")
+                .prop("type", "checkbox")
+                .prop("checked", "" if len(cls.thread_index) > 1 else "checked")
+                .attr("id", f"toggle-{thread_id}")
+                .attr("threadId", thread_id)
+                .css(
+                    "top",
+                    canvas.offset_y + 227 + 60 * cls.thread_index[thread_id],
+                )
+                .on("click", ltk.proxy(redraw))
+            ),
+            js.jQuery("#timelineCanvas"),
+        )
 
     def calculate(self) -> None:
         """Calculate the call's position and size."""
@@ -85,44 +160,36 @@ class CallView(View):
         name = self.model.call_site.name
         return name.endswith("<module>")
 
+    @staticmethod
+    def get_search_text(name: str) -> str:
+        """Return the text that span search queries match for a call site name."""
+        module_name, function_name = name.rsplit(".", 1) if "." in name else ("", name)
+        return f"import {module_name}" if function_name == "<module>" else name
+
     def get_full_name(self) -> str:
         """Return the full name for this call, with emoji if slow import."""
-        module_name, name = self.model.call_site.name.rsplit(".", 1)
-        if name == "<module>":
-            name = f"import {module_name}"
-        else:
-            name = self.model.call_site.name
-        return f"😡 {name}" if self.slow_import() else name
+        return get_full_name(self.model)
 
     def get_short_name(self) -> str:
         """Return a short name for this call, with emoji if slow import."""
-        parts = self.model.call_site.name.split(".")
-        name = parts[-1]
-        if name in ("__init__", "<module>"):
-            name = parts[-2] or parts[-3]
-        return f"😡 {name}" if self.slow_import() else name
+        return get_short_name(self.model)
 
     def slow_import(self) -> bool:
         """Return True if this is a slow import call."""
-        return self.model.depth > 0 and self.model.duration > 0.1 and self.is_import()
+        return is_slow_import(self.model)
 
     def get_label(self) -> str:
         """Return a label for this call based on width."""
-        w = CallView.canvas.to_screen_dimension(self.w)
-        if w > 300:
-            return f"{self.get_full_name()} (at {self.model.when:0.2f} " \
-                f"duration: {self.model.duration:0.2f}s)"
-        elif w > 200:
-            return f"{self.get_short_name()} (at {self.model.when:0.2f} " \
-                f"duration: {self.model.duration:0.2f}s)"
-        else:
-            return self.get_short_name()
+        return get_label(self.model, CallView.canvas.to_screen_dimension(self.w))
 
     @classmethod
     def reset(cls) -> None:
-        """Reset all CallView instances and thread selectors."""
-        CallView.instances.clear()
+        """Reset the table of calls, their views, and the thread selectors."""
+        CallView.views.clear()
+        CallView.table.clear()
         CallView.selected = None
+        CallView.search_matcher.clear()
+        CallView.similar_calls.clear()
         cls.thread_index = {}
         js.jQuery(".thread-selector").remove()
 
@@ -164,71 +231,98 @@ class CallView(View):
             thread = threads.eq(index)
             thread.css("top", canvas.offset_y + 227 + 60 * index)
 
-    def matches(self, query: Any) -> bool:
+    def matches(self, query: str) -> bool:
         """Return True if this call matches the search query."""
-        if not query:
-            return True
-        return re.search(query, self.get_full_name().lower()) is not None
+        return CallView.search_matcher.matches(query, self.match_index)
 
     @classmethod
-    def draw_all(cls, canvas: Canvas, calls: list["CallView"]) -> None:
-        """Draw all CallView instances on the canvas."""
-        query = re.compile(js.jQuery(".span-search").val().lower())
-        canvas.clear("#222")
-        canvas.fill_rects(
-            (
-                call.x,
-                call.y,
-                call.w,
-                call.h,
-                call.color if call.matches(query) else "#333",
-            )
-            for call in calls
-            if canvas.to_screen_dimension(call.w) > cls.min_width
-            and call.thread_id in cls.show_threads
-        )
+    def draw_all(cls, canvas: Canvas, indexes: Iterable[int], clear: bool = True) -> None:
+        """
+        Draw the calls at the given indexes of CallView.table, straight from
+        its columns. The caller selects the calls of the shown threads.
+        """
+        bitmap = cls.search_matcher.get_bitmap(js.jQuery(".span-search").val())
+        if clear:
+            canvas.clear("#222")
+        min_width = canvas.from_screen_dimension(cls.min_width)
+        pixels_per_second = config.PIXELS_PER_SECOND
+        line_height = config.LINE_HEIGHT
+        scale_x = canvas.scale_x
+        table = cls.table
+        when, duration, depth, name = table.when, table.duration, table.depth, table.name
+        colors_by_name, matches_by_name, models = table.colors, table.matches, table.models
+        boxes = []
+        for index in indexes:
+            w = duration[index] * pixels_per_second
+            if w > min_width:
+                name_id = name[index]
+                match = bitmap[matches_by_name[name_id]]
+                boxes.append((
+                    when[index] * pixels_per_second,
+                    depth[index] * line_height,
+                    w,
+                    line_height,
+                    colors_by_name[name_id] if match else "#333",
+                    get_label(models[index], w * scale_x),
+                    "#111" if match else "#999",
+                ))
+        cls.draw_boxes(canvas, boxes)
+        cls.draw_decorations()
+
+    @classmethod
+    def draw_blocks(cls, canvas: Canvas, blocks: list[tiles.Block], clear: bool = True) -> None:
+        """
+        Draw the blocks of a level of detail, see microlog.tiles, instead of
+        the calls themselves. Merged runs of sub-pixel calls are drawn as one
+        box, in the color of their function when they all share the same one.
+        """
+        query = js.jQuery(".span-search").val()
+        if clear:
+            canvas.clear("#222")
+        min_width = canvas.from_screen_dimension(cls.min_width)
+        pixels_per_second = config.PIXELS_PER_SECOND
+        line_height = config.LINE_HEIGHT
+        boxes = []
+        for block in blocks:
+            w = block.duration * pixels_per_second
+            if w > min_width and block.thread_id in cls.show_threads:
+                match = bool(block.name) and cls.search_matcher.matches(
+                    query, cls.search_matcher.add(block.name, cls.get_search_text(block.name))
+                )
+                boxes.append((
+                    block.when * pixels_per_second,
+                    block.depth * line_height,
+                    w,
+                    line_height,
+                    colors.get_color(block.name) if match else "#333",
+                    block.name.rsplit(".", 1)[-1] if block.count == 1 else f"{block.count} calls",
+                    "#111" if match else "#999",
+                ))
+        cls.draw_boxes(canvas, boxes)
+        cls.draw_decorations()
+
+    @classmethod
+    def draw_boxes(
+        cls, canvas: Canvas, boxes: list[tuple[float, float, float, float, str, str, str]]
+    ) -> None:
+        """Draw boxes with their labels and separator lines, in a single batch per kind."""
         dx = canvas.from_screen_dimension(4)
+        canvas.fill_rects((x, y, w, h, color) for x, y, w, h, color, _, _ in boxes)
         canvas.texts(
             [
-                (
-                    call.x + dx,
-                    call.y + call.h - 8,
-                    call.get_label(),
-                    "#111" if call.matches(query) else "#999",
-                    call.w - 2 * dx,
-                )
-                for call in calls
-                if canvas.to_screen_dimension(call.w) > cls.min_width
-                and call.thread_id in cls.show_threads
+                (x + dx, y + h - 8, label, text_color, w - 2 * dx)
+                for x, y, w, h, _, label, text_color in boxes
             ],
             config.FONT_REGULAR,
         )
+        canvas.lines([(x, y, x, y + h) for x, y, w, h, _, _, _ in boxes], 1, "gray")
+        canvas.lines([(x, y + h, x + w, y + h) for x, y, w, h, _, _, _ in boxes], 1, "gray")
+
+    @classmethod
+    def draw_decorations(cls) -> None:
+        """Draw the selected call and update the thread selectors after drawing calls."""
         if js.jQuery(".thread-selector").length < 2:
             js.jQuery(".thread-selector").css("display", "none")
-        canvas.lines(
-            itertools.chain(
-                [
-                    (call.x, call.y, call.x, call.y + call.h)
-                    for call in calls
-                    if canvas.to_screen_dimension(call.w) > cls.min_width
-                    and call.thread_id in cls.show_threads
-                ]
-            ),
-            1,
-            "gray",
-        )
-        canvas.lines(
-            itertools.chain(
-                [
-                    (call.x, call.y + call.h, call.x + call.w, call.y + call.h)
-                    for call in calls
-                    if canvas.to_screen_dimension(call.w) > cls.min_width
-                    and call.thread_id in cls.show_threads
-                ]
-            ),
-            1,
-            "gray",
-        )
         if cls.selected:
             cls.selected.draw("red", "white")
         js.jQuery(".py-error").on(
@@ -284,16 +378,10 @@ class CallView(View):
             return
         CallView.selected = self
         CallView.canvas.redraw()
-        similar = [call for call in CallView.instances if self.is_similar(call)]
-        total = sum(call.duration for call in similar)
+        group = CallView.similar_calls.get(self.get_group_key())
+        total = group.total
         percentage = min(100, total / status.StatusView.last_when * 100)
-        print(percentage, len(CallView.instances), len(similar))
-        average = total / len(similar) if similar else 0
-        anomalies = [
-            call
-            for call in similar
-            if call.duration - average > 0.1 and call.duration / average > 1.3
-        ]
+        average = group.mean
         cpu = self.get_cpu()
         details_id = f"call-details-{id(self)}"
         name = sanitize(self.model.call_site.name).replace("..", ".")
@@ -309,9 +397,9 @@ class CallView(View):
                 if self.slow_import() else "",
                 f"""This {kind} at {self.model.when:.3f}s took {self.model.duration:.3f}s.<br>""",
             ] + ([
-                f"""Total duration: {total:.3f}s for {len(similar)} {kind}s.<br>""",
-                f"""Average duration: {average:.3f}s.<br>"""
-            ] if len(similar) > 1 else [
+                f"""Total duration: {total:.3f}s for {group.count} {kind}s.<br>""",
+                f"""Average duration: {average:.3f}s ± {group.stddev:.3f}s.<br>"""
+            ] if group.count > 1 else [
             ]) + [
                 f"""Time spent inside this {kind} is {percentage:.2f}% of total.<br>""",
                 f"""During this {kind}, {self.module_count()} modules were loaded.<br>""",
@@ -320,17 +408,7 @@ class CallView(View):
                 """loading details...</span></div>""",
             ]),
         )
-        if len(similar) > 1000:
-            js.setTimeout(
-                ltk.proxy(
-                    lambda: self.add_similar_calls(
-                        f"#{details_id}", cpu, similar, anomalies
-                    )
-                ),
-                1,
-            )
-        else:
-            self.add_similar_calls(f"#{details_id}", cpu, similar, anomalies)
+        self.add_similar_calls(f"#{details_id}", cpu, group)
 
         js.jQuery(".call-index").click(
             ltk.proxy(
@@ -341,7 +419,7 @@ class CallView(View):
 
     def highlight_call(self, link: Any) -> None:
         """Highlight the call corresponding to the clicked link."""
-        CallView.selected = CallView.instances[int(link.attr("index"))]
+        CallView.selected = CallView.get(int(link.attr("index")))
         CallView.canvas.redraw()
 
     def mouseenter(self, x: float, y: float) -> None:
@@ -380,48 +458,44 @@ class CallView(View):
 
     def get_cpu(self) -> float:
         """Return average CPU usage during this call."""
-        stats = [
-            view
-            for view in status.StatusView.instances
-            if view.when >= self.model.when and view.when <= self.model.when + self.model.duration
-        ]
-        return sum(stat.cpu for stat in stats) / len(stats) if stats else 0
-
-    def is_anomaly(self, call: "CallView", anomalies: list["CallView"]) -> bool:
-        """Return True if the call is in the anomalies list."""
-        for anomaly in anomalies:
-            if call is anomaly:
-                return True
-        return False
-
-    def get_all_calls(self, similar: list["CallView"], anomalies: list["CallView"]) -> str:
-        """Return HTML for all similar calls and their durations."""
-        max_duration = max(call.duration for call in similar)
-
-        def color(call: "CallView") -> str:
-            return "red" if self.is_anomaly(call, anomalies) else "green"
+        return status.StatusView.sample_index.mean(
+            "cpu", self.model.when, self.model.when + self.model.duration
+        )
+
+    def get_all_calls(self, group: groups.Group) -> str:
+        """
+        Return HTML for the slowest similar calls and their durations,
+        slowest first. All anomalies are shown, and the other calls only up
+        to MAX_SIMILAR_CALLS, so popups stay fast for frequent calls.
+        """
+        slowest = group.get_slowest(max(MAX_SIMILAR_CALLS, group.count_anomalies()))
+        more = group.count - len(slowest)
+        max_duration = group.durations[-1] or 1
+        models = CallView.table.models
+
+        def color(call: Call) -> str:
+            return "red" if group.is_anomaly(call.duration) else "green"
 
         return "".join(
             [
                 f"""<tr>
-                <td class="td-number"><a class="call-index" index={call.index} href=#>
-                    {call.when:.3f}s</a>
+                <td class="td-number"><a class="call-index" index={index} href=#>
+                    {models[index].when:.3f}s</a>
                 </td>
-                <td class="td-number">{call.duration:.3f}s</td>
+                <td class="td-number">{models[index].duration:.3f}s</td>
                 <td><div style=
-                    "background: {color(call)};
-                     height: 12px;width:{call.duration * 150 / max_duration}px
+                    "background: {color(models[index])};
+                     height: 12px;width:{models[index].duration * 150 / max_duration}px
                     "></div></td>
             </tr>"""
-                for call in sorted(similar, key=lambda call: -call.duration)
+                for index in slowest
             ]
+            + ([f"""<tr><td colspan=3 style="color:gray">{more} more</td></tr>"""] if more else [])
         )
 
-    def get_similar_call_html(
-        self, similar: list["CallView"], anomalies: list["CallView"]
-    ) -> str:
+    def get_similar_call_html(self, group: groups.Group) -> str:
         """Return HTML for the list of similar calls."""
-        return f"""<br>This function is called {len(similar)} times:
+        return f"""<br>This function is called {group.count} times:
             <div style="
                 height: 300px;
                 overflow-y: auto;
@@ -431,37 +505,35 @@ class CallView(View):
                         <td style="text-align: right"><b>When</b></td>
                         <td style="text-align: right"><b>&nbsp;&nbsp;Time</b></td>
                 </hr>
-                {self.get_all_calls(similar, anomalies)}
+                {self.get_all_calls(group)}
                 </table>
             </div>
         """
 
-    def get_anomalies_html(self, _cpu: float, anomalies: list["CallView"]) -> str:
+    def get_anomalies_html(self, _cpu: float, group: groups.Group) -> str:
         """Return HTML for the list of anomalies."""
-        anomaly = "is an anomaly" if self.is_anomaly(self, anomalies) else "looks average"
+        anomaly = "is an anomaly" if group.is_anomaly(self.duration) else "looks average"
         return f"""
             <br>
             <img src="data:image/webp;base64,UklGRiIOAABXRUJQVlA4WAoAAAAwAAAAHwAAHwAASUNDUNALAAAAAAvQAAAAAAIAAABtbnRyUkdCIFhZWiAH3wACAA8AAAAAAABhY3NwAAAAAAAAAAAAAAAAAAAAAAAAAAEAAAAAAAAAAAAA9tYAAQAAAADTLQAAAAA9DrLerpOXvptnJs6MCkPOAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAABBkZXNjAAABRAAAAGNiWFlaAAABqAAAABRiVFJDAAABvAAACAxnVFJDAAABvAAACAxyVFJDAAABvAAACAxkbWRkAAAJyAAAAIhnWFlaAAAKUAAAABRsdW1pAAAKZAAAABRtZWFzAAAKeAAAACRia3B0AAAKnAAAABRyWFlaAAAKsAAAABR0ZWNoAAAKxAAAAAx2dWVkAAAK0AAAAId3dHB0AAALWAAAABRjcHJ0AAALbAAAADdjaGFkAAALpAAAACxkZXNjAAAAAAAAAAlzUkdCMjAxNAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAWFlaIAAAAAAAACSgAAAPhAAAts9jdXJ2AAAAAAAABAAAAAAFAAoADwAUABkAHgAjACgALQAyADcAOwBAAEUASgBPAFQAWQBeAGMAaABtAHIAdwB8AIEAhgCLAJAAlQCaAJ8ApACpAK4AsgC3ALwAwQDGAMsA0ADVANsA4ADlAOsA8AD2APsBAQEHAQ0BEwEZAR8BJQErATIBOAE+AUUBTAFSAVkBYAFnAW4BdQF8AYMBiwGSAZoBoQGpAbEBuQHBAckB0QHZAeEB6QHyAfoCAwIMAhQCHQImAi8COAJBAksCVAJdAmcCcQJ6AoQCjgKYAqICrAK2AsECywLVAuAC6wL1AwADCwMWAyEDLQM4A0MDTwNaA2YDcgN+A4oDlgOiA64DugPHA9MD4APsA/kEBgQTBCAELQQ7BEgEVQRjBHEEfgSMBJoEqAS2BMQE0wThBPAE/gUNBRwFKwU6BUkFWAVnBXcFhgWWBaYFtQXFBdUF5QX2BgYGFgYnBjcGSAZZBmoGewaMBp0GrwbABtEG4wb1BwcHGQcrBz0HTwdhB3QHhgeZB6wHvwfSB+UH+AgLCB8IMghGCFoIbgiCCJYIqgi+CNII5wj7CRAJJQk6CU8JZAl5CY8JpAm6Cc8J5Qn7ChEKJwo9ClQKagqBCpgKrgrFCtwK8wsLCyILOQtRC2kLgAuYC7ALyAvhC/kMEgwqDEMMXAx1DI4MpwzADNkM8w0NDSYNQA1aDXQNjg2pDcMN3g34DhMOLg5JDmQOfw6bDrYO0g7uDwkPJQ9BD14Peg+WD7MPzw/sEAkQJhBDEGEQfhCbELkQ1xD1ERMRMRFPEW0RjBGqEckR6BIHEiYSRRJkEoQSoxLDEuMTAxMjE0MTYxODE6QTxRPlFAYUJxRJFGoUixStFM4U8BUSFTQVVhV4FZsVvRXgFgMWJhZJFmwWjxayFtYW+hcdF0EXZReJF64X0hf3GBsYQBhlGIoYrxjVGPoZIBlFGWsZkRm3Gd0aBBoqGlEadxqeGsUa7BsUGzsbYxuKG7Ib2hwCHCocUhx7HKMczBz1HR4dRx1wHZkdwx3sHhYeQB5qHpQevh7pHxMfPh9pH5Qfvx/qIBUgQSBsIJggxCDwIRwhSCF1IaEhziH7IiciVSKCIq8i3SMKIzgjZiOUI8Ij8CQfJE0kfCSrJNolCSU4JWgllyXHJfcmJyZXJocmtyboJxgnSSd6J6sn3CgNKD8ocSiiKNQpBik4KWspnSnQKgIqNSpoKpsqzysCKzYraSudK9EsBSw5LG4soizXLQwtQS12Last4S4WLkwugi63Lu4vJC9aL5Evxy/+MDUwbDCkMNsxEjFKMYIxujHyMioyYzKbMtQzDTNGM38zuDPxNCs0ZTSeNNg1EzVNNYc1wjX9Njc2cjauNuk3JDdgN5w31zgUOFA4jDjIOQU5Qjl/Obw5+To2OnQ6sjrvOy07azuqO+g8JzxlPKQ84z0iPWE9oT3gPiA+YD6gPuA/IT9hP6I/4kAjQGRApkDnQSlBakGsQe5CMEJyQrVC90M6Q31DwEQDREdEikTORRJFVUWaRd5GIkZnRqtG8Ec1R3tHwEgFSEtIkUjXSR1JY0mpSfBKN0p9SsRLDEtTS5pL4kwqTHJMuk0CTUpNk03cTiVObk63TwBPSU+TT91QJ1BxULtRBlFQUZtR5lIxUnxSx1MTU19TqlP2VEJUj1TbVShVdVXCVg9WXFapVvdXRFeSV+BYL1h9WMtZGllpWbhaB1pWWqZa9VtFW5Vb5Vw1XIZc1l0nXXhdyV4aXmxevV8PX2Ffs2AFYFdgqmD8YU9homH1YklinGLwY0Njl2PrZEBklGTpZT1lkmXnZj1mkmboZz1nk2fpaD9olmjsaUNpmmnxakhqn2r3a09rp2v/bFdsr20IbWBtuW4SbmtuxG8eb3hv0XArcIZw4HE6cZVx8HJLcqZzAXNdc7h0FHRwdMx1KHWFdeF2Pnabdvh3VnezeBF4bnjMeSp5iXnnekZ6pXsEe2N7wnwhfIF84X1BfaF+AX5ifsJ/I3+Ef+WAR4CogQqBa4HNgjCCkoL0g1eDuoQdhICE44VHhauGDoZyhteHO4efiASIaYjOiTOJmYn+imSKyoswi5aL/IxjjMqNMY2Yjf+OZo7OjzaPnpAGkG6Q1pE/kaiSEZJ6kuOTTZO2lCCUipT0lV+VyZY0lp+XCpd1l+CYTJi4mSSZkJn8mmia1ZtCm6+cHJyJnPedZJ3SnkCerp8dn4uf+qBpoNihR6G2oiailqMGo3aj5qRWpMelOKWpphqmi6b9p26n4KhSqMSpN6mpqhyqj6sCq3Wr6axcrNCtRK24ri2uoa8Wr4uwALB1sOqxYLHWskuywrM4s660JbSctRO1irYBtnm28Ldot+C4WbjRuUq5wro7urW7LrunvCG8m70VvY++Cr6Evv+/er/1wHDA7MFnwePCX8Lbw1jD1MRRxM7FS8XIxkbGw8dBx7/IPci8yTrJuco4yrfLNsu2zDXMtc01zbXONs62zzfPuNA50LrRPNG+0j/SwdNE08bUSdTL1U7V0dZV1tjXXNfg2GTY6Nls2fHadtr724DcBdyK3RDdlt4c3qLfKd+v4DbgveFE4cziU+Lb42Pj6+Rz5PzlhOYN5pbnH+ep6DLovOlG6dDqW+rl63Dr++yG7RHtnO4o7rTvQO/M8Fjw5fFy8f/yjPMZ86f0NPTC9VD13vZt9vv3ivgZ+Kj5OPnH+lf65/t3/Af8mP0p/br+S/7c/23//2Rlc2MAAAAAAAAALklFQyA2MTk2Ni0yLTEgRGVmYXVsdCBSR0IgQ29sb3VyIFNwYWNlIC0gc1JHQgAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAABYWVogAAAAAAAAYpkAALeFAAAY2lhZWiAAAAAAAAAAAABQAAAAAAAAbWVhcwAAAAAAAAABAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAACWFlaIAAAAAAAAACeAAAApAAAAIdYWVogAAAAAAAAb6IAADj1AAADkHNpZyAAAAAAQ1JUIGRlc2MAAAAAAAAALVJlZmVyZW5jZSBWaWV3aW5nIENvbmRpdGlvbiBpbiBJRUMgNjE5NjYtMi0xAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAABYWVogAAAAAAAA9tYAAQAAAADTLXRleHQAAAAAQ29weXJpZ2h0IEludGVybmF0aW9uYWwgQ29sb3IgQ29uc29ydGl1bSwgMjAxNQAAc2YzMgAAAAAAAQxEAAAF3///8yYAAAeUAAD9j///+6H///2iAAAD2wAAwHVWUDhMLAIAAC8fwAcQGrjRtjdS+nApNACxtwW4HrwpBSqAywkZIu95D4pi9UtLBSrgI90bYXPvPTvjqLZtN1GSIiCRkIWA3sFBl5EZCz3xAFHAnMWw97YdN5KkyHFTlhmO78l817GSGEkgAMa2bdu2bdu2bdu2bfxs1bZtuzcB8ZQDGXiBd5EPOMI3+A4uuQA9rAMEW8CQB/jAbwn+gH8OwAR7kgSHwBIOQuCvqiAJ/kF4MGCDE2n99EMhwTngCAUxD2m+OKGr3eFsrjghwX+IDwRccEnb9z8GRgPqggT1QYK+QY+t2x8JrgBPGEhRKjoaHRrjBGVbtcXa8YckSA8C/HBdqehodijLtlqLteMPSXALBENAjiyC/AAgAndtcB/E/KBENkGFF0jBIx94AjI+UCMfQQMQ2kAenvnBC1AyARG0APwEHUBkATV45ehodCjLtmoLB7wBDQOQQI+yd1+BoemMWm1wPGP3GVA2DHy7QAfeOdLS9onRfI+xfI+/5IAPoO8AUhiR+9iCgx8c/AJ/csM4kGWBMXxyVUGlvGNkscLIfIWF9Q3JBZ/BLAMoYEbOdNPb71EXJKgPEnR3eqwefkgOwTxQngAr+GpY2X/QWqlRli1ZheXdB4Y3sI0xAhUsy3jwDcyujmhOczQlOaaWB+x/AjLCGtDECI7ww5J2nn9UyhsWNzfsPP5IFvgJLvEWBmU/suBRdhgFongPv+A//At+Cb+hOEagBXPwAs/gtQLoYv4=">
             <br>
-            Microlog detected {len(anomalies)} anomalies.<br>
+            Microlog detected {group.count_anomalies()} anomalies.<br>
             The current call {anomaly}.<br>
         """
 
-    def add_similar_calls(
-        self,
-        details_id: str,
-        cpu: float,
-        similar: list["CallView"],
-        anomalies: list["CallView"],
-    ) -> None:
+    def add_similar_calls(self, details_id: str, cpu: float, group: groups.Group) -> None:
         """Add HTML for similar calls and anomalies to the dialog."""
         parts = []
-        if len(anomalies) > 1:
-            parts.append(self.get_anomalies_html(cpu, anomalies))
-        if len(similar) > 1:
-            parts.append(self.get_similar_call_html(similar, anomalies))
+        if group.count_anomalies() > 1:
+            parts.append(self.get_anomalies_html(cpu, group))
+        if group.count > 1:
+            parts.append(self.get_similar_call_html(group))
         js.jQuery(details_id).html("".join(parts))
 
+    def get_group_key(self) -> tuple[Any, Any]:
+        """Return the key of the group of calls that are similar to this one."""
+        return self.model.call_site, self.model.caller_site
+
     def is_similar(self, other: "CallView") -> bool:
         """Check if another CallView is similar to this one."""
         return (
@@ -14,6 +14,7 @@ import microlog.api as api
 import microlog.config as main_config
 from microlog.dashboard import config
 from microlog.dashboard import markdown
+from microlog.dashboard import matcher
 from microlog.dashboard.dialog import dialog
 from microlog.dashboard.views import View
 from microlog.models import CALLSITE_UNKNOWN
@@ -50,6 +51,7 @@ class MarkerView(View):
         main_config.EVENT_KIND_INFO: 0,
         main_config.EVENT_KIND_ERROR: 36
     }
+    search_matcher: matcher.Matcher = matcher.Matcher(matcher.compile_substring)
     names: dict[int, str] = {
         logging.INFO: "INFO",
         logging.WARN: "WARN",
@@ -81,12 +83,14 @@ class MarkerView(View):
         self.h = self.canvas.from_screen_dimension(self.radius)
         self.index: int = len(MarkerView.instances)
         self.call_site: CallSite = CALLSITE_UNKNOWN
+        self.match_index: int | None = None
         MarkerView.instances.append(self)
 
     @classmethod
     def reset(cls) -> None:
         """Reset all MarkerView instances."""
         MarkerView.instances.clear()
+        MarkerView.search_matcher.clear()
 
     @classmethod
     def draw_all(cls, _canvas: Any, markers: list["MarkerView"]) -> None:
@@ -122,12 +126,13 @@ class MarkerView(View):
         """Return True if the marker matches the search query."""
         if not query:
             return True
-        query = query.lower()
-        return (
-            query in self.message.lower()
-            or query in self.get_short_name().lower()
-            or any(query in call_site.name.lower() for call_site in self.stack)
-        )
+        if self.match_index is None:
+            self.match_index = MarkerView.search_matcher.add(self.index, "\n".join([
+                self.message,
+                self.get_short_name(),
+                *(call_site.name for call_site in self.stack),
+            ]))
+        return MarkerView.search_matcher.matches(query, self.match_index)
 
     def draw(self, query: str | None = None) -> None:
         """Draw this marker on the canvas."""
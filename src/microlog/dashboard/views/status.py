@@ -11,31 +11,45 @@ from typing import Sequence
 import ltk
 
 from microlog.dashboard import config
+from microlog.dashboard import downsample
+from microlog.dashboard import samples
 from microlog.dashboard.canvas import Canvas
 from microlog.dashboard.views import View
 from microlog.models import Status
 from microlog.models import to_gb
 
+Series = tuple[Sequence[float], Sequence[float]]
+
 
 class StatusView(View):
     """A visual representation of a system status sample in the dashboard."""
 
     instances: list["StatusView"] = []
     last_when: float = 0.0
+    sample_index: samples.SampleIndex = samples.SampleIndex(("cpu", "memory"))
+    downsampler: downsample.Downsampler = downsample.Downsampler(
+        ("cpu", "memory", "module_count", "object_count")
+    )
 
     def __init__(self, canvas: Canvas, model: Status) -> None:
         """Initialize a StatusView instance."""
         self.model: Status = model
         View.__init__(self, canvas)
         self.h: float = config.STATS_HEIGHT
-        self.previous: StatusView | None = None
+        self.previous: StatusView | None = (
+            StatusView.instances[-1] if StatusView.instances else None
+        )
         StatusView.instances.append(self)
+        StatusView.sample_index.add(model.when, self)
+        StatusView.downsampler.add(model.when, model)
         StatusView.last_when = max(model.when, StatusView.last_when)
 
     @classmethod
     def reset(cls) -> None:
         """Reset all StatusView instances and hide the summary."""
         StatusView.instances.clear()
+        StatusView.sample_index.clear()
+        StatusView.downsampler.clear()
         ltk.find("#summary").css("display", "none")
 
     def inside(self, x: float, y: float) -> bool:
@@ -47,76 +61,56 @@ class StatusView(View):
         )
 
     @classmethod
-    def draw_all(cls, canvas: Canvas, views: list["StatusView"]) -> None:
-        """Draw all status views on the canvas."""
-        if views:
+    def draw_all(cls, canvas: Canvas, series: downsample.Series) -> None:
+        """Draw the downsampled status series, see microlog.dashboard.downsample, on the canvas."""
+        if series and series["cpu"][0]:
             canvas.clear("#222")
             query = ltk.find(".span-search").val().lower()
-            cls.draw_cpu(canvas, views, query)
-            cls.draw_memory(canvas, views, query)
-            cls.draw_modules(canvas, views, query)
-            cls.draw_object_counts(canvas, views, query)
-            previous = None
-            for view in views:
-                view.previous = previous
-                previous = view
+            cls.draw_cpu(canvas, series["cpu"], query)
+            cls.draw_memory(canvas, series["memory"], query)
+            cls.draw_modules(canvas, series["module_count"], query)
+            cls.draw_object_counts(canvas, series["object_count"], query)
 
     @classmethod
-    def draw_modules(
-        cls, canvas: Canvas, views: list["StatusView"], query: str
-    ) -> None:
+    def draw_modules(cls, canvas: Canvas, series: Series, query: str) -> None:
         """Draw the modules count polygon on the canvas."""
-        max_module_count = max(view.module_count for view in views)
-        points = cls.get_points(
-            views, lambda status: status.module_count, max_module_count, 20
-        )
+        points = cls.get_points(series, lambda value: value, max(series[1]), 20)
         canvas.polygon(points, 2, "#555" if query else "#f6ff00AA")
 
     @classmethod
-    def draw_memory(
-        cls, canvas: Canvas, views: list["StatusView"], query: str
-    ) -> None:
+    def draw_memory(cls, canvas: Canvas, series: Series, query: str) -> None:
         """Draw the memory usage polygon on the canvas."""
-        max_memory = max(view.memory for view in views)
-        points = cls.get_points(views, lambda status: status.memory, max_memory, 10)
+        points = cls.get_points(series, lambda value: value, max(series[1]), 10)
         canvas.polygon(points, 3, "#555" if query else "#DD0000AA")
 
     @classmethod
-    def draw_cpu(
-        cls, canvas: Canvas, views: list["StatusView"], query: str
-    ) -> None:
+    def draw_cpu(cls, canvas: Canvas, series: Series, query: str) -> None:
         """Draw the CPU usage polygon on the canvas."""
-        line_points = cls.get_points(
-            views, lambda status: 1.1 * (status.cpu - 10), 100, 5
-        )
+        line_points = cls.get_points(series, lambda value: 1.1 * (value - 10), 100, 5)
         canvas.polygon(line_points, 1, "#555" if query else "#549f56")
 
     @classmethod
-    def draw_object_counts(
-        cls, canvas: Canvas, views: Sequence["StatusView"], query: str
-    ) -> None:
+    def draw_object_counts(cls, canvas: Canvas, series: Series, query: str) -> None:
         """Draw the object count polygon on the canvas."""
-        max_object_count = 2 * max(view.object_count for view in views)
-        line_points = cls.get_points(
-            views, lambda status: status.object_count, max_object_count, 5
-        )
+        line_points = cls.get_points(series, lambda value: value, 2 * max(series[1]), 5)
         canvas.polygon(line_points, 1, "#555" if query else "#f8f8f8")
 
     @classmethod
     def get_points(
         cls,
-        views: Sequence["StatusView"],
-        get_value: Callable[["StatusView"], float],
+        series: Series,
+        get_value: Callable[[float], float],
         max_value: float,
         offset: int,
     ) -> Sequence[tuple[int, int]]:
-        """Calculate polygon points for a given metric."""
+        """Calculate polygon points for a series of (times, values)."""
         height = config.STATS_HEIGHT
         max_y = config.STATS_OFFSET_Y + config.STATS_HEIGHT
+        pixels_per_second = config.PIXELS_PER_SECOND
         points: list[tuple[int, int]] = []
-        for status in views:
-            x = round(status.x)
-            y = round(max_y - get_value(status) * (height - offset * 2) / (max_value + 1) - 5)
+        for when, value in zip(*series):
+            x = round(when * pixels_per_second)
+            y = round(max_y - get_value(value) * (height - offset * 2) / (max_value + 1) - 5)
             if len(points) > 2 and points[-1][1] == points[-2][1] == y:
                 points.pop()
             points.append((x, y))
@@ -125,13 +119,7 @@ class StatusView(View):
     @classmethod
     def get_status_at(cls, when: float) -> "StatusView" | None:
         """Get the StatusView instance closest to the given time."""
-        previous = None
-        for view in cls.instances:
-            status = view.model
-            if status.when > when:
-                return previous or view
-            previous = view
-        return None
+        return cls.sample_index.get_at(when)
 
     def offscreen(self, scale_x: float, offset_x: float, width: float) -> bool:
         """Return True if this status is offscreen given the current scale and offset."""
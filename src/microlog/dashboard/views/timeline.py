@@ -88,6 +88,13 @@ class Timeline:
             if canvas.to_screen_x(x) >= canvas.width():
                 break
 
+    def draw_brush(self, canvas: Canvas, start: float, end: float) -> None:
+        """Shade the selected time range, in seconds, over the full height of a canvas."""
+        _, y, _, h = canvas.absolute(0, 0, 0, canvas.height())
+        x = start * config.PIXELS_PER_SECOND
+        w = (end - start) * config.PIXELS_PER_SECOND
+        canvas.fill_rect(x, y, w, h, config.BRUSH_COLOR)
+
     def clear(self, canvas: Canvas) -> None:
         """Clear the timeline area on the canvas."""
         x, _, w, _ = canvas.absolute(0, 0, canvas.width())
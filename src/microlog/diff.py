@@ -0,0 +1,141 @@
+#
+# Microlog. Copyright (c) 2023 laffra, dcharbon. All rights reserved.
+#
+"""
+Differential flamegraphs between two recordings.
+
+Both recordings are aggregated by stack path, see microlog.stacks, and the
+two tries are merged into a single tree of DiffNodes that holds the time
+of each stack path in the base and in the target recording. Usable headless
+from CI:
+
+    $ python -m microlog.diff my-app/before my-app/after --fail-above 5
+"""
+
+from __future__ import annotations
+
+import argparse
+import sys
+from typing import Any
+
+from microlog import stacks
+
+
+MIN_DURATION: float = 0.001
+
+
+class DiffNode:
+    """The time spent at one stack path in the base and the target recording."""
+
+    __slots__ = ("name", "base", "target", "base_self", "target_self", "children")
+
+    def __init__(self, name: str, base: float = 0.0, target: float = 0.0) -> None:
+        """Initialize a DiffNode instance."""
+        self.name: str = name
+        self.base: float = base
+        self.target: float = target
+        self.base_self: float = 0.0
+        self.target_self: float = 0.0
+        self.children: list[DiffNode] = []
+
+    @property
+    def delta(self) -> float:
+        """Return how much more time the target spent at this stack path."""
+        return self.target - self.base
+
+    @property
+    def self_delta(self) -> float:
+        """Return how much more time the target spent in this node, but not in its children."""
+        return self.target_self - self.base_self
+
+    def to_dict(self) -> dict[str, Any]:
+        """Return a JSON-friendly tree."""
+        return {
+            "name": self.name,
+            "base": round(self.base, 3),
+            "target": round(self.target, 3),
+            "children": [child.to_dict() for child in self.children],
+        }
+
+    def __repr__(self) -> str:
+        """Return a string representation of the DiffNode object."""
+        return f"<DiffNode {self.name} {self.base:.3f} => {self.target:.3f}>"
+
+
+def merge(
+    base: stacks.StackNode | None,
+    target: stacks.StackNode | None,
+    min_duration: float,
+) -> DiffNode:
+    """Merge the subtrees of the same stack path, leaving out paths below min_duration."""
+    name = (base or target).name  # type: ignore[union-attr]
+    node = DiffNode(name, base.total if base else 0.0, target.total if target else 0.0)
+    node.base_self = base.self_time if base else 0.0
+    node.target_self = target.self_time if target else 0.0
+    base_children = base.children if base else {}
+    target_children = target.children if target else {}
+    for child_name in sorted(set(base_children) | set(target_children)):
+        base_child = base_children.get(child_name)
+        target_child = target_children.get(child_name)
+        if max(
+            base_child.total if base_child else 0.0,
+            target_child.total if target_child else 0.0,
+        ) >= min_duration:
+            node.children.append(merge(base_child, target_child, min_duration))
+    return node
+
+
+def compare(
+    base: stacks.StackTrie, target: stacks.StackTrie, min_duration: float = MIN_DURATION
+) -> DiffNode:
+    """Compare two recordings by stack path."""
+    return merge(base.root, target.root, min_duration)
+
+
+def compare_recordings(base: str, target: str, min_duration: float = MIN_DURATION) -> DiffNode:
+    """Compare two stored recordings by stack path."""
+    return compare(stacks.get_trie(base), stacks.get_trie(target), min_duration)
+
+
+def top_changes(diff: DiffNode, count: int = 20) -> list[tuple[str, DiffNode]]:
+    """Return the stack paths whose self time changed most, as (path, node) pairs."""
+    changes: list[tuple[str, DiffNode]] = []
+    todo: list[tuple[str, DiffNode]] = [(child.name, child) for child in diff.children]
+    while todo:
+        path, node = todo.pop()
+        changes.append((path, node))
+        todo.extend((f"{path};{child.name}", child) for child in node.children)
+    changes.sort(key=lambda change: -abs(change[1].self_delta))
+    return changes[:count]
+
+
+def main() -> None:
+    """Print the largest changes between two recordings."""
+    parser = argparse.ArgumentParser(
+        prog="python -m microlog.diff",
+        description="Compare two recordings by stack path.",
+    )
+    parser.add_argument("base", help="the base recording, as <application>/<name>")
+    parser.add_argument("target", help="the target recording, as <application>/<name>")
+    parser.add_argument("--top", type=int, default=20, help="the number of changes to show")
+    parser.add_argument(
+        "--fail-above",
+        type=float,
+        default=None,
+        metavar="PERCENT",
+        help="exit with status 1 when the target is more than PERCENT slower",
+    )
+    args = parser.parse_args()
+    diff = compare_recordings(args.base, args.target)
+    change = diff.delta / diff.base * 100 if diff.base else 0.0
+    sys.stdout.write(f"Total: {diff.base:.3f}s => {diff.target:.3f}s ({change:+.1f}%)\n")
+    for path, node in top_changes(diff, args.top):
+        sys.stdout.write(
+            f"{node.self_delta:+9.3f}s  {node.base_self:9.3f}s => {node.target_self:9.3f}s  {path}\n"
+        )
+    if args.fail_above is not None and change > args.fail_above:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+#
+# Microlog. Copyright (c) 2023 laffra, dcharbon. All rights reserved.
+#
+"""
+Background jobs for slow server work, such as LLM analysis.
+
+A JobQueue runs a handler on background worker threads. Clients submit
+work with a key, receive a Job with an id right away, and poll the job
+until it is done. Submitting a key that is already queued, running, or
+recently done returns the existing job instead of doing the work twice.
+"""
+
+from __future__ import annotations
+
+from collections import OrderedDict
+import logging
+import queue
+import threading
+import time
+from typing import Any
+from typing import Callable
+import uuid
+
+
+MAX_JOBS: int = 1000
+
+QUEUED: str = "queued"
+RUNNING: str = "running"
+DONE: str = "done"
+FAILED: str = "failed"
+
+
+class Job:
+    """A unit of background work and its result."""
+
+    def __init__(self, key: str, argument: str) -> None:
+        """Initialize a queued Job."""
+        self.id: str = uuid.uuid4().hex
+        self.key: str = key
+        self.argument: str = argument
+        self.status: str = QUEUED
+        self.result: str = ""
+        self.created: float = time.time()
+        self.finished: float = 0.0
+
+    def is_pending(self) -> bool:
+        """Return True if the job is still queued or running."""
+        return self.status in (QUEUED, RUNNING)
+
+    def to_dict(self) -> dict[str, Any]:
+        """Return a JSON-friendly representation, without the argument."""
+        return {
+            "id": self.id,
+            "status": self.status,
+            "result": self.result,
+            "created": self.created,
+            "finished": self.finished,
+        }
+
+    def __repr__(self) -> str:
+        """Return a string representation of the Job object."""
+        return f"<Job {self.id} {self.status}>"
+
+
+class JobQueue:
+    """Runs jobs on background worker threads, deduplicating them by key."""
+
+    def __init__(
+        self,
+        handler: Callable[[str], str],
+        error_handler: Callable[[str, Exception], str] | None = None,
+        workers: int = 2,
+    ) -> None:
+        """Initialize a JobQueue. The workers start when the first job is submitted."""
+        self.handler: Callable[[str], str] = handler
+        self.error_handler: Callable[[str, Exception], str] | None = error_handler
+        self.worker_count: int = workers
+        self.workers: list[threading.Thread] = []
+        self.jobs: OrderedDict[str, Job] = OrderedDict()
+        self.keys: dict[str, Job] = {}
+        self.todo: queue.Queue[Job] = queue.Queue()
+        self.lock = threading.Lock()
+
+    def submit(self, key: str, argument: str) -> Job:
+        """Queue a job, or return the pending or completed job with the same key."""
+        with self.lock:
+            job = self.keys.get(key)
+            if job and job.status != FAILED:
+                return job
+            job = Job(key, argument)
+            self.jobs[job.id] = job
+            self.keys[key] = job
+            while len(self.jobs) > MAX_JOBS:
+                _, old_job = self.jobs.popitem(last=False)
+                if self.keys.get(old_job.key) is old_job:
+                    del self.keys[old_job.key]
+            if not self.workers:
+                self.workers = [
+                    threading.Thread(target=self.run, daemon=True)
+                    for _ in range(self.worker_count)
+                ]
+                for worker in self.workers:
+                    worker.start()
+        self.todo.put(job)
+        return job
+
+    def get(self, job_id: str) -> Job | None:
+        """Return a job by id, or None if it is unknown or expired."""
+        with self.lock:
+            return self.jobs.get(job_id)
+
+    def run(self) -> None:
+        """Run queued jobs, forever."""
+        while True:
+            self.run_job(self.todo.get())
+
+    def run_job(self, job: Job) -> None:
+        """Run a single job and record its result."""
+        job.status = RUNNING
+        try:
+            job.result = self.handler(job.argument)
+            job.status = DONE
+        except Exception as e:  # pylint: disable=broad-except
+            logging.error("Microlog: Job %s failed: %s", job.id, e)
+            job.result = self.error_handler(job.argument, e) if self.error_handler else str(e)
+            job.status = FAILED
+        job.finished = time.time()
@@ -0,0 +1,271 @@
+#
+# Microlog. Copyright (c) 2023 laffra, dcharbon. All rights reserved.
+#
+"""
+Self-instrumentation of the Microlog server.
+
+Request latencies, storage reads, cache hit rates, and catalog syncs are
+counted in memory and served at /metrics in the Prometheus text format:
+
+    $ curl http://localhost:8564/metrics
+    # HELP microlog_request_seconds Time spent handling HTTP requests.
+    # TYPE microlog_request_seconds histogram
+    microlog_request_seconds_bucket{route="/zip/",method="GET",le="0.005"} 3
+    ...
+
+With MICROLOG_SERVER_PROFILE=true, the server also records itself with the
+Microlog tracer, saving a new recording every MICROLOG_SERVER_PROFILE_INTERVAL
+seconds under the "microlog-server" application.
+"""
+
+from __future__ import annotations
+
+from contextlib import contextmanager
+import logging
+import threading
+import time
+from typing import Callable
+from typing import Iterator
+from typing import TypeVar
+
+
+LATENCY_BUCKETS: tuple[float, ...] = (
+    0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0,
+)
+
+ROUTES: tuple[str, ...] = (
+    "/", "/logs", "/zip/", "/aggregate/", "/tiles/", "/chunks/", "/live/",
+    "/search", "/regressions/", "/diff", "/stacks/", "/sandwich/", "/job/", "/analysis/",
+    "/retention", "/delete/", "/save/", "/upload/", "/metrics",
+)
+
+PROFILE_APPLICATION: str = "microlog-server"
+
+Metric = TypeVar("Metric", "Counter", "Gauge", "Histogram")
+
+
+def format_labels(names: tuple[str, ...], values: tuple[str, ...], extra: str = "") -> str:
+    """Format label names and values as a Prometheus label set."""
+    labels = [f'{name}="{value}"' for name, value in zip(names, values)]
+    if extra:
+        labels.append(extra)
+    return "{" + ",".join(labels) + "}" if labels else ""
+
+
+class Counter:
+    """A metric that only goes up, with a value per set of labels."""
+
+    kind: str = "counter"
+
+    def __init__(self, name: str, description: str, labels: tuple[str, ...] = ()) -> None:
+        """Initialize a Counter without any values."""
+        self.name: str = name
+        self.description: str = description
+        self.labels: tuple[str, ...] = labels
+        self.values: dict[tuple[str, ...], float] = {}
+        self.lock = threading.Lock()
+
+    def inc(self, *labels: str, amount: float = 1.0) -> None:
+        """Increment the value for the given labels."""
+        with self.lock:
+            self.values[labels] = self.values.get(labels, 0.0) + amount
+
+    def get(self, *labels: str) -> float:
+        """Return the value for the given labels."""
+        return self.values.get(labels, 0.0)
+
+    def render(self) -> list[str]:
+        """Return the lines of this metric in the Prometheus text format."""
+        with self.lock:
+            values = sorted(self.values.items())
+        return [
+            f"{self.name}{format_labels(self.labels, labels)} {value:g}"
+            for labels, value in values
+        ]
+
+
+class Gauge(Counter):
+    """A metric that can go up and down."""
+
+    kind: str = "gauge"
+
+    def set(self, value: float, *labels: str) -> None:
+        """Set the value for the given labels."""
+        with self.lock:
+            self.values[labels] = value
+
+
+class Histogram:
+    """A distribution of observed values, such as latencies, in cumulative buckets."""
+
+    kind: str = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        description: str,
+        labels: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = LATENCY_BUCKETS,
+    ) -> None:
+        """Initialize a Histogram without any observations."""
+        self.name: str = name
+        self.description: str = description
+        self.labels: tuple[str, ...] = labels
+        self.buckets: tuple[float, ...] = buckets
+        self.counts: dict[tuple[str, ...], list[int]] = {}
+        self.sums: dict[tuple[str, ...], float] = {}
+        self.lock = threading.Lock()
+
+    def observe(self, value: float, *labels: str) -> None:
+        """Add an observation for the given labels."""
+        with self.lock:
+            counts = self.counts.get(labels)
+            if counts is None:
+                counts = self.counts[labels] = [0] * (len(self.buckets) + 1)
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[index] += 1
+                    break
+            else:
+                counts[-1] += 1
+            self.sums[labels] = self.sums.get(labels, 0.0) + value
+
+    @contextmanager
+    def time(self, *labels: str) -> Iterator[None]:
+        """Observe the duration of a block of code."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, *labels)
+
+    def get_count(self, *labels: str) -> int:
+        """Return the number of observations for the given labels."""
+        return sum(self.counts.get(labels, []))
+
+    def render(self) -> list[str]:
+        """Return the lines of this metric in the Prometheus text format."""
+        lines = []
+        with self.lock:
+            series = sorted((labels, list(counts)) for labels, counts in self.counts.items())
+            sums = dict(self.sums)
+        for labels, counts in series:
+            total = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                total += count
+                le = "+Inf" if bound == float("inf") else f"{bound:g}"
+                bucket = format_labels(self.labels, labels, f'le="{le}"')
+                lines.append(f"{self.name}_bucket{bucket} {total}")
+            lines.append(f"{self.name}_sum{format_labels(self.labels, labels)} {sums[labels]:g}")
+            lines.append(f"{self.name}_count{format_labels(self.labels, labels)} {total}")
+        return lines
+
+
+class Registry:
+    """All metrics of the server, in the order they were created."""
+
+    def __init__(self) -> None:
+        """Initialize an empty Registry."""
+        self.metrics: list[Counter | Histogram] = []
+
+    def counter(self, name: str, description: str, labels: tuple[str, ...] = ()) -> Counter:
+        """Create and register a Counter."""
+        return self.add(Counter(name, description, labels))
+
+    def gauge(self, name: str, description: str, labels: tuple[str, ...] = ()) -> Gauge:
+        """Create and register a Gauge."""
+        return self.add(Gauge(name, description, labels))
+
+    def histogram(self, name: str, description: str, labels: tuple[str, ...] = ()) -> Histogram:
+        """Create and register a Histogram."""
+        return self.add(Histogram(name, description, labels))
+
+    def add(self, metric: Metric) -> Metric:
+        """Register a metric and return it."""
+        self.metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        """Return all metrics in the Prometheus text format."""
+        lines = []
+        for metric in self.metrics:
+            lines.append(f"# HELP {metric.name} {metric.description}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry: Registry = Registry()
+
+request_seconds: Histogram = registry.histogram(
+    "microlog_request_seconds", "Time spent handling HTTP requests.", ("route", "method")
+)
+storage_read_seconds: Histogram = registry.histogram(
+    "microlog_storage_read_seconds", "Time spent reading from storage.", ("kind",)
+)
+storage_read_bytes: Counter = registry.counter(
+    "microlog_storage_read_bytes_total", "Bytes read from storage.", ("kind",)
+)
+cache_requests: Counter = registry.counter(
+    "microlog_cache_requests_total", "Lookups in the server caches.", ("cache", "result")
+)
+catalog_sync_seconds: Histogram = registry.histogram(
+    "microlog_catalog_sync_seconds", "Time spent listing the recordings in storage."
+)
+catalog_recordings: Gauge = registry.gauge(
+    "microlog_catalog_recordings", "Number of recordings in the catalog."
+)
+
+
+def get_route(path: str) -> str:
+    """Return the route of a request path, keeping the number of label values small."""
+    path = path.split("?", 1)[0]
+    for route in sorted(ROUTES, key=len, reverse=True):
+        if path == route or route.endswith("/") and route != "/" and path.startswith(route):
+            return route
+    return "other"
+
+
+def cache_lookup(cache: str, hit: bool) -> None:
+    """Count a hit or a miss of one of the server caches."""
+    cache_requests.inc(cache, "hit" if hit else "miss")
+
+
+@contextmanager
+def storage_read(kind: str) -> Iterator[Callable[[int], None]]:
+    """Time a read from storage. The block reports the number of bytes it read."""
+    with storage_read_seconds.time(kind):
+        yield lambda size: storage_read_bytes.inc(kind, amount=size)
+
+
+class SelfProfiler(threading.Thread):
+    """Records the server with the Microlog tracer, in a new recording every interval."""
+
+    def __init__(self, interval: float, on_saved: Callable[[], None] | None = None) -> None:
+        """Initialize a SelfProfiler. Call start() to begin recording."""
+        threading.Thread.__init__(self)
+        self.daemon: bool = True
+        self.interval: float = interval
+        self.on_saved: Callable[[], None] | None = on_saved
+        self.stopping = threading.Event()
+
+    def run(self) -> None:
+        """Start a recording, save it after each interval, and start the next one."""
+        # delayed import, the tracer is only needed when the server profiles itself
+        from microlog import api  # pylint: disable=import-outside-toplevel
+        from microlog import models  # pylint: disable=import-outside-toplevel
+
+        while not self.stopping.is_set():
+            models.recording.clear()
+            api.start(PROFILE_APPLICATION)
+            self.stopping.wait(self.interval)
+            api.stop()
+            if self.on_saved:
+                try:
+                    self.on_saved()
+                except Exception as e:  # pylint: disable=broad-except
+                    logging.error("Microlog: Cannot rotate server recordings: %s", e)
+
+    def stop(self) -> None:
+        """Save the current recording and stop profiling."""
+        self.stopping.set()
@@ -25,59 +25,71 @@ function load_binary(url, callback) {
     xhr.send();
 }
 
-function optimizedDrawPolygon(context, color, lineWidth, coordinatesJson) {
-    const coordinates = JSON.parse(coordinatesJson)
-    context.beginPath();
-    context.strokeStyle = color
-    context.lineWidth = lineWidth
-    var n = 0
-    context.moveTo(coordinates[n], coordinates[n + 1])
-    for (; n < coordinates.length; n += 2) {
-        x = coordinates[n]
-        y = coordinates[n + 1]
-        context.lineTo(x, y)
+// The optimizedDraw functions receive Python arrays of 32-bit floats in screen
+// coordinates, and arrays of 16-bit palette indexes for their colors. They are
+// read in place through the buffer protocol, without copying or parsing.
+
+function withBuffers(arrays, formats, draw) {
+    const buffers = arrays.map((array, n) => array.getBuffer ? array.getBuffer(formats[n]) : { data: array })
+    try {
+        draw(...buffers.map(buffer => buffer.data))
+    } finally {
+        buffers.forEach(buffer => buffer.release && buffer.release())
     }
-    context.stroke()
 }
 
-function optimizedFillRects(context, coordinatesJson) {
-    const coordinates = JSON.parse(coordinatesJson)
-    context.beginPath()
-    for (var n = 0; n < coordinates.length; n += 5) {
-        x = coordinates[n]
-        y = coordinates[n + 1]
-        w = coordinates[n + 2]
-        h = coordinates[n + 3]
-        context.fillStyle = coordinates[n + 4]
-        context.fillRect(x, y, w, h)
-    }
+function optimizedDrawPolygon(context, color, lineWidth, coordinates) {
+    withBuffers([coordinates], ["f32"], (points) => {
+        if (!points.length) return
+        context.beginPath();
+        context.strokeStyle = color
+        context.lineWidth = lineWidth
+        context.moveTo(points[0], points[1])
+        for (var n = 2; n < points.length; n += 2) {
+            context.lineTo(points[n], points[n + 1])
+        }
+        context.stroke()
+    })
 }
 
-function optimizedDrawTexts(context, coordinatesJson) {
-    const coordinates = JSON.parse(coordinatesJson)
-    context.beginPath()
-    context.strokeStyle = "red"
-    for (var n = 0; n < coordinates.length; n += 5) {
-        x = coordinates[n]
-        y = coordinates[n + 1]
-        text = coordinates[n + 2]
-        color = coordinates[n + 3]
-        w = coordinates[n + 4]
-        context.fillStyle = color
-        context.fillText(text, x, y, w)
-    }
+function optimizedFillRects(context, coordinates, colors, palette) {
+    withBuffers([coordinates, colors], ["f32", "u16"], (rects, indexes) => {
+        var current = -1
+        for (var n = 0, i = 0; n < rects.length; n += 4, i++) {
+            if (indexes[i] !== current) {
+                current = indexes[i]
+                context.fillStyle = palette[current]
+            }
+            context.fillRect(Math.ceil(rects[n]), Math.ceil(rects[n + 1]), Math.ceil(rects[n + 2]), Math.ceil(rects[n + 3]))
+        }
+    })
 }
 
-function optimizedDrawLines(context, lineWidth, strokeStyle, coordinatesJson) {
-    const coordinates = JSON.parse(coordinatesJson)
-    context.lineWidth = lineWidth
-    context.strokeStyle = strokeStyle
-    for (var n = 0; n < coordinates.length; n += 4) {
+function optimizedDrawTexts(context, coordinates, colors, palette, labels) {
+    const texts = labels.split("\0")
+    withBuffers([coordinates, colors], ["f32", "u16"], (positions, indexes) => {
+        var current = -1
+        for (var n = 0, i = 0; n < positions.length; n += 3, i++) {
+            if (indexes[i] !== current) {
+                current = indexes[i]
+                context.fillStyle = palette[current]
+            }
+            context.fillText(texts[i], positions[n], positions[n + 1], positions[n + 2])
+        }
+    })
+}
+
+function optimizedDrawLines(context, lineWidth, strokeStyle, coordinates) {
+    withBuffers([coordinates], ["f32"], (lines) => {
+        context.lineWidth = lineWidth
+        context.strokeStyle = strokeStyle
         context.beginPath()
-        context.moveTo(coordinates[n], coordinates[n + 1])
-        context.lineTo(coordinates[n + 2], coordinates[n + 3])
+        for (var n = 0; n < lines.length; n += 4) {
+            context.moveTo(lines[n], lines[n + 1])
+            context.lineTo(lines[n + 2], lines[n + 3])
+        }
         context.stroke()
-    }
+    })
 }
 
 function circle(context, x, y, radius, fill, lineWidth, color) {
@@ -17,6 +17,7 @@ import pickle
 import sys
 import traceback
 from typing import Any
+from typing import Iterator
 from typing import cast
 from typing import overload
 import urllib.error
@@ -111,14 +112,26 @@ class Recording:
         path = os.path.join(config.S3_ROOT, identifier.replace(" ", "_"))
         return f"{path}.zip"
 
-    def save(self, name:str="") -> None:
-        """Save the recording to a compressed file and notify the server."""
+    def save(self, name:str="", upload: bool = False) -> None:
+        """
+        Save the recording to a compressed file and notify the server.
+
+        With upload=True, the recording is streamed to the Microlog server
+        instead, so the traced host only needs network access to the server.
+        """
         # local import because pyscript only supports pure python modules
         import zstd  # pylint: disable=import-outside-toplevel
 
         identifier = name or self.get_identifier()
         pickled_data = pickle.dumps(self)
         compressed_data = zstd.compress(pickled_data) # pylint: disable=c-extension-no-member
+        if not upload or not self.upload(identifier, compressed_data):
+            self.write(identifier, compressed_data)
+            self.notify_server(identifier)
+        self.show_details(identifier)
+
+    def write(self, identifier: str, compressed_data: bytes) -> None:
+        """Write the compressed recording to config.fs."""
         path = self.get_log_path(identifier)
         logging.info("Saving recording %s to %s (%s KB)", identifier, path, len(compressed_data) / 1024)
 
@@ -126,8 +139,27 @@ class Recording:
         with config.fs.open(path, "wb") as file:
             cast(Any, file).write(compressed_data)
 
-        self.notify_server(identifier)
-        self.show_details(identifier)
+    def upload(self, identifier: str, compressed_data: bytes) -> bool:
+        """Stream the compressed recording to the server with a chunked POST."""
+        def chunks() -> Iterator[bytes]:
+            for start in range(0, len(compressed_data), config.UPLOAD_CHUNK_SIZE):
+                yield compressed_data[start:start + config.UPLOAD_CHUNK_SIZE]
+
+        url = f"{config.SERVER.rstrip('/')}/upload/{identifier.replace(' ', '_')}"
+        logging.info("Uploading recording %s to %s (%s KB)", identifier, url, len(compressed_data) / 1024)
+        request = urllib.request.Request(
+            url,
+            data=chunks(),
+            headers={"Content-Type": "application/microlog"},
+            method="POST",
+        )
+        try:
+            with urllib.request.urlopen(request, timeout=config.UPLOAD_TIMEOUT) as response:
+                logging.info("Uploaded recording to %s", response.read().decode("utf-8"))
+            return True
+        except OSError as e:
+            logging.warning("Microlog: Could not upload the recording to %s: %s", url, e)
+            return False
 
     def clear(self) -> None:
         """Clear the recording."""
@@ -0,0 +1,307 @@
+#
+# Microlog. Copyright (c) 2023 laffra, dcharbon. All rights reserved.
+#
+"""
+Performance regression detection across runs of the same application.
+
+A recording is compared against a rolling baseline of the previous runs of
+its application, using the per-function total time, self time, and call
+counts of their summaries, see microlog.aggregate. A function is flagged
+when it is significantly slower than the baseline: its z-score, relative
+increase, and absolute increase must all exceed their thresholds.
+
+Nightly jobs can report regressions for the latest run of an application:
+
+    $ python -m microlog.regression my-app
+    my-app/2025_01_02_03_00_00 is 30% slower in load_features (total ...)
+"""
+
+from __future__ import annotations
+
+import argparse
+from collections import OrderedDict
+import json
+import logging
+import os
+import statistics
+import sys
+import threading
+from typing import Any
+
+from microlog import aggregate
+from microlog import config
+from microlog import metrics
+
+
+REGRESSION_VERSION: int = 1
+REPORT_CACHE_SIZE: int = 256
+BASELINE_RUNS: int = 10
+MIN_BASELINE_RUNS: int = 3
+MIN_Z_SCORE: float = 3.0
+MIN_RATIO: float = 1.2
+MIN_SECONDS: float = 0.05
+MIN_CALLS: int = 10
+
+METRICS: dict[str, str] = {
+    "total": "slower",
+    "self": "slower in its own code",
+    "count": "more calls",
+}
+
+
+class Regression:
+    """A metric of one function that is significantly worse than its baseline."""
+
+    def __init__(
+        self,
+        function: str,
+        metric: str,
+        value: float,
+        mean: float,
+        stdev: float,
+        runs: int,
+    ) -> None:
+        """Initialize a Regression instance."""
+        self.function: str = function
+        self.metric: str = metric
+        self.value: float = value
+        self.mean: float = mean
+        self.stdev: float = stdev
+        self.runs: int = runs
+
+    @property
+    def ratio(self) -> float:
+        """Return the value relative to the baseline mean."""
+        return self.value / self.mean if self.mean else float("inf")
+
+    def describe(self) -> str:
+        """Return a human-readable description of the regression."""
+        if self.mean:
+            change = f"{round((self.ratio - 1) * 100):,d}% {METRICS[self.metric]}"
+        else:
+            change = f"newly {METRICS[self.metric]}"
+        unit = "" if self.metric == "count" else "s"
+        return (
+            f"{change} in {self.function} "
+            f"({self.metric} {self.value:,.3f}{unit} vs {self.mean:,.3f}{unit} "
+            f"± {self.stdev:,.3f}{unit} over {self.runs} runs)"
+        )
+
+    def to_dict(self) -> dict[str, Any]:
+        """Return a JSON-friendly representation."""
+        return {
+            "function": self.function,
+            "metric": self.metric,
+            "value": round(self.value, 3),
+            "mean": round(self.mean, 3),
+            "stdev": round(self.stdev, 3),
+            "runs": self.runs,
+            "description": self.describe(),
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]) -> "Regression":
+        """Create a Regression from its JSON representation."""
+        return cls(
+            data["function"], data["metric"], data["value"], data["mean"], data["stdev"], data["runs"]
+        )
+
+    def __repr__(self) -> str:
+        """Return a string representation of the Regression object."""
+        return f"<Regression {self.describe()}>"
+
+
+class Report:
+    """The regressions of one recording against its baseline."""
+
+    def __init__(self, name: str, baseline: list[str], regressions: list[Regression]) -> None:
+        """Initialize a Report instance."""
+        self.name: str = name
+        self.baseline: list[str] = baseline
+        self.regressions: list[Regression] = regressions
+
+    def to_dict(self) -> dict[str, Any]:
+        """Return a JSON-friendly representation."""
+        return {
+            "version": REGRESSION_VERSION,
+            "name": self.name,
+            "baseline": self.baseline,
+            "regressions": [regression.to_dict() for regression in self.regressions],
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]) -> "Report":
+        """Create a Report from its JSON representation."""
+        return cls(
+            data["name"],
+            data["baseline"],
+            [Regression.from_dict(regression) for regression in data["regressions"]],
+        )
+
+
+def get_metric(summary: aggregate.Summary, function: str, metric: str) -> float:
+    """Return a metric of a function in a summary, 0 if the function did not run."""
+    stats = summary.functions.get(function)
+    if stats is None:
+        return 0.0
+    if metric == "count":
+        return stats.count
+    return stats.total if metric == "total" else max(0.0, stats.self_time)
+
+
+def is_significant(metric: str, value: float, mean: float, stdev: float) -> bool:
+    """Return True if a value is significantly worse than the baseline."""
+    minimum = MIN_CALLS if metric == "count" else MIN_SECONDS
+    if value - mean < minimum or value < mean * MIN_RATIO:
+        return False
+    return stdev == 0 or (value - mean) / stdev >= MIN_Z_SCORE
+
+
+def compare(summary: aggregate.Summary, baseline: list[aggregate.Summary]) -> list[Regression]:
+    """
+    Compare a summary against the summaries of earlier runs. The returned
+    regressions are sorted with the largest absolute increase first.
+    """
+    if len(baseline) < MIN_BASELINE_RUNS:
+        return []
+    regressions: list[Regression] = []
+    for function in summary.functions:
+        for metric in METRICS:
+            value = get_metric(summary, function, metric)
+            history = [get_metric(run, function, metric) for run in baseline]
+            mean = statistics.fmean(history)
+            stdev = statistics.stdev(history)
+            if is_significant(metric, value, mean, stdev):
+                regressions.append(
+                    Regression(function, metric, value, mean, stdev, len(baseline))
+                )
+    regressions.sort(
+        key=lambda regression: (regression.metric == "count", regression.mean - regression.value)
+    )
+    return regressions
+
+
+def get_application_runs(application: str) -> list[str]:
+    """
+    Return the names of all recordings of an application, oldest first,
+    including recordings that were downsampled to their summary.
+    """
+    try:
+        files = config.fs.ls(os.path.join(config.S3_ROOT, application))
+    except FileNotFoundError:
+        return []
+    runs = set()
+    for file in files:
+        basename = os.path.basename(str(file))
+        for suffix in (".zip", ".summary.json"):
+            if basename.endswith(suffix):
+                runs.add(f"{application}/{basename[:-len(suffix)]}")
+    return sorted(runs)
+
+
+def get_baseline(name: str, runs: list[str], count: int = BASELINE_RUNS) -> list[str]:
+    """Return the previous runs of the same application as the given recording."""
+    application = name.split("/", 1)[0]
+    return sorted(run for run in runs if run.split("/", 1)[0] == application and run < name)[
+        -count:
+    ]
+
+
+def check(name: str, runs: list[str] | None = None) -> Report:
+    """Compare a recording against the previous runs of its application."""
+    if runs is None:
+        runs = get_application_runs(name.split("/", 1)[0])
+    baseline = get_baseline(name, runs)
+    summaries = []
+    for run in baseline:
+        try:
+            summaries.append(aggregate.get_summary(run))
+        except Exception as e:  # pylint: disable=broad-except
+            logging.warning("Microlog: Cannot use %s as a baseline: %s", run, e)
+    report = Report(
+        name,
+        [summary.name for summary in summaries],
+        compare(aggregate.get_summary(name), summaries),
+    )
+    write_report(report)
+    return report
+
+
+def get_report_path(name: str) -> str:
+    """Get the storage path of the regressions sidecar of a recording."""
+    return os.path.join(config.S3_ROOT, f"{name}.regressions.json")
+
+
+_cache: OrderedDict[str, Report] = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def get_report(name: str) -> Report:
+    """Get the regressions of a recording, from memory, from its sidecar, or by checking it."""
+    with _cache_lock:
+        metrics.cache_lookup("regressions", name in _cache)
+        if name in _cache:
+            _cache.move_to_end(name)
+            return _cache[name]
+    report = read_report(name) or check(name)
+    with _cache_lock:
+        _cache[name] = report
+        while len(_cache) > REPORT_CACHE_SIZE:
+            _cache.popitem(last=False)
+    return report
+
+
+def read_report(name: str) -> Report | None:
+    """Read the regressions sidecar of a recording, if it exists and is current."""
+    try:
+        with config.fs.open(get_report_path(name), "r") as fd:
+            data = json.loads(fd.read())
+    except (FileNotFoundError, ValueError):
+        return None
+    if data.get("version") != REGRESSION_VERSION:
+        return None
+    return Report.from_dict(data)
+
+
+def write_report(report: Report) -> None:
+    """Store the regressions sidecar next to its recording."""
+    try:
+        with config.fs.open(get_report_path(report.name), "w") as fd:
+            fd.write(json.dumps(report.to_dict()))
+    except OSError as e:
+        logging.warning("Microlog: Could not store regressions for %s: %s", report.name, e)
+
+
+def forget(name: str) -> None:
+    """Drop the cached regressions of a recording and remove its sidecar."""
+    with _cache_lock:
+        _cache.pop(name, None)
+    path = get_report_path(name)
+    if config.fs.exists(path):
+        config.fs.rm(path)
+
+
+def main() -> None:
+    """Report the regressions of the latest, or a given, run of an application."""
+    parser = argparse.ArgumentParser(
+        prog="python -m microlog.regression",
+        description="Compare a run against the previous runs of the same application.",
+    )
+    parser.add_argument("application", help="the application to check")
+    parser.add_argument("--run", default="", help="the run to check, defaults to the latest")
+    args = parser.parse_args()
+    runs = get_application_runs(args.application)
+    if not runs:
+        sys.stderr.write(f"No recordings found for {args.application}\n")
+        sys.exit(2)
+    name = f"{args.application}/{args.run}" if args.run else runs[-1]
+    report = check(name, runs)
+    if len(report.baseline) < MIN_BASELINE_RUNS:
+        sys.stdout.write(f"{name} has only {len(report.baseline)} earlier runs to compare with\n")
+    for regression in report.regressions:
+        sys.stdout.write(f"{name} is {regression.describe()}\n")
+    sys.exit(1 if report.regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
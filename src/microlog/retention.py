@@ -0,0 +1,369 @@
+#
+# Microlog. Copyright (c) 2023 laffra, dcharbon. All rights reserved.
+#
+"""
+Retention of the recordings in the storage root.
+
+Policies are configured per application in a retention.json file in the
+storage root, with a "default" policy for all other applications:
+
+    {
+        "default": {"keep_last": 200, "max_age_days": 180},
+        "my-app": {"keep_last": 50, "summary_after_days": 7}
+    }
+
+A policy can keep only the last N runs of an application, delete runs
+older than a number of days, and downsample runs older than a number of
+days to summary-only: the recording is deleted, but its summary sidecar is
+kept, so regression detection still has its history, see microlog.aggregate
+and microlog.regression. Files are deleted in batches through the
+filesystem API, and passes run in the background with their progress
+available while they run.
+"""
+
+from __future__ import annotations
+
+import datetime
+import json
+import logging
+import os
+import threading
+import time
+from typing import Any
+from typing import Callable
+from typing import Iterable
+
+from microlog import aggregate
+from microlog import config
+
+
+POLICY_FILE: str = "retention.json"
+BATCH_SIZE: int = 1000
+MAX_ERRORS: int = 20
+NAME_FORMAT: str = "%Y_%m_%d_%H_%M_%S"
+
+RECORDING_SUFFIX: str = ".zip"
+LEGACY_RECORDING_SUFFIX: str = ".log.zip"
+SUMMARY_SUFFIX: str = ".summary.json"
+SUFFIXES: tuple[str, ...] = (
+    LEGACY_RECORDING_SUFFIX,
+    RECORDING_SUFFIX,
+    SUMMARY_SUFFIX,
+    ".regressions.json",
+    ".analysis.json",
+)
+
+DAY: float = 24 * 60 * 60
+
+
+class Policy:
+    """How long the runs of an application are kept."""
+
+    def __init__(
+        self,
+        keep_last: int | None = None,
+        max_age_days: float | None = None,
+        summary_after_days: float | None = None,
+    ) -> None:
+        """Initialize a Policy. None means the runs are kept."""
+        self.keep_last: int | None = keep_last
+        self.max_age_days: float | None = max_age_days
+        self.summary_after_days: float | None = summary_after_days
+
+    def is_empty(self) -> bool:
+        """Return True if this policy keeps everything."""
+        return self.keep_last is None and self.max_age_days is None and self.summary_after_days is None
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]) -> "Policy":
+        """Create a Policy from its JSON representation."""
+        return cls(data.get("keep_last"), data.get("max_age_days"), data.get("summary_after_days"))
+
+    def __repr__(self) -> str:
+        """Return a string representation of the Policy object."""
+        return (
+            f"<Policy keep_last={self.keep_last} max_age_days={self.max_age_days} "
+            f"summary_after_days={self.summary_after_days}>"
+        )
+
+
+class Run:
+    """The stored files of one run of an application."""
+
+    def __init__(self, name: str) -> None:
+        """Initialize a Run without any files."""
+        self.name: str = name
+        self.files: dict[str, str] = {}
+
+    @property
+    def is_downsampled(self) -> bool:
+        """Return True if only the summary of this run is kept."""
+        return RECORDING_SUFFIX not in self.files
+
+    def get_names(self) -> list[str]:
+        """
+        Return the names of this run. Legacy recordings, stored as
+        <name>.log.zip, are also listed under the name <name>.log.
+        """
+        if self.files.get(RECORDING_SUFFIX, "").endswith(LEGACY_RECORDING_SUFFIX):
+            return [self.name, f"{self.name}.log"]
+        return [self.name]
+
+    def get_age(self, now: float) -> float | None:
+        """Return the age of this run in days, or None if its name has no timestamp."""
+        try:
+            when = datetime.datetime.strptime(self.name.split("/", 1)[1], NAME_FORMAT)
+        except (IndexError, ValueError):
+            return None
+        return (now - when.timestamp()) / DAY
+
+    def __repr__(self) -> str:
+        """Return a string representation of the Run object."""
+        return f"<Run {self.name} {sorted(self.files)}>"
+
+
+class Plan:
+    """The runs to delete and to downsample for one application."""
+
+    def __init__(self) -> None:
+        """Initialize an empty Plan."""
+        self.delete: list[Run] = []
+        self.downsample: list[Run] = []
+
+    def __len__(self) -> int:
+        """Return the number of runs affected by this plan."""
+        return len(self.delete) + len(self.downsample)
+
+
+class Progress:
+    """The progress of a retention pass or a bulk deletion."""
+
+    def __init__(self, action: str = "") -> None:
+        """Initialize the Progress of an action."""
+        self.action: str = action
+        self.running: bool = False
+        self.total: int = 0
+        self.deleted: int = 0
+        self.downsampled: int = 0
+        self.files: int = 0
+        self.errors: list[str] = []
+        self.started: float = 0.0
+        self.finished: float = 0.0
+
+    def error(self, message: str) -> None:
+        """Record an error, keeping only the most recent ones."""
+        logging.warning("Microlog: Retention: %s", message)
+        self.errors = (self.errors + [message])[-MAX_ERRORS:]
+
+    def to_dict(self) -> dict[str, Any]:
+        """Return a JSON-friendly representation."""
+        return {
+            "action": self.action,
+            "running": self.running,
+            "total": self.total,
+            "done": self.deleted + self.downsampled,
+            "deleted": self.deleted,
+            "downsampled": self.downsampled,
+            "files": self.files,
+            "errors": self.errors,
+            "started": self.started,
+            "finished": self.finished,
+        }
+
+
+def read_policies() -> dict[str, Policy]:
+    """Read the retention policies from the storage root, if they are configured."""
+    try:
+        with config.fs.open(os.path.join(config.S3_ROOT, POLICY_FILE), "r") as fd:
+            data = json.loads(fd.read())
+    except FileNotFoundError:
+        return {}
+    except ValueError as e:
+        logging.error("Microlog: Cannot parse %s: %s", POLICY_FILE, e)
+        return {}
+    return {application: Policy.from_dict(policy) for application, policy in data.items()}
+
+
+def get_policy(policies: dict[str, Policy], application: str) -> Policy:
+    """Return the policy of an application, falling back to the default policy."""
+    return policies.get(application) or policies.get("default") or Policy()
+
+
+def get_applications() -> dict[str, list[str]]:
+    """Return the applications in the storage root, with the names of their files."""
+    root_name = os.path.basename(config.S3_ROOT.rstrip("/"))
+    applications: dict[str, list[str]] = {}
+    try:
+        for root, _, files in config.fs.walk(config.S3_ROOT):
+            root = str(root).replace("\\", "/").rstrip("/")
+            if os.path.basename(os.path.dirname(root)) == root_name:
+                applications[os.path.basename(root)] = list(files)
+    except (AttributeError, FileNotFoundError):
+        pass
+    return applications
+
+
+def get_runs(application: str, files: Iterable[str] | None = None) -> list[Run]:
+    """Return the runs of an application with their stored files, oldest first."""
+    if files is None:
+        try:
+            files = config.fs.ls(os.path.join(config.S3_ROOT, application))
+        except FileNotFoundError:
+            return []
+    runs: dict[str, Run] = {}
+    for file in files:
+        basename = os.path.basename(str(file))
+        for suffix in SUFFIXES:
+            if basename.endswith(suffix):
+                name = f"{application}/{basename[:-len(suffix)]}"
+                run = runs.setdefault(name, Run(name))
+                if suffix == LEGACY_RECORDING_SUFFIX:
+                    suffix = RECORDING_SUFFIX
+                run.files[suffix] = os.path.join(config.S3_ROOT, application, basename)
+                break
+    return sorted(
+        (run for run in runs.values() if RECORDING_SUFFIX in run.files or SUMMARY_SUFFIX in run.files),
+        key=lambda run: run.name,
+    )
+
+
+def plan(runs: list[Run], policy: Policy, now: float) -> Plan:
+    """Decide which runs, sorted oldest first, are deleted or downsampled under a policy."""
+    result = Plan()
+    for index, run in enumerate(runs):
+        age = run.get_age(now)
+        if policy.keep_last is not None and len(runs) - index > policy.keep_last:
+            result.delete.append(run)
+        elif policy.max_age_days is not None and age is not None and age > policy.max_age_days:
+            result.delete.append(run)
+        elif (
+            policy.summary_after_days is not None
+            and age is not None
+            and age > policy.summary_after_days
+            and not run.is_downsampled
+        ):
+            result.downsample.append(run)
+    return result
+
+
+class RetentionEngine:
+    """Applies retention policies and bulk deletions on a background thread."""
+
+    def __init__(self, on_remove: Callable[[str, bool], None] | None = None) -> None:
+        """
+        Initialize a RetentionEngine. The on_remove callback is called with
+        the name of each removed run, and whether its summary was kept.
+        """
+        self.on_remove: Callable[[str, bool], None] | None = on_remove
+        self.progress: Progress = Progress()
+        self.lock = threading.Lock()
+        self.stopping = threading.Event()
+
+    def start(self, action: str, work: Callable[[], None]) -> bool:
+        """Run an action in the background, unless another action is still running."""
+        with self.lock:
+            if self.progress.running:
+                return False
+            self.progress = Progress(action)
+            self.progress.running = True
+            self.progress.started = time.time()
+
+        def run() -> None:
+            try:
+                work()
+            except Exception as e:  # pylint: disable=broad-except
+                self.progress.error(f"{action} failed: {e}")
+            finally:
+                self.progress.finished = time.time()
+                self.progress.running = False
+
+        threading.Thread(target=run, daemon=True).start()
+        return True
+
+    def apply_policies(self, now: float | None = None) -> bool:
+        """Start a retention pass over all applications in the background."""
+        return self.start("retention", lambda: self.retain(now or time.time()))
+
+    def delete(self, names: Iterable[str]) -> bool:
+        """Start deleting the given runs in the background."""
+        names = sorted(set(names))
+        return self.start("delete", lambda: self.remove(names))
+
+    def schedule(self, interval: float) -> None:
+        """Apply the retention policies now, and then every interval seconds."""
+        def loop() -> None:
+            while not self.stopping.is_set():
+                self.apply_policies()
+                self.stopping.wait(interval)
+
+        threading.Thread(target=loop, daemon=True).start()
+
+    def stop(self) -> None:
+        """Stop the scheduled retention passes."""
+        self.stopping.set()
+
+    def retain(self, now: float) -> None:
+        """Apply the retention policies to all applications."""
+        policies = read_policies()
+        if not policies:
+            return
+        plans: list[Plan] = []
+        for application, files in sorted(get_applications().items()):
+            policy = get_policy(policies, application)
+            if not policy.is_empty():
+                plans.append(plan(get_runs(application, files), policy, now))
+        self.progress.total = sum(len(result) for result in plans)
+        for result in plans:
+            self.downsample_runs(result.downsample)
+            self.delete_runs(result.delete)
+
+    def remove(self, names: list[str]) -> None:
+        """Delete the given runs and all their sidecars, reporting the runs that are not found."""
+        self.progress.total = len(names)
+        wanted = set(names)
+        for application in sorted({name.split("/", 1)[0] for name in names}):
+            runs = [run for run in get_runs(application) if wanted.intersection(run.get_names())]
+            for run in runs:
+                wanted.difference_update(run.get_names())
+            self.delete_runs(runs)
+        for name in sorted(wanted):
+            self.progress.error(f"Cannot find {name}")
+
+    def downsample_runs(self, runs: list[Run]) -> None:
+        """Replace recordings by their summaries, making sure each summary is stored first."""
+        downsampled = []
+        for run in runs:
+            try:
+                aggregate.get_summary(run.name)
+            except Exception as e:  # pylint: disable=broad-except
+                self.progress.error(f"Cannot summarize {run.name}: {e}")
+                continue
+            if aggregate.read_summary(run.name) is None:
+                self.progress.error(f"Cannot store the summary of {run.name}")
+                continue
+            downsampled.append(run)
+        self.remove_files(downsampled, [RECORDING_SUFFIX], keep_summary=True)
+
+    def delete_runs(self, runs: list[Run]) -> None:
+        """Delete runs, including all their sidecars."""
+        self.remove_files(runs, list(SUFFIXES), keep_summary=False)
+
+    def remove_files(self, runs: list[Run], suffixes: list[str], keep_summary: bool) -> None:
+        """Remove the files with the given suffixes of runs, in batches."""
+        for start in range(0, len(runs), BATCH_SIZE):
+            batch = runs[start:start + BATCH_SIZE]
+            paths = [run.files[suffix] for run in batch for suffix in suffixes if suffix in run.files]
+            try:
+                config.fs.rm(paths)
+            except Exception as e:  # pylint: disable=broad-except
+                self.progress.error(f"Cannot delete {len(paths)} files: {e}")
+                continue
+            self.progress.files += len(paths)
+            for run in batch:
+                if self.on_remove:
+                    for name in run.get_names():
+                        self.on_remove(name, keep_summary)
+                if keep_summary:
+                    self.progress.downsampled += 1
+                else:
+                    self.progress.deleted += 1
@@ -0,0 +1,287 @@
+#
+# Microlog. Copyright (c) 2023 laffra, dcharbon. All rights reserved.
+#
+"""
+Cross-recording function search.
+
+The FunctionIndex maps function names to the recordings that spent time in
+them. It is sharded per application: each Shard is stored as a single JSON
+file next to the recordings of its application and is only loaded when a
+query or an update needs it. Shards are built from recording summaries, see
+microlog.aggregate, so recordings are never loaded by a query:
+
+    from microlog import search
+    search.index.query("pandas.core.frame.DataFrame.merge", application="my-app")
+"""
+
+from __future__ import annotations
+
+from collections import OrderedDict
+import json
+import logging
+import os
+import queue
+import threading
+from typing import Any
+from typing import Iterable
+
+from microlog import aggregate
+from microlog import config
+from microlog import metrics
+
+
+INDEX_VERSION: int = 1
+SHARD_CACHE_SIZE: int = 32
+MAX_FUNCTIONS_PER_RECORDING: int = 200
+MAX_MATCHING_FUNCTIONS: int = 50
+MAX_RESULTS: int = 1000
+
+
+class Shard:
+    """The function postings of all recordings of a single application."""
+
+    def __init__(self, application: str) -> None:
+        """Initialize an empty Shard."""
+        self.application: str = application
+        self.postings: dict[str, dict[str, tuple[float, int]]] = {}
+        self.recordings: set[str] = set()
+        self.dirty: bool = False
+
+    def add(self, summary: aggregate.Summary) -> None:
+        """
+        Index the functions of a recording. Only the functions with the
+        highest total time are kept, to bound the size of the index.
+        """
+        self.remove(summary.name)
+        for stats in summary.top_total(MAX_FUNCTIONS_PER_RECORDING):
+            self.postings.setdefault(stats.name, {})[summary.name] = (
+                round(stats.total, 3),
+                stats.count,
+            )
+        self.recordings.add(summary.name)
+        self.dirty = True
+
+    def remove(self, name: str) -> None:
+        """Remove a recording from the index."""
+        if name not in self.recordings:
+            return
+        for function in [
+            function for function, recordings in self.postings.items() if name in recordings
+        ]:
+            del self.postings[function][name]
+            if not self.postings[function]:
+                del self.postings[function]
+        self.recordings.discard(name)
+        self.dirty = True
+
+    def find_functions(self, function: str, exact: bool) -> list[str]:
+        """Return the exact function, or the functions containing it."""
+        if exact:
+            return [function] if function in self.postings else []
+        function = function.lower()
+        return sorted(name for name in self.postings if function in name.lower())[
+            :MAX_MATCHING_FUNCTIONS
+        ]
+
+    def query(self, function: str, exact: bool = True) -> list[dict[str, Any]]:
+        """Return the recordings that spent time in a function."""
+        return [
+            {"recording": name, "function": match, "total": total, "count": count}
+            for match in self.find_functions(function, exact)
+            for name, (total, count) in self.postings[match].items()
+        ]
+
+    def to_dict(self) -> dict[str, Any]:
+        """Return a JSON-friendly representation."""
+        return {
+            "version": INDEX_VERSION,
+            "application": self.application,
+            "recordings": sorted(self.recordings),
+            "postings": self.postings,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]) -> "Shard":
+        """Create a Shard from its JSON representation."""
+        shard = cls(data["application"])
+        shard.recordings = set(data["recordings"])
+        shard.postings = {
+            function: {name: (total, count) for name, (total, count) in recordings.items()}
+            for function, recordings in data["postings"].items()
+        }
+        return shard
+
+
+def get_shard_path(application: str) -> str:
+    """Get the storage path of the index shard of an application."""
+    return os.path.join(config.S3_ROOT, application, "index.json")
+
+
+class FunctionIndex:
+    """
+    Inverted index from function name to (recording, total time, call count).
+
+    Updates are applied by a single background worker, so saving a
+    recording never waits for the index. Changed shards are written when the
+    worker runs out of work.
+    """
+
+    def __init__(self) -> None:
+        """Initialize an empty FunctionIndex."""
+        self.shards: OrderedDict[str, Shard] = OrderedDict()
+        self.applications: set[str] = set()
+        self.lock = threading.RLock()
+        self.updates: queue.Queue[tuple[str, list[str]]] = queue.Queue()
+        self.worker: threading.Thread | None = None
+
+    def get_shard(self, application: str) -> Shard:
+        """Return the shard of an application, creating it if none is stored."""
+        shard = self.find_shard(application)
+        if shard:
+            return shard
+        with self.lock:
+            if application not in self.shards:
+                self.cache_shard(Shard(application))
+            return self.shards[application]
+
+    def find_shard(self, application: str) -> Shard | None:
+        """
+        Return the shard of an application, loading it on first use, or None
+        if it has no stored shard. Shards are read without holding the lock.
+        Queries use this, so they never add unknown applications to the index.
+        """
+        with self.lock:
+            metrics.cache_lookup("search", application in self.shards)
+            if application in self.shards:
+                self.shards.move_to_end(application)
+                return self.shards[application]
+        shard = self.read_shard(application)
+        if shard is None:
+            return None
+        with self.lock:
+            if application not in self.shards:
+                self.cache_shard(shard)
+            return self.shards[application]
+
+    def cache_shard(self, shard: Shard) -> None:
+        """Cache a shard, storing the least recently used shards when the cache is full."""
+        with self.lock:
+            self.shards[shard.application] = shard
+            self.applications.add(shard.application)
+            while len(self.shards) > SHARD_CACHE_SIZE:
+                _, evicted = self.shards.popitem(last=False)
+                self.write_shard(evicted)
+
+    def read_shard(self, application: str) -> Shard | None:
+        """Read the stored shard of an application, if it exists and is current."""
+        try:
+            with config.fs.open(get_shard_path(application), "r") as fd:
+                data = json.loads(fd.read())
+        except (FileNotFoundError, ValueError):
+            return None
+        if data.get("version") != INDEX_VERSION:
+            return None
+        return Shard.from_dict(data)
+
+    def write_shard(self, shard: Shard) -> None:
+        """Store a shard if it changed since it was loaded."""
+        if not shard.dirty:
+            return
+        try:
+            with config.fs.open(get_shard_path(shard.application), "w") as fd:
+                fd.write(json.dumps(shard.to_dict()))
+            shard.dirty = False
+        except OSError as e:
+            logging.warning("Microlog: Could not store index for %s: %s", shard.application, e)
+
+    def flush(self) -> None:
+        """Store all changed shards."""
+        with self.lock:
+            for shard in self.shards.values():
+                self.write_shard(shard)
+
+    def add(self, name: str) -> None:
+        """Index a recording in the background."""
+        self.submit("add", [name])
+
+    def remove(self, name: str) -> None:
+        """Remove a recording from the index in the background."""
+        self.submit("remove", [name])
+
+    def update(self, names: Iterable[str]) -> None:
+        """Index all recordings that are not indexed yet, in the background."""
+        self.submit("update", list(names))
+
+    def submit(self, action: str, names: list[str]) -> None:
+        """Queue an update and make sure the worker is running."""
+        self.updates.put((action, names))
+        with self.lock:
+            self.applications.update(name.split("/", 1)[0] for name in names)
+            if not self.worker or not self.worker.is_alive():
+                self.worker = threading.Thread(target=self.run, daemon=True)
+                self.worker.start()
+
+    def run(self) -> None:
+        """Apply queued updates, flushing changed shards when the queue is empty."""
+        while True:
+            try:
+                action, names = self.updates.get(timeout=1)
+            except queue.Empty:
+                self.flush()
+                continue
+            for name in names:
+                try:
+                    self.apply(action, name)
+                except Exception as e:  # pylint: disable=broad-except
+                    logging.error("Microlog: Could not %s %s in the index: %s", action, name, e)
+            if self.updates.empty():
+                self.flush()
+
+    def apply(self, action: str, name: str) -> None:
+        """Apply a single update to the index."""
+        if action == "remove":
+            application = name.split("/", 1)[0]
+            if self.find_shard(application):
+                with self.lock:
+                    self.get_shard(application).remove(name)
+        else:
+            self.index_recording(name, skip_indexed=action == "update")
+
+    def index_recording(self, name: str, skip_indexed: bool = False) -> None:
+        """Add the summary of a recording to the shard of its application."""
+        application = name.split("/", 1)[0]
+        shard = self.get_shard(application)
+        with self.lock:
+            if skip_indexed and name in shard.recordings:
+                return
+        summary = aggregate.get_summary(name)
+        with self.lock:
+            self.get_shard(application).add(summary)
+
+    def query(
+        self, function: str, application: str = "", limit: int = MAX_RESULTS
+    ) -> list[dict[str, Any]]:
+        """
+        Return the recordings that spent time in a function, most recent
+        first. Function names are matched exactly, or else by substring.
+        Shards are loaded without holding the lock, so a query over all
+        applications does not hold up the indexer.
+        """
+        with self.lock:
+            applications = [application] if application else sorted(self.applications)
+        exact_results: list[dict[str, Any]] = []
+        results: list[dict[str, Any]] = []
+        for shard_application in applications:
+            shard = self.find_shard(shard_application)
+            if shard is None:
+                continue
+            with self.lock:
+                exact_results.extend(shard.query(function, exact=True))
+                if not exact_results:
+                    results.extend(shard.query(function, exact=False))
+        results = exact_results or results
+        results.sort(key=lambda result: result["recording"].split("/", 1)[-1], reverse=True)
+        return results[:limit]
+
+
+index: FunctionIndex = FunctionIndex()
@@ -5,24 +5,39 @@
 
 from __future__ import annotations
 
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import as_completed
 from http.server import BaseHTTPRequestHandler
-from http.server import HTTPServer
+from http.server import ThreadingHTTPServer
+import json
 import logging
 import os
+import queue
 import re
 import subprocess
 import sys
+import threading
 import time
 import traceback
 from typing import Any
+from typing import Iterator
 from typing import cast
 from typing import Union
 import urllib.parse
-import zstd
+import zlib
 
+from microlog import aggregate
 from microlog import config
 from microlog import analyse
-from microlog.models import Recording
+from microlog import diff
+from microlog import jobs
+from microlog import metrics
+from microlog import regression
+from microlog import retention
+from microlog import search
+from microlog import stacks
+from microlog import stream
+from microlog import tiles
 
 
 logging.basicConfig(
@@ -43,62 +58,267 @@ def error(message: str) -> None:
 
 
 class LogWatcher:
-    """Watches and manages the list of available log recordings."""
+    """
+    Watches and manages the list of available log recordings.
+
+    The storage root is scanned in the background, listing the application
+    directories concurrently, so the server accepts connections right away
+    and serves partial results while scanning. Later refreshes only re-list
+    new applications and applications that changed.
+    """
     logs: list[str] = []
 
     def __init__(self) -> None:
-        """Initialize LogWatcher and load logs."""
-        self.load_logs()
+        """Initialize an empty LogWatcher. Call start() to scan the storage root."""
+        self.lock = threading.Lock()
+        self.regressions: dict[str, list[str]] = {}
+        self.applications: dict[str, list[str]] = {}
+        self.dirty: set[str] = set()
+        self.scanning: bool = False
+        self.logs = []
+
+    def start(self, interval: float = config.CATALOG_REFRESH_INTERVAL) -> None:
+        """Scan the storage root in the background, and refresh it every interval seconds."""
+        def run() -> None:
+            self.load_logs()
+            search.index.update(self.get_recording_names())
+            while True:
+                time.sleep(interval)
+                try:
+                    self.refresh()
+                except Exception as e:  # pylint: disable=broad-except
+                    error(f"Cannot refresh the recordings: {e}")
+
+        self.scanning = True
+        threading.Thread(target=run, daemon=True).start()
 
     def get_recording_names(self) -> list[str]:
         """Return the list of recording names."""
         return self.logs
 
+    def is_scanning(self) -> bool:
+        """Return True while the initial scan of the storage root is still running."""
+        return self.scanning
+
     def rm(self, name: str) -> None:
         """Remove a log from the list by name."""
-        self.logs = list(set(self.logs) - {name})
+        application = name.split("/", 1)[0]
+        with self.lock:
+            self.logs = list(set(self.logs) - {name})
+            if application in self.applications:
+                self.applications[application] = [
+                    log for log in self.applications[application] if log != name
+                ]
+            self.regressions.pop(name, None)
         info(f"Remove log: {name} => {len(self.logs)} logs")
 
     def save(self, name: str) -> None:
-        """Add a log to the list by name."""
-        self.logs = list(set(self.logs + [name]))
+        """Add a log to the list by name, and re-list its application on the next refresh."""
+        application = name.split("/", 1)[0]
+        with self.lock:
+            self.logs = list(set(self.logs + [name]))
+            names = self.applications.setdefault(application, [])
+            if name not in names:
+                names.append(name)
+            self.dirty.add(application)
         info(f"Add log: {name} => {len(self.logs)} logs")
 
+    def check_regressions(self, name: str) -> None:
+        """Compare a new log against earlier runs of its application, in the background."""
+        def check() -> None:
+            try:
+                report = regression.get_report(name)
+            except Exception as e:  # pylint: disable=broad-except
+                error(f"Cannot check {name} for regressions: {e}")
+                return
+            with self.lock:
+                if report.regressions:
+                    self.regressions[name] = [
+                        found.describe() for found in report.regressions
+                    ]
+            for description in self.regressions.get(name, []):
+                info(f"Regression: {name} is {description}")
+
+        threading.Thread(target=check, daemon=True).start()
+
+    def list_applications(self) -> list[str]:
+        """Return the names of the application directories in the storage root."""
+        try:
+            entries = config.fs.ls(config.S3_ROOT)
+        except (AttributeError, OSError):
+            # Happens when no S3 credentials are configured
+            return []
+        return sorted(
+            os.path.basename(str(entry).rstrip("/"))
+            for entry in entries
+            if not str(entry).endswith((".json", ".zip"))
+        )
+
+    def list_application(self, application: str) -> list[str]:
+        """Return the names of the recordings of one application."""
+        try:
+            files = config.fs.ls(os.path.join(config.S3_ROOT, application))
+        except (AttributeError, OSError):
+            return []
+        return sorted(
+            f"{application}/{os.path.basename(str(file))[:-4]}"
+            for file in files
+            if str(file).endswith(".zip")
+        )
+
+    def list_concurrently(self, applications: list[str]) -> Iterator[tuple[str, list[str]]]:
+        """List applications concurrently, yielding their recordings as each listing completes."""
+        with ThreadPoolExecutor(config.CATALOG_SCAN_WORKERS) as pool:
+            futures = {
+                pool.submit(self.list_application, application): application
+                for application in applications
+            }
+            for future in as_completed(futures):
+                yield futures[future], future.result()
+
     def load_logs(self) -> None:
-        """Load logs from the configured S3 root."""
+        """Scan all applications in the storage root, adding their logs as they are listed."""
         info(f"Loading logs from {config.fs.__class__.__name__}...")
         start = time.time()
-        logs = []
-        try:
-            for root, _, files in config.fs.walk(config.S3_ROOT):
-                application = str(root).rsplit("/", 1)[-1] \
-                            .replace("\\", "/") \
-                            .replace("microlog/", "")
-                for name in sorted([file for file in files if file.endswith(".zip")]):
-                    if not "/" in application:
-                        logs.append(f"{application}/{name[:-4]}")
-        except AttributeError:
-            # Happens when no S3 credentials are configured
-            pass
+        self.scanning = True
+        for application, names in self.list_concurrently(self.list_applications()):
+            with self.lock:
+                known = set(self.applications.get(application, []))
+                added = [name for name in names if name not in known]
+                self.applications[application] = sorted(known | set(names))
+                self.logs.extend(added)
+        self.scanning = False
         end = time.time()
-        info(f"Found {len(logs)} recordings in {end - start:.1f}s")
-        self.logs = logs
+        info(f"Found {len(self.logs)} recordings in {end - start:.1f}s")
+        metrics.catalog_sync_seconds.observe(end - start)
+        metrics.catalog_recordings.set(len(self.logs))
+
+    def refresh(self) -> None:
+        """Re-list only the applications that are new, gone, or changed since the last scan."""
+        start = time.time()
+        with self.lock:
+            dirty, self.dirty = self.dirty, set()
+            known = set(self.applications)
+        listed = set(self.list_applications())
+        changed = sorted(dirty | (listed - known))
+        added: list[str] = []
+        with self.lock:
+            for application in known - listed:
+                self.applications.pop(application, None)
+        for application, names in self.list_concurrently(changed):
+            with self.lock:
+                previous = set(self.applications.get(application, []))
+                added.extend(name for name in names if name not in previous)
+                self.applications[application] = names
+        with self.lock:
+            self.logs = [name for names in self.applications.values() for name in names]
+        if added:
+            search.index.update(added)
+        metrics.catalog_sync_seconds.observe(time.time() - start)
+        metrics.catalog_recordings.set(len(self.logs))
 
 
 log_watcher: LogWatcher = LogWatcher()
 
 
+def is_valid_name(name: str) -> bool:
+    """Return True if a name has the form <application>/<name> and stays inside the storage root."""
+    parts = str(name).split("/")
+    return len(parts) == 2 and all(parts) and ".." not in parts and "\\" not in name
+
+
+def forget_recording(name: str, keep_summary: bool = False) -> None:
+    """Remove a deleted or downsampled recording from the watcher, caches, and search index."""
+    log_watcher.rm(name)
+    tiles.forget(name)
+    stacks.forget(name)
+    search.index.remove(name)
+    if not keep_summary:
+        aggregate.forget(name)
+        regression.forget(name)
+
+
+retention_engine: retention.RetentionEngine = retention.RetentionEngine(forget_recording)
+
+
+analysis_jobs: jobs.JobQueue = jobs.JobQueue(analyse.analyse_and_store, analyse.describe_error)
+
+
+CHUNKS_COMPRESSION_LEVEL: int = 6
+GZIP_WBITS: int = 16 + zlib.MAX_WBITS
+
+
+LIVE_KEEPALIVE: float = 15.0
+
+live_channels: dict[str, stream.LiveChannel] = {}
+live_channels_lock = threading.Lock()
+
+
+def get_live_channel(name: str) -> stream.LiveChannel:
+    """Return the live channel of a recording, creating it on first use."""
+    with live_channels_lock:
+        if name not in live_channels:
+            live_channels[name] = stream.LiveChannel(name)
+        return live_channels[name]
+
+
+def release_live_channel(channel: stream.LiveChannel) -> None:
+    """
+    Drop the live channel of a recording once nobody follows it, if it is
+    closed or never received a batch. A dashboard may follow a recording
+    before its first batch, but a name that never goes live is not kept.
+    """
+    with live_channels_lock:
+        if (
+            (channel.done or not channel.sequence)
+            and not channel.subscribers
+            and live_channels.get(channel.name) is channel
+        ):
+            del live_channels[channel.name]
+
+
 class LogServerHandler(BaseHTTPRequestHandler):
     """HTTP request handler for the Microlog server."""
 
     def do_POST(self) -> None: # pylint: disable=invalid-name
+        """Handle POST requests, timing them per route."""
+        with metrics.request_seconds.time(metrics.get_route(self.path), "POST"):
+            self.handle_post()
+
+    def do_GET(self) -> None: # pylint: disable=invalid-name
+        """Handle GET requests, timing them per route."""
+        with metrics.request_seconds.time(metrics.get_route(self.path), "GET"):
+            self.handle_get()
+
+    def handle_post(self) -> None:
         """Handle POST requests."""
-        if "/analysis/" in self.path:
+        if self.path.startswith("/upload/"):
+            try:
+                self.upload_log()
+            except Exception as e:  # pylint: disable=broad-except
+                error(str(e))
+                traceback.print_exc()
+                self.send_error(400, f"Cannot upload recording: {e}")
+        elif self.path.startswith("/live/"):
+            try:
+                self.publish_live()
+            except Exception as e:  # pylint: disable=broad-except
+                error(str(e))
+                self.send_error(400, f"Cannot publish live data: {e}")
+        elif self.path == "/retention":
+            self.apply_retention()
+        elif self.path == "/delete/":
+            try:
+                self.delete_logs()
+            except Exception as e:  # pylint: disable=broad-except
+                error(str(e))
+                self.send_error(400, f"Cannot delete recordings: {e}")
+        elif "/analysis/" in self.path:
             content_length = int(self.headers['Content-Length'])
             post_data_bytes = self.rfile.read(content_length)
             data = post_data_bytes.decode("utf-8")
             try:
-                self.analyse(data)
+                self.submit_analysis(data)
             except Exception as e:  # pylint: disable=broad-except
                 error(str(e))
                 traceback.print_exc()
@@ -108,7 +328,7 @@ class LogServerHandler(BaseHTTPRequestHandler):
                     bytes(f"{name}\nError: {e}", encoding="utf-8"),
                 )
 
-    def do_GET(self) -> None: # pylint: disable=invalid-name
+    def handle_get(self) -> None:
         """Handle GET requests."""
         try:
             if ".well-known/appspecific/com.chrome.devtools.json" in self.path:
@@ -117,6 +337,32 @@ class LogServerHandler(BaseHTTPRequestHandler):
                 self.get_recording_names()
             elif "/zip/" in self.path:
                 self.get_recording()
+            elif self.path.startswith("/aggregate/"):
+                self.get_aggregate()
+            elif self.path.startswith("/tiles/"):
+                self.get_tiles()
+            elif self.path.startswith("/chunks/"):
+                self.get_chunks()
+            elif self.path.startswith("/live/"):
+                self.get_live()
+            elif self.path.startswith("/search?"):
+                self.search_functions()
+            elif self.path.startswith("/regressions/"):
+                self.get_regressions()
+            elif self.path.startswith("/diff?"):
+                self.get_diff()
+            elif self.path.startswith("/stacks/"):
+                self.get_stacks()
+            elif self.path.startswith("/sandwich/"):
+                self.get_sandwich()
+            elif self.path.startswith("/job/"):
+                self.get_job()
+            elif self.path.startswith("/analysis/"):
+                self.get_analysis()
+            elif self.path == "/metrics":
+                self.get_metrics()
+            elif self.path == "/retention":
+                self.send_json(retention_engine.progress.to_dict())
             elif self.path.startswith("/delete/"):
                 self.delete_log()
             elif self.path.startswith("/save/"):
@@ -152,7 +398,7 @@ class LogServerHandler(BaseHTTPRequestHandler):
         try:
             with open(path, encoding="utf-8") as fd:
                 return self.send_data(
-                    "text/html",
+                    "text/javascript" if path.endswith(".js") else "text/html",
                     bytes(f"{fd.read()}", encoding="utf-8"),
                     {"Cache-Control": "public, max-age=86400"},
                 )
@@ -190,22 +436,33 @@ class LogServerHandler(BaseHTTPRequestHandler):
         with open(path, "rb") as fd:
             return self.send_data("image/png", fd.read())
 
-    def analyse(self, prompt) -> None:
-        """Serve an analysis of the recording using an LLM."""
-        name = prompt.split("\n", 1)[0]
-        logging.info("Load recording: %s", name)
-        data = self.load_recording_by_name(name)
-        recording = Recording()
-        recording.load(zstd.decompress(data))
-        logging.info("Loaded recording: %s", dir(recording))
-        if not recording.analysis:
-            logging.info("Getting analysis")
-            recording.analysis = analyse.analyse_recording(prompt)
-            recording.save(name)
-            logging.info("Save analysis %s: %s", name, len(recording.analysis))
+    def submit_analysis(self, prompt: str) -> None:
+        """
+        Queue an analysis of the recording using an LLM and serve the job as
+        JSON. The first line of the prompt is the name of the recording.
+        """
+        if self.is_invalid_name(prompt.split("\n", 1)[0]):
+            return
+        job = analysis_jobs.submit(analyse.get_prompt_hash(prompt), prompt)
+        info(f"Analysis job {job.id}: {job.status}")
+        return self.send_json(job.to_dict())
+
+    def get_job(self) -> None:
+        """Serve the status, and once done the result, of a background job as JSON."""
+        job = analysis_jobs.get(self.path[len("/job/"):])
+        if not job:
+            return self.send_error(404, f"Unknown job: {self.path}")
+        return self.send_json(job.to_dict())
+
+    def get_analysis(self) -> None:
+        """Serve the stored analysis of a recording, or nothing if it was never analysed."""
+        name = urllib.parse.unquote(self.path[len("/analysis/"):])
+        if self.is_invalid_name(name):
+            return
+        stored = analyse.read_analysis(name)
         return self.send_data(
-            "text/html",
-            bytes(recording.analysis, encoding="utf-8"),
+            "text/plain",
+            bytes(stored["analysis"] if stored else "", encoding="utf-8"),
         )
 
     def get_recording_names(self) -> None:
@@ -221,30 +478,218 @@ class LogServerHandler(BaseHTTPRequestHandler):
         ]
         end = time.time()
         info(f"Returning {len(logs):,d} recordings in {end - start:.1f}s")
-        return self.send_data("text/html", bytes("\n".join(logs), encoding="utf-8"))
+        return self.send_data(
+            "text/html",
+            bytes("\n".join(logs), encoding="utf-8"),
+            {"X-Microlog-Scanning": "true" if log_watcher.is_scanning() else "false"},
+        )
 
     def load_recording(self) -> tuple[str, bytes]:
         """Load a compressed recording file."""
-        name = self.path[self.path[1:].index("/")+2:]
+        name = self.get_recording_name()
         return name, self.load_recording_by_name(name)
 
+    def get_recording_name(self) -> str:
+        """Return the name of the recording in a path of the form /<route>/<application>/<name>."""
+        path = urllib.parse.urlparse(self.path).path
+        return urllib.parse.unquote(path[path[1:].index("/")+2:])
+
+    def is_invalid_name(self, name: str) -> bool:
+        """
+        Answer 400 Bad Request when a recording name does not have the form
+        <application>/<name>, see is_valid_name. Names end up in storage
+        paths, so they must not reach outside config.S3_ROOT.
+        """
+        if is_valid_name(name):
+            return False
+        self.send_error(400, f"Expected <application>/<name>, got {self.path}")
+        return True
+
     def load_recording_by_name(self, name: str) -> bytes:
         path = os.path.join(config.S3_ROOT, f"{name}.zip")
         compressed_bytes: bytes = b""
-        with config.fs.open(path, "rb") as fd:
+        with metrics.storage_read("recording") as read, config.fs.open(path, "rb") as fd:
             compressed_bytes = cast(Any, fd.read())
+            read(len(compressed_bytes))
         return compressed_bytes
 
     def get_recording(self) -> None:
         """Serve a compressed recording file."""
+        name = self.get_recording_name()
+        if self.is_invalid_name(name):
+            return
+        etag = aggregate.get_etag(name)
+        if self.is_not_modified(etag):
+            return
         name, recording = self.load_recording()
         info(f"Send recording {name}: ({len(recording):,d} bytes)")
         return self.send_data(
             "application/microlog",
             recording,
-            {"Cache-Control": "public, max-age=86400", "Content-Encoding": "zstd"},
+            {"Cache-Control": "no-cache", "ETag": etag, "Content-Encoding": "zstd"},
+        )
+
+    def is_not_modified(self, etag: str) -> bool:
+        """
+        Answer 304 Not Modified when the client already has this version of
+        a recording. Recordings are served with "Cache-Control: no-cache", so
+        browsers revalidate them instead of showing a downsampled or
+        replaced recording from their cache.
+        """
+        cached = etag in self.headers.get("If-None-Match", "")
+        metrics.cache_lookup("client", cached)
+        if cached:
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.end_headers()
+        return cached
+
+    def get_metrics(self) -> None:
+        """Serve the metrics of the server in the Prometheus text format."""
+        metrics.catalog_recordings.set(len(log_watcher.get_recording_names()))
+        return self.send_data(
+            "text/plain; version=0.0.4",
+            bytes(metrics.registry.render(), encoding="utf-8"),
+        )
+
+    def get_query(self) -> dict[str, str]:
+        """Return the query parameters of the request path."""
+        query = urllib.parse.urlparse(self.path).query
+        return dict(urllib.parse.parse_qsl(query))
+
+    def get_aggregate(self) -> None:
+        """Serve the top-N aggregates of a recording as JSON."""
+        name = self.get_recording_name()
+        if self.is_invalid_name(name):
+            return
+        top = int(self.get_query().get("top", 20))
+        summary = aggregate.get_summary(name)
+        return self.send_json(summary.report(top))
+
+    def get_tiles(self) -> None:
+        """Serve the flamegraph blocks visible in a time range at a pixel width."""
+        name = self.get_recording_name()
+        if self.is_invalid_name(name):
+            return
+        query = self.get_query()
+        threads = (
+            {int(thread_id) for thread_id in query["threads"].split(",")}
+            if query.get("threads")
+            else None
+        )
+        pyramid = tiles.get_pyramid(name)
+        return self.send_json(
+            pyramid.query(
+                float(query.get("start", 0)),
+                float(query.get("end", sys.float_info.max)),
+                int(query.get("width", 1000)),
+                threads,
+            )
+        )
+
+    def get_chunks(self) -> None:
+        """
+        Stream a recording in time-ordered batches of JSON lines, see
+        stream.iter_chunks. When the client accepts gzip, the stream is
+        compressed, flushing the compressor after each batch so the client
+        can decode every batch as soon as it arrives.
+        """
+        name = self.get_recording_name()
+        if self.is_invalid_name(name):
+            return
+        etag = aggregate.get_etag(name)
+        if self.is_not_modified(etag):
+            return
+        chunks = stream.iter_chunks(aggregate.read_recording(name))
+        compressor = None
+        if "gzip" in self.headers.get("Accept-Encoding", ""):
+            compressor = zlib.compressobj(CHUNKS_COMPRESSION_LEVEL, zlib.DEFLATED, GZIP_WBITS)
+        self.send_response(200)
+        self.send_header("Content-type", "application/x-ndjson")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("ETag", etag)
+        if compressor:
+            self.send_header("Content-Encoding", "gzip")
+        self.end_headers()
+        try:
+            for chunk in chunks:
+                data = bytes(f"{chunk}\n", encoding="utf-8")
+                if compressor:
+                    data = compressor.compress(data) + compressor.flush(zlib.Z_SYNC_FLUSH)
+                self.wfile.write(data)
+                self.wfile.flush()
+            if compressor:
+                self.wfile.write(compressor.flush())
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+    def search_functions(self) -> None:
+        """Serve the recordings that spent time in a function as JSON."""
+        query = self.get_query()
+        application = query.get("application", "")
+        if "/" in application or "\\" in application or ".." in application:
+            return self.send_error(400, f"Expected an application name, got {application}")
+        return self.send_json(
+            search.index.query(
+                query.get("function", ""),
+                application,
+                int(query.get("limit", search.MAX_RESULTS)),
+            )
         )
 
+    def get_regressions(self) -> None:
+        """
+        Serve the regressions of a recording against earlier runs of its
+        application, or of all recently checked recordings that have any.
+        """
+        path = urllib.parse.urlparse(self.path).path
+        name = urllib.parse.unquote(path[len("/regressions/"):])
+        if not name:
+            return self.send_json(log_watcher.regressions)
+        if self.is_invalid_name(name):
+            return
+        report = regression.get_report(name)
+        return self.send_json(report.to_dict())
+
+    def get_diff(self) -> None:
+        """Serve the differential flamegraph of two recordings as JSON."""
+        query = self.get_query()
+        if self.is_invalid_name(query["base"]) or self.is_invalid_name(query["target"]):
+            return
+        return self.send_json(
+            diff.compare_recordings(
+                query["base"],
+                query["target"],
+                float(query.get("min_duration", diff.MIN_DURATION)),
+            ).to_dict()
+        )
+
+    def get_stacks(self) -> None:
+        """Serve the calls of a recording merged by stack path as JSON, for a left-heavy flamegraph."""
+        name = self.get_recording_name()
+        if self.is_invalid_name(name):
+            return
+        trie = stacks.get_trie(name)
+        min_duration = float(self.get_query().get("min_duration", stacks.MIN_DURATION))
+        return self.send_json(trie.root.to_dict(min_duration))
+
+    def get_sandwich(self) -> None:
+        """Serve the callers and callees of a function in a recording as JSON."""
+        name = self.get_recording_name()
+        if self.is_invalid_name(name):
+            return
+        query = self.get_query()
+        min_duration = float(query.get("min_duration", stacks.MIN_DURATION))
+        callers, callees = stacks.get_trie(name).sandwich(query["function"])
+        return self.send_json({
+            "callers": callers.to_dict(min_duration),
+            "callees": callees.to_dict(min_duration),
+        })
+
+    def send_json(self, data: Any) -> None:
+        """Send a JSON response."""
+        return self.send_data("application/json", bytes(json.dumps(data), encoding="utf-8"))
+
     def parse_path(self) -> tuple[str, str]:
         """Parse the log name and path from the request path."""
         slash_index = self.path.index("/", 1)
@@ -257,17 +702,148 @@ class LogServerHandler(BaseHTTPRequestHandler):
     def delete_log(self) -> Any:
         """Delete a log file and remove it from the watcher."""
         name, path = self.parse_path()
-        log_watcher.rm(name)
+        if self.is_invalid_name(name):
+            return
+        forget_recording(name)
         if config.fs:
             config.fs.rm(path)
         return self.send_data("text/html", bytes("OK", encoding="utf-8"))
 
+    def delete_logs(self) -> None:
+        """Start deleting a JSON list of recordings in the background and serve the progress."""
+        names = json.loads(b"".join(self.read_body()))
+        for name in names:
+            if not is_valid_name(name):
+                raise ValueError(f"Expected <application>/<name>, got {name}")
+        if not retention_engine.delete(names):
+            return self.send_error(409, "Another deletion is still running")
+        return self.send_json(retention_engine.progress.to_dict())
+
+    def apply_retention(self) -> None:
+        """Start applying the retention policies in the background and serve the progress."""
+        if not retention_engine.apply_policies():
+            return self.send_error(409, "Another deletion is still running")
+        return self.send_json(retention_engine.progress.to_dict())
+
     def save_log(self) -> Any:
         """Save a log file and add it to the watcher."""
         name, _ = self.parse_path()
+        if self.is_invalid_name(name):
+            return
         log_watcher.save(name)
+        log_watcher.check_regressions(name)
+        search.index.add(name)
         return self.send_data("text/html", bytes("OK", encoding="utf-8"))
 
+    def get_upload_name(self, prefix: str = "/upload/") -> str:
+        """Parse and validate the <application>/<name> of an upload request."""
+        path = urllib.parse.urlparse(self.path).path
+        name = urllib.parse.unquote(path[len(prefix):]).replace(" ", "_")
+        if not is_valid_name(name):
+            raise ValueError(f"Expected {prefix}<application>/<name>, got {self.path}")
+        return name
+
+    def read_body(self) -> Iterator[bytes]:
+        """Yield the request body in chunks, without buffering the whole body."""
+        if self.headers.get("Transfer-Encoding", "").lower() == "chunked":
+            while True:
+                size = int(self.rfile.readline().split(b";", 1)[0].strip(), 16)
+                if size == 0:
+                    while self.rfile.readline().strip():
+                        pass  # skip trailers
+                    return
+                yield from self.read_exactly(size)
+                self.rfile.readline()
+        else:
+            yield from self.read_exactly(int(self.headers.get("Content-Length", 0)))
+
+    def read_exactly(self, size: int) -> Iterator[bytes]:
+        """Yield exactly size bytes from the request body."""
+        while size > 0:
+            data = self.rfile.read(min(size, config.UPLOAD_CHUNK_SIZE))
+            if not data:
+                raise ValueError(f"Request body ended with {size:,d} bytes missing")
+            size -= len(data)
+            yield data
+
+    def upload_log(self) -> None:
+        """Stream an uploaded recording into storage and add it to the watcher."""
+        name = self.get_upload_name()
+        path = os.path.join(config.S3_ROOT, f"{name}.zip")
+        partial_path = f"{path}.part"
+        size = 0
+        config.fs.makedir(os.path.dirname(path), exist_ok=True)
+        try:
+            with config.fs.open(partial_path, "wb") as fd:
+                for chunk in self.read_body():
+                    cast(Any, fd).write(chunk)
+                    size += len(chunk)
+            config.fs.mv(partial_path, path)
+        except Exception:
+            if config.fs.exists(partial_path):
+                config.fs.rm(partial_path)
+            raise
+        aggregate.forget(name)
+        tiles.forget(name)
+        stacks.forget(name)
+        log_watcher.save(name)
+        log_watcher.check_regressions(name)
+        search.index.add(name)
+        info(f"Uploaded recording {name}: ({size:,d} bytes)")
+        url = f"{config.SERVER}#{name}"
+        return self.send_data("text/plain", bytes(url, encoding="utf-8"))
+
+    def publish_live(self) -> None:
+        """Forward a batch from a running recording to its live dashboards."""
+        name = self.get_upload_name("/live/")
+        data = b"".join(self.read_body()).decode("utf-8")
+        done = json.loads(data).get("done")
+        with live_channels_lock:
+            if done:
+                channel = live_channels.pop(name, None)
+                if channel:
+                    channel.close()
+            else:
+                channel = live_channels.get(name) or stream.LiveChannel(name)
+                live_channels[name] = channel
+                channel.publish(data)  # with the lock held, so the channel is not released
+        return self.send_data("text/plain", bytes("OK", encoding="utf-8"))
+
+    def get_live(self) -> None:
+        """Stream the batches of a running recording as Server-Sent Events."""
+        name = self.get_upload_name("/live/")
+        if name in log_watcher.get_recording_names():
+            with live_channels_lock:
+                channel = live_channels.get(name) or stream.LiveChannel(name)
+            channel.close()  # the recording already finished
+        else:
+            channel = get_live_channel(name)
+        subscriber = channel.subscribe(int(self.headers.get("Last-Event-ID") or 0))
+        self.send_response(200)
+        self.send_header("Content-type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.end_headers()
+        try:
+            while True:
+                try:
+                    sequence, message = subscriber.get(timeout=LIVE_KEEPALIVE)
+                except queue.Empty:
+                    self.wfile.write(b": keepalive\n\n")
+                    self.wfile.flush()
+                    continue
+                if message == stream.LiveChannel.OVERFLOW:
+                    break  # the EventSource reconnects and catches up
+                if message == stream.LiveChannel.DONE:
+                    self.wfile.write(bytes(f"event: done\ndata: {name}\n\n", encoding="utf-8"))
+                    break
+                self.wfile.write(bytes(f"id: {sequence}\ndata: {message}\n\n", encoding="utf-8"))
+                self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+        finally:
+            channel.unsubscribe(subscriber)
+            release_live_channel(channel)
+
     def send_data(
         self, kind: str, data: bytes, headers: dict[str, str] | None = None
     ) -> None:
@@ -281,13 +857,25 @@ class LogServerHandler(BaseHTTPRequestHandler):
         self.wfile.write(data)
 
 
+def rotate_profiles() -> None:
+    """Delete all but the most recent recordings of the server itself."""
+    runs = regression.get_application_runs(metrics.PROFILE_APPLICATION)
+    if len(runs) > config.SERVER_PROFILE_KEEP:
+        retention_engine.delete(runs[:-config.SERVER_PROFILE_KEEP])
+
+
 class Server:
     """Microlog HTTP server runner."""
     def start(self) -> None:
         """Start the Microlog HTTP server."""
         try:
             info(f"Starting Microlog server... http://{config.HOST}:{config.PORT}")
-            HTTPServer((config.HOST, config.PORT), LogServerHandler).serve_forever()
+            log_watcher.start()
+            if retention.read_policies():
+                retention_engine.schedule(config.RETENTION_INTERVAL)
+            if config.SERVER_PROFILE:
+                metrics.SelfProfiler(config.SERVER_PROFILE_INTERVAL, rotate_profiles).start()
+            ThreadingHTTPServer((config.HOST, config.PORT), LogServerHandler).serve_forever()
         except OSError:
             pass
 
@@ -0,0 +1,175 @@
+#
+# Microlog. Copyright (c) 2023 laffra, dcharbon. All rights reserved.
+#
+"""
+Stack-path aggregation of the calls in a recording.
+
+A StackTrie merges all calls with the same stack of function names into a
+single StackNode, summing their durations. It is built in a single pass
+over the calls, so it scales to recordings with millions of calls, and its
+size depends on the number of distinct stack paths, not on the number of
+calls.
+
+The same trie gives the aggregated views of the dashboard: a left-heavy
+flamegraph that merges identical stack paths, and a sandwich view with the
+callers and callees of one function, see StackTrie.sandwich.
+"""
+
+from __future__ import annotations
+
+from collections import OrderedDict
+import threading
+from typing import Any
+from typing import Iterable
+from typing import Iterator
+
+from microlog import aggregate
+from microlog import metrics
+from microlog.models import Call
+
+
+TRIE_CACHE_SIZE: int = 8
+MIN_DURATION: float = 0.001
+
+
+class StackNode:
+    """All calls of a function at one stack path."""
+
+    __slots__ = ("name", "total", "count", "children")
+
+    def __init__(self, name: str) -> None:
+        """Initialize an empty StackNode."""
+        self.name: str = name
+        self.total: float = 0.0
+        self.count: int = 0
+        self.children: dict[str, StackNode] = {}
+
+    def child(self, name: str) -> "StackNode":
+        """Return the child for a function, creating it when needed."""
+        node = self.children.get(name)
+        if node is None:
+            node = self.children[name] = StackNode(name)
+        return node
+
+    def add(self, other: "StackNode") -> None:
+        """Add the total and count of another node and of all its descendants to this node."""
+        todo: list[tuple[StackNode, StackNode]] = [(self, other)]
+        while todo:
+            node, source = todo.pop()
+            node.total += source.total
+            node.count += source.count
+            todo.extend((node.child(child.name), child) for child in source.children.values())
+
+    @property
+    def self_time(self) -> float:
+        """Return the time spent in this node, but not in its children."""
+        return max(0.0, self.total - sum(child.total for child in self.children.values()))
+
+    def to_dict(self, min_total: float = 0.0) -> dict[str, Any]:
+        """Return a JSON-friendly tree, leaving out children below min_total."""
+        return {
+            "name": self.name,
+            "total": round(self.total, 3),
+            "count": self.count,
+            "children": [
+                child.to_dict(min_total)
+                for child in self.children.values()
+                if child.total >= min_total
+            ],
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]) -> "StackNode":
+        """Create a tree of StackNodes from the output of to_dict."""
+        node = cls(data["name"])
+        node.total = data["total"]
+        node.count = data["count"]
+        for child in data["children"]:
+            node.children[child["name"]] = cls.from_dict(child)
+        return node
+
+    def __repr__(self) -> str:
+        """Return a string representation of the StackNode object."""
+        return f"<StackNode {self.name} x{self.count} total={self.total:.3f}>"
+
+
+class StackTrie:
+    """A tree of StackNodes, with a root that spans all threads."""
+
+    def __init__(self, calls: Iterable[Call] = ()) -> None:
+        """Initialize a StackTrie and add the given calls."""
+        self.root: StackNode = StackNode("")
+        self.add(calls)
+
+    def add(self, calls: Iterable[Call]) -> None:
+        """Add calls to the trie, keeping a stack of nodes parallel to the call stack."""
+        nodes: list[StackNode] = []
+        root = self.root
+        for call, stack in aggregate.walk(calls):
+            del nodes[len(stack):]
+            parent = nodes[-1] if nodes else root
+            node = parent.child(call.call_site.name)
+            node.total += call.duration
+            node.count += 1
+            if not nodes:
+                root.total += call.duration
+                root.count += 1
+            nodes.append(node)
+
+    def paths(self) -> Iterator[tuple[tuple[str, ...], StackNode]]:
+        """Yield every node with the function names on its path, depth first."""
+        todo: list[tuple[tuple[str, ...], StackNode]] = [
+            ((child.name,), child) for child in self.root.children.values()
+        ]
+        while todo:
+            path, node = todo.pop()
+            yield path, node
+            todo.extend((path + (child.name,), child) for child in node.children.values())
+
+    def sandwich(self, name: str) -> tuple[StackNode, StackNode]:
+        """
+        Return the callers and the callees of a function, each as a tree rooted
+        at the function. The callees tree merges every stack path below the
+        function. The callers tree merges every stack path above it, inverted,
+        so the direct callers are its first level. Recursive calls are counted
+        once, at their outermost call.
+        """
+        callers = StackNode(name)
+        callees = StackNode(name)
+        for path, node in self.paths():
+            if path[-1] != name or name in path[:-1]:
+                continue
+            callees.add(node)
+            caller = callers
+            caller.total += node.total
+            caller.count += node.count
+            for ancestor in reversed(path[:-1]):
+                caller = caller.child(ancestor)
+                caller.total += node.total
+                caller.count += node.count
+        return callers, callees
+
+
+_cache: OrderedDict[str, StackTrie] = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def get_trie(name: str) -> StackTrie:
+    """Get the cached StackTrie of a stored recording, building it on first use."""
+    with _cache_lock:
+        metrics.cache_lookup("stacks", name in _cache)
+        if name in _cache:
+            _cache.move_to_end(name)
+            return _cache[name]
+    trie = StackTrie(aggregate.read_recording(name).calls)
+    with _cache_lock:
+        _cache[name] = trie
+        while len(_cache) > TRIE_CACHE_SIZE:
+            _cache.popitem(last=False)
+    return trie
+
+
+def forget(name: str) -> None:
+    """Drop the cached StackTrie of a recording."""
+    with _cache_lock:
+        _cache.pop(name, None)
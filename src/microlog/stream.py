@@ -0,0 +1,372 @@
+#
+# Microlog. Copyright (c) 2023 laffra, dcharbon. All rights reserved.
+#
+"""
+Live streaming of an in-progress recording.
+
+The LiveStreamer runs in the traced process and periodically pushes the
+calls, markers, and statuses added to the recording since its last push.
+The server keeps a LiveChannel per recording that fans the batches out to
+connected dashboards using Server-Sent Events.
+
+Saved recordings are streamed to the dashboard in the same batches, in
+time order, so it can draw the start of a long recording while the rest
+is still arriving, see iter_chunks and ChunkReader.
+"""
+
+from __future__ import annotations
+
+import collections
+import json
+import logging
+import queue
+import threading
+from typing import Any
+from typing import Iterator
+import urllib.error
+import urllib.request
+
+from microlog import config
+from microlog.models import Call
+from microlog.models import CallSite
+from microlog.models import Marker
+from microlog.models import Recording
+from microlog.models import Stack
+from microlog.models import Status
+
+
+def encode_call_site(call_site: CallSite) -> list[Any]:
+    """Encode a CallSite as a JSON-friendly list."""
+    return [call_site.filename, call_site.lineno, call_site.name]
+
+
+def encode_batch(
+    calls: list[Call],
+    markers: list[Marker],
+    statuses: list[Status],
+    sites: dict[tuple[str, int, str], int] | None = None,
+) -> dict[str, Any]:
+    """
+    Encode new calls, markers, and statuses as a JSON-friendly batch. When
+    given the table of call sites sent earlier in the same stream, call sites
+    are sent as indexes into that table, and the batch lists the call sites
+    that it adds to the table.
+    """
+    added: list[list[Any]] = []
+
+    def encode_site(call_site: CallSite) -> Any:
+        if sites is None:
+            return encode_call_site(call_site)
+        key = (call_site.filename, call_site.lineno, call_site.name)
+        index = sites.get(key)
+        if index is None:
+            index = sites[key] = len(sites)
+            added.append(list(key))
+        return index
+
+    batch = {
+        "calls": [
+            [
+                call.when,
+                call.thread_id,
+                encode_site(call.call_site),
+                encode_site(call.caller_site),
+                call.depth,
+                call.duration,
+            ]
+            for call in calls
+        ],
+        "markers": [
+            [
+                marker.kind,
+                marker.when,
+                marker.message,
+                [encode_site(call_site) for call_site in marker.stack],
+                marker.duration,
+            ]
+            for marker in markers
+        ],
+        "statuses": [
+            [
+                status.when,
+                status.cpu,
+                status.system_cpu,
+                status.memory,
+                status.memory_total,
+                status.memory_free,
+                status.module_count,
+                status.object_count,
+            ]
+            for status in statuses
+        ],
+    }
+    if sites is not None:
+        batch["sites"] = added
+    return batch
+
+
+def decode_batch(
+    batch: dict[str, Any], sites: list[CallSite] | None = None
+) -> tuple[list[Call], list[Marker], list[Status]]:
+    """
+    Decode a batch created by encode_batch. For batches that refer to a table
+    of call sites, sites is that table, and receives the call sites that the
+    batch adds to it.
+    """
+    call_sites: dict[tuple[str, int, str], CallSite] = {}
+
+    def decode_call_site(site: Any) -> CallSite:
+        if sites is not None:
+            return sites[site]
+        key = tuple(site)
+        if key not in call_sites:
+            call_sites[key] = CallSite(*site)
+        return call_sites[key]
+
+    if sites is not None:
+        sites.extend(CallSite(*site) for site in batch["sites"])
+    calls = [
+        Call(when, thread_id, decode_call_site(call_site), decode_call_site(caller_site),
+             depth, duration)
+        for when, thread_id, call_site, caller_site, depth, duration in batch["calls"]
+    ]
+    markers = [
+        Marker(
+            kind,
+            when,
+            message,
+            Stack(when, call_sites=[decode_call_site(call_site) for call_site in stack]),
+            duration,
+        )
+        for kind, when, message, stack, duration in batch["markers"]
+    ]
+    statuses = [Status(*status) for status in batch["statuses"]]
+    return calls, markers, statuses
+
+
+def iter_chunks(recording: Recording, size: int = config.CHUNK_CALLS) -> Iterator[str]:
+    """
+    Split a saved recording into lines of JSON for progressive loading. The
+    first line has the totals and the analysis of the recording. Each next
+    line is a batch of size calls, in order of their start time, with the
+    markers and statuses up to the start of the last call in the batch. Each
+    call site is sent once, in the first batch that uses it, and referred to
+    by its index after that, see encode_batch.
+    """
+    calls = sorted(recording.calls, key=lambda call: call.when)
+    markers = sorted(recording.markers, key=lambda marker: marker.when)
+    statuses = sorted(recording.statuses, key=lambda status: status.when)
+    yield json.dumps({
+        "calls": len(calls),
+        "markers": len(markers),
+        "statuses": len(statuses),
+        "analysis": recording.analysis,
+    })
+    sites: dict[tuple[str, int, str], int] = {}
+    marker_index = status_index = 0
+    for start in range(0, max(len(calls), 1), size):
+        batch = calls[start:start + size]
+        last = start + size >= len(calls)
+        until = float("inf") if last else batch[-1].when
+        marker_end = marker_index
+        while marker_end < len(markers) and markers[marker_end].when <= until:
+            marker_end += 1
+        status_end = status_index
+        while status_end < len(statuses) and statuses[status_end].when <= until:
+            status_end += 1
+        yield json.dumps(encode_batch(
+            batch, markers[marker_index:marker_end], statuses[status_index:status_end], sites
+        ), separators=(",", ":"))
+        marker_index, status_index = marker_end, status_end
+
+
+class ChunkReader:
+    """Decodes the lines of iter_chunks from pieces of a response of any size."""
+
+    def __init__(self) -> None:
+        """Initialize a ChunkReader that has not seen any data yet."""
+        self.pending: list[bytes] = []
+        self.header: dict[str, Any] | None = None
+        self.sites: list[CallSite] = []
+        self.calls: int = 0
+
+    def feed(self, data: bytes) -> list[tuple[list[Call], list[Marker], list[Status]]]:
+        """Add the next piece of the response and return the batches it completes."""
+        lines = data.split(b"\n")
+        if len(lines) == 1:
+            self.pending.append(data)
+            return []
+        lines[0] = b"".join(self.pending) + lines[0]
+        self.pending = [lines.pop()]
+        batches = []
+        for line in lines:
+            if not line:
+                continue
+            message = json.loads(line)
+            if self.header is None:
+                self.header = message
+                continue
+            batch = decode_batch(message, self.sites)
+            self.calls += len(batch[0])
+            batches.append(batch)
+        return batches
+
+    def get_progress(self) -> float:
+        """Return the fraction of the calls received so far."""
+        total = self.header["calls"] if self.header else 0
+        return min(1.0, self.calls / total) if total else 0.0
+
+
+class LiveStreamer(threading.Thread):
+    """
+    Background thread that pushes new parts of the recording to the server.
+
+    The recording itself is the buffer: the streamer only keeps cursors into
+    its lists. Each push sends at most config.LIVE_MAX_BATCH items per kind.
+    When the server is slow or down, the delay between pushes backs off up to
+    config.LIVE_MAX_DELAY, and when the backlog grows beyond
+    config.LIVE_MAX_BACKLOG, the oldest unsent items are skipped. The saved
+    recording is always complete; only the live view loses detail.
+    """
+
+    def __init__(self, recording: Recording, identifier: str) -> None:
+        """Initialize LiveStreamer and start pushing."""
+        threading.Thread.__init__(self)
+        self.daemon: bool = True
+        self.recording: Recording = recording
+        self.identifier: str = identifier.replace(" ", "_")
+        self.url: str = f"{config.SERVER.rstrip('/')}/live/{self.identifier}"
+        self.delay: float = config.LIVE_DELAY
+        self.cursors: dict[str, int] = {"calls": 0, "markers": 0, "statuses": 0}
+        self.skipped: int = 0
+        self.stopping: threading.Event = threading.Event()
+        self.start()
+
+    def run(self) -> None:
+        """Run the push loop."""
+        while not self.stopping.wait(self.delay):
+            self.push()
+
+    def next_batch(self) -> tuple[dict[str, Any], dict[str, int]]:
+        """Return the next batch to push and the cursors after pushing it."""
+        cursors: dict[str, int] = {}
+        items: dict[str, list[Any]] = {}
+        for kind, start in self.cursors.items():
+            models = getattr(self.recording, kind)
+            end = len(models)
+            if end - start > config.LIVE_MAX_BACKLOG:
+                self.skipped += end - config.LIVE_MAX_BATCH - start
+                start = end - config.LIVE_MAX_BATCH
+            end = min(end, start + config.LIVE_MAX_BATCH)
+            items[kind] = models[start:end]
+            cursors[kind] = end
+        return encode_batch(items["calls"], items["markers"], items["statuses"]), cursors
+
+    def push(self) -> bool:
+        """Push the next batch to the server, backing off when that fails."""
+        batch, cursors = self.next_batch()
+        if cursors == self.cursors:
+            return True
+        if self.post(batch):
+            self.cursors = cursors
+            self.delay = config.LIVE_DELAY
+            return True
+        self.delay = min(self.delay * 2, config.LIVE_MAX_DELAY)
+        return False
+
+    def post(self, data: dict[str, Any]) -> bool:
+        """Post JSON data to the live channel of this recording."""
+        request = urllib.request.Request(
+            self.url,
+            data=bytes(json.dumps(data), encoding="utf-8"),
+            headers={"Content-Type": "application/json"},
+            method="POST",
+        )
+        try:
+            with urllib.request.urlopen(request, timeout=config.LIVE_TIMEOUT) as response:
+                response.read()
+            return True
+        except (urllib.error.URLError, OSError) as e:
+            logging.debug("Microlog: Could not push live data to %s: %s", self.url, e)
+            return False
+
+    def stop(self) -> None:
+        """Stop pushing and tell the dashboards the recording is complete."""
+        self.stopping.set()
+        if self.skipped:
+            logging.warning("Microlog: Skipped %s items in the live view", self.skipped)
+        self.post({"done": True})
+
+
+class LiveChannel:
+    """
+    Server-side fan-out of live batches to connected dashboards.
+
+    Every batch gets a sequence number that is sent as the SSE event id, so a
+    dashboard that reconnects with Last-Event-ID only receives what it missed.
+    A dashboard that falls behind by more than config.LIVE_SUBSCRIBER_QUEUE
+    batches is disconnected; its EventSource reconnects and catches up from
+    the history that the channel keeps.
+    """
+
+    DONE: str = "done"
+    OVERFLOW: str = "overflow"
+
+    def __init__(self, name: str) -> None:
+        """Initialize an empty LiveChannel."""
+        self.name: str = name
+        self.sequence: int = 0
+        self.history: collections.deque[tuple[int, str]] = collections.deque(
+            maxlen=config.LIVE_HISTORY
+        )
+        self.subscribers: list[queue.Queue[tuple[int, str]]] = []
+        self.done: bool = False
+        self.lock = threading.Lock()
+
+    def publish(self, message: str) -> None:
+        """Send a batch to all subscribers and keep it for late subscribers."""
+        with self.lock:
+            self.sequence += 1
+            self.history.append((self.sequence, message))
+            for subscriber in list(self.subscribers):
+                self.put(subscriber, (self.sequence, message))
+
+    def close(self) -> None:
+        """Tell all subscribers that the recording is complete."""
+        with self.lock:
+            self.done = True
+            for subscriber in list(self.subscribers):
+                self.put(subscriber, (self.sequence, self.DONE))
+
+    def put(self, subscriber: queue.Queue[tuple[int, str]], item: tuple[int, str]) -> None:
+        """Queue an item for a subscriber, disconnecting it when it falls behind."""
+        try:
+            subscriber.put_nowait(item)
+        except queue.Full:
+            if subscriber in self.subscribers:
+                self.subscribers.remove(subscriber)
+            while not subscriber.empty():
+                subscriber.get_nowait()
+            subscriber.put_nowait((self.sequence, self.OVERFLOW))
+
+    def subscribe(self, last_sequence: int = 0) -> queue.Queue[tuple[int, str]]:
+        """
+        Return a queue that receives missed batches followed by new ones. Only
+        the newest missed batches that fit in the queue are replayed, leaving
+        room for the end of the recording.
+        """
+        subscriber: queue.Queue[tuple[int, str]] = queue.Queue(config.LIVE_SUBSCRIBER_QUEUE)
+        with self.lock:
+            self.subscribers.append(subscriber)
+            missed = [item for item in self.history if item[0] > last_sequence]
+            for item in missed[max(0, len(missed) - config.LIVE_SUBSCRIBER_QUEUE + 1):]:
+                self.put(subscriber, item)
+            if self.done:
+                self.put(subscriber, (self.sequence, self.DONE))
+        return subscriber
+
+    def unsubscribe(self, subscriber: queue.Queue[tuple[int, str]]) -> None:
+        """Stop sending batches to a subscriber."""
+        with self.lock:
+            if subscriber in self.subscribers:
+                self.subscribers.remove(subscriber)
@@ -0,0 +1,324 @@
+#
+# Microlog. Copyright (c) 2023 laffra, dcharbon. All rights reserved.
+#
+"""
+Level-of-detail tiles for the flamegraph.
+
+A Pyramid holds the calls of a recording at multiple resolutions. At each
+level, calls narrower than one pixel are merged with their sub-pixel
+neighbors at the same thread and depth into a single aggregate block. A
+query for a time range and pixel width is answered from the coarsest level
+that still shows every pixel, so the response size is bounded by the number
+of pixels, not by the number of calls in the recording.
+
+Calls that arrive in order of start time, as when the dashboard streams a
+recording, are added to all levels without building the pyramid again.
+"""
+
+from __future__ import annotations
+
+import bisect
+from collections import OrderedDict
+import threading
+from typing import Any
+from typing import Iterable
+
+from microlog import aggregate
+from microlog import metrics
+from microlog.models import Call
+
+
+BASE_RESOLUTION: float = 0.001  # seconds per pixel at the finest level
+PYRAMID_CACHE_SIZE: int = 8
+
+
+class Block:
+    """A call, or a run of merged sub-pixel calls, at one level of a Pyramid."""
+
+    __slots__ = ("when", "duration", "thread_id", "depth", "name", "count")
+
+    def __init__(
+        self,
+        when: float,
+        duration: float,
+        thread_id: int,
+        depth: int,
+        name: str,
+        count: int = 1,
+    ) -> None:
+        """Initialize a Block instance."""
+        self.when: float = when
+        self.duration: float = duration
+        self.thread_id: int = thread_id
+        self.depth: int = depth
+        self.name: str = name
+        self.count: int = count
+
+    @classmethod
+    def from_call(cls, call: Call) -> "Block":
+        """Create a Block for a single call."""
+        return cls(call.when, call.duration, call.thread_id, call.depth, call.call_site.name)
+
+    def to_list(self) -> list[Any]:
+        """Return a compact JSON-friendly representation."""
+        return [
+            round(self.when, 3),
+            round(self.duration, 3),
+            self.thread_id,
+            self.depth,
+            self.name,
+            self.count,
+        ]
+
+    def __repr__(self) -> str:
+        """Return a string representation of the Block object."""
+        return f"<Block {self.name or '*'} x{self.count} @{self.when:.3f}+{self.duration:.3f}>"
+
+
+def merge(blocks: Iterable[Block], resolution: float) -> list[Block]:
+    """
+    Merge runs of sub-pixel blocks of the same row, where a row is a
+    (thread, depth) pair. The blocks must be sorted by time.
+    """
+    level = Level(resolution)
+    for block in blocks:
+        level.add(block)
+    return level.blocks
+
+
+class Row:
+    """
+    The blocks of one thread at one depth, sorted by start time, with the
+    running maximum of their end times, see microlog.dashboard.spatial.
+    """
+
+    __slots__ = ("starts", "reach", "blocks")
+
+    def __init__(self) -> None:
+        """Initialize an empty Row."""
+        self.starts: list[float] = []
+        self.reach: list[float] = []
+        self.blocks: list[Block] = []
+
+    def append(self, block: Block) -> None:
+        """Add a block that starts at or after all blocks in the row."""
+        end = block.when + block.duration
+        self.starts.append(block.when)
+        self.reach.append(max(end, self.reach[-1]) if self.reach else end)
+        self.blocks.append(block)
+
+    def grow(self) -> None:
+        """Update the running maximum after the last block became longer."""
+        block = self.blocks[-1]
+        self.reach[-1] = max(self.reach[-1], block.when + block.duration)
+
+    def query(self, start: float, end: float) -> list[Block]:
+        """Return the blocks that overlap the given time range."""
+        first = bisect.bisect_left(self.reach, start)
+        last = bisect.bisect_right(self.starts, end)
+        return [
+            block
+            for block in self.blocks[first:last]
+            if block.when + block.duration >= start
+        ]
+
+    def __len__(self) -> int:
+        """Return the number of blocks in this row."""
+        return len(self.blocks)
+
+
+class Level:
+    """
+    All blocks of a Pyramid at a single resolution, in rows per thread and
+    depth. The last block of a row may be an open run of sub-pixel blocks
+    that still grows as blocks are added. Only closed blocks are passed on
+    to the next, coarser, level, so queries include the open runs of the
+    finer levels.
+    """
+
+    def __init__(self, resolution: float, finer: Level | None = None) -> None:
+        """Initialize an empty Level on top of the next finer level, if any."""
+        self.resolution: float = resolution
+        self.finer: Level | None = finer
+        self.blocks: list[Block] = []
+        self.rows: dict[tuple[int, int], Row] = {}
+        self.open: dict[tuple[int, int], Block] = {}
+        self.passed: dict[tuple[int, int], int] = {}
+
+    def add(self, block: Block) -> None:
+        """Add a block that starts at or after the earlier blocks of its row, merging it if it is sub-pixel."""
+        key = (block.thread_id, block.depth)
+        row = self.rows.get(key)
+        if row is None:
+            row = self.rows[key] = Row()
+        current = self.open.get(key)
+        if block.duration >= self.resolution:
+            self.open.pop(key, None)
+        elif current and block.when - (current.when + current.duration) < self.resolution:
+            current.duration = max(current.duration, block.when + block.duration - current.when)
+            current.count += block.count
+            if current.name != block.name:
+                current.name = ""
+            row.grow()
+            return
+        else:
+            block = self.open[key] = Block(
+                block.when, block.duration, block.thread_id, block.depth, block.name, block.count
+            )
+        row.append(block)
+        self.blocks.append(block)
+
+    def pass_closed(self, key: tuple[int, int]) -> list[Block]:
+        """Return the closed blocks of a row that were not passed on to the coarser level yet."""
+        row = self.rows.get(key)
+        if row is None:
+            return []
+        closed = len(row) - (key in self.open)
+        passed = self.passed.get(key, 0)
+        self.passed[key] = closed
+        return row.blocks[passed:closed]
+
+    def close(self) -> None:
+        """Close all open runs."""
+        self.open.clear()
+
+    def query(self, start: float, end: float, threads: set[int] | None = None) -> list[Block]:
+        """Return the blocks that overlap the given time range."""
+        blocks = [
+            block
+            for (thread_id, _), row in self.rows.items()
+            if threads is None or thread_id in threads
+            for block in row.query(start, end)
+        ]
+        finer = self.finer
+        while finer:
+            blocks.extend(
+                block
+                for (thread_id, _), block in finer.open.items()
+                if (threads is None or thread_id in threads)
+                and block.when <= end and block.when + block.duration >= start
+            )
+            finer = finer.finer
+        return blocks
+
+    def __len__(self) -> int:
+        """Return the number of blocks in this level."""
+        return len(self.blocks)
+
+
+class Pyramid:
+    """
+    Multi-resolution levels of the calls of a recording. Calls that arrive
+    in order of their start time, as when a recording is streamed, see
+    stream.iter_chunks, are added with extend without building the levels
+    again.
+    """
+
+    def __init__(self, calls: Iterable[Call] = ()) -> None:
+        """Build all levels, each one merging the blocks of the level below."""
+        self.threads: list[int] = []
+        self.end: float = 0.0
+        self.last: float = float("-inf")
+        self.levels: list[Level] = [Level(BASE_RESOLUTION)]
+        self.extend(calls)
+        self.close()
+
+    def extend(self, calls: Iterable[Call]) -> bool:
+        """
+        Add calls that start at or after the calls added before. Returns
+        False, without adding any, when a call starts earlier, in which case
+        the pyramid has to be built again.
+        """
+        blocks = sorted(
+            (Block.from_call(call) for call in calls),
+            key=lambda block: (block.when, block.depth),
+        )
+        if not blocks:
+            return True
+        if blocks[0].when < self.last:
+            return False
+        self.last = blocks[-1].when
+        self.threads = sorted(set(self.threads).union(block.thread_id for block in blocks))
+        self.end = max(self.end, max(block.when + block.duration for block in blocks))
+        for block in blocks:
+            self.levels[0].add(block)
+        keys = {(block.thread_id, block.depth) for block in blocks}
+        for finer, coarser in zip(self.levels, self.levels[1:]):
+            closed = [block for key in keys for block in finer.pass_closed(key)]
+            if not closed:
+                break
+            for block in closed:
+                coarser.add(block)
+        self.add_levels()
+        return True
+
+    def close(self) -> None:
+        """
+        Pass the open runs of each level on to the coarser levels. Calls
+        added after this start new runs.
+        """
+        for finer, coarser in zip(self.levels, self.levels[1:]):
+            finer.close()
+            for key in list(finer.rows):
+                for block in finer.pass_closed(key):
+                    coarser.add(block)
+        self.add_levels()
+
+    def add_levels(self) -> None:
+        """Add coarser levels until a pixel covers the whole recording or a level has a single block."""
+        top = self.levels[-1]
+        while top.resolution < self.end and len(top) > 1:
+            coarser = Level(top.resolution * 2, top)
+            for key in list(top.rows):
+                for block in top.pass_closed(key):
+                    coarser.add(block)
+            self.levels.append(coarser)
+            top = coarser
+
+    def get_level(self, resolution: float) -> Level:
+        """Return the coarsest level that is at least as detailed as resolution."""
+        for level in reversed(self.levels):
+            if level.resolution <= resolution:
+                return level
+        return self.levels[0]
+
+    def query(
+        self,
+        start: float,
+        end: float,
+        width: int,
+        threads: set[int] | None = None,
+    ) -> dict[str, Any]:
+        """Return the visible blocks for a time range drawn at the given pixel width."""
+        level = self.get_level((end - start) / max(1, width))
+        return {
+            "resolution": level.resolution,
+            "threads": self.threads,
+            "blocks": [block.to_list() for block in level.query(start, end, threads)],
+        }
+
+
+_cache: OrderedDict[str, Pyramid] = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def get_pyramid(name: str) -> Pyramid:
+    """Get the cached Pyramid of a recording, building it on first use."""
+    with _cache_lock:
+        metrics.cache_lookup("pyramid", name in _cache)
+        if name in _cache:
+            _cache.move_to_end(name)
+            return _cache[name]
+    pyramid = Pyramid(aggregate.read_recording(name).calls)
+    with _cache_lock:
+        _cache[name] = pyramid
+        while len(_cache) > PYRAMID_CACHE_SIZE:
+            _cache.popitem(last=False)
+    return pyramid
+
+
+def forget(name: str) -> None:
+    """Drop the cached Pyramid of a recording."""
+    with _cache_lock:
+        _cache.pop(name, None)
+
@@ -120,6 +120,7 @@ class Tracer(threading.Thread):
         self.delay: float = 0.0
         self.open_files: dict[Any, tuple[Any, float, list[Any]]] = {}
         self.original_write: Callable[..., None] = sys.stdout.write
+        self.log_handler: logging.Handler | None = None
         self.running: bool = False
         self.already_tracked_imports: set[str] = set()
         self.start()
@@ -157,6 +158,11 @@ class Tracer(threading.Thread):
         }
         gc.callbacks.append(self.gc_ran)
 
+    def untrack_gc(self) -> None:
+        """Stop tracking garbage collection events."""
+        if self.gc_ran in gc.callbacks:
+            gc.callbacks.remove(self.gc_ran)
+
     def gc_ran(self, phase: str, info: dict[str, Any]) -> None:
         """Callback for GC events."""
         if not self.running:
@@ -206,7 +212,13 @@ class Tracer(threading.Thread):
                 print(msg)
                 api.log(record.levelno, msg)
 
-        logging.getLogger().addHandler(LogStreamHandler())
+        self.log_handler = LogStreamHandler()
+        logging.getLogger().addHandler(self.log_handler)
+
+    def untrack_logging(self) -> None:
+        """Remove the logging handler, so repeated recordings do not log twice."""
+        if self.log_handler:
+            logging.getLogger().removeHandler(self.log_handler)
 
     def sample(self, when:float) -> None:
         """
@@ -287,6 +299,8 @@ class Tracer(threading.Thread):
             self.add_open_files_warning()
             self.show_stats()
             self.untrack_print()
+            self.untrack_logging()
+            self.untrack_gc()
         except Exception as e: # pylint: disable=broad-except
             print("Microlog: Error while stopping tracer", e)
 
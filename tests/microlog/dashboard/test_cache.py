@@ -0,0 +1,59 @@
+"""Tests for the cache of decoded recordings in the dashboard"""
+
+# pylint: disable=missing-class-docstring
+# pylint: disable=missing-function-docstring
+
+from microlog.dashboard import cache
+
+
+def create_recording(calls, etag='"v1"'):
+    return cache.CachedRecording(etag, [(list(range(calls)), [], ["status"])], "analysis")
+
+
+class TestRecordingCache:
+    def test_get(self):
+        """Test a cached recording is returned with its entity tag and batches."""
+        recordings = cache.RecordingCache(100)
+        recordings.put("app/run", create_recording(9))
+        cached = recordings.get("app/run")
+        assert cached.etag == '"v1"'
+        assert cached.size == 10
+        assert recordings.size == 10
+        assert recordings.get("app/other") is None
+
+    def test_evicts_least_recently_used(self):
+        """Test the least recently opened recordings are evicted to stay within budget."""
+        recordings = cache.RecordingCache(25)
+        recordings.put("app/a", create_recording(9))
+        recordings.put("app/b", create_recording(9))
+        recordings.get("app/a")
+        recordings.put("app/c", create_recording(9))
+        assert "app/a" in recordings
+        assert "app/b" not in recordings
+        assert "app/c" in recordings
+        assert recordings.size == 20
+
+    def test_put_replaces_version(self):
+        """Test a new version of a recording replaces the old one."""
+        recordings = cache.RecordingCache(100)
+        recordings.put("app/run", create_recording(9))
+        recordings.put("app/run", create_recording(19, '"v2"'))
+        assert len(recordings) == 1
+        assert recordings.get("app/run").etag == '"v2"'
+        assert recordings.size == 20
+
+    def test_skips_recordings_over_budget(self):
+        """Test a recording larger than the budget is not cached."""
+        recordings = cache.RecordingCache(5)
+        recordings.put("app/run", create_recording(9))
+        assert not recordings
+        assert recordings.size == 0
+
+    def test_forget(self):
+        """Test a deleted recording is removed."""
+        recordings = cache.RecordingCache(100)
+        recordings.put("app/run", create_recording(9))
+        recordings.forget("app/run")
+        recordings.forget("app/run")
+        assert len(recordings) == 0
+        assert recordings.size == 0
@@ -0,0 +1,59 @@
+"""Tests for the columnar store of calls in the dashboard"""
+
+# pylint: disable=missing-class-docstring
+# pylint: disable=missing-function-docstring
+
+from microlog.dashboard import calltable
+from microlog.models import Call
+from microlog.models import CallSite
+
+
+def create_table():
+    colors = []
+    table = calltable.CallTable(
+        lambda name: f"color-{name}",
+        lambda name: colors.append(name) or len(colors) - 1,
+    )
+    main = CallSite("main.py", 1, "main..main")
+    load = CallSite("main.py", 5, "main..load")
+    table.add_all([
+        Call(0.0, 1, main, main, 0, 2.0),
+        Call(0.5, 1, load, main, 1, 0.5),
+        Call(1.5, 1, load, main, 1, 0.25),
+    ])
+    return table, colors
+
+
+class TestCallTable:
+    def test_columns(self):
+        """Test calls are stored as columns of their start, duration, and depth."""
+        table, _ = create_table()
+        assert len(table) == 3
+        assert list(table.when) == [0.0, 0.5, 1.5]
+        assert list(table.duration) == [2.0, 0.5, 0.25]
+        assert list(table.depth) == [0, 1, 1]
+        assert table.get_name(2) == "main..load"
+
+    def test_names(self):
+        """Test colors and search indexes are computed once per name."""
+        table, names = create_table()
+        assert names == ["main..main", "main..load"]
+        assert table.get_color(1) == table.get_color(2) == "color-main..load"
+        assert table.get_match_index(0) == 0
+        assert table.get_match_index(2) == 1
+
+    def test_add_all(self):
+        """Test add_all returns the indexes of the added calls."""
+        table, _ = create_table()
+        site = CallSite("main.py", 9, "main..save")
+        indexes = table.add_all([Call(3.0, 1, site, site, 0, 1.0)])
+        assert list(indexes) == [3]
+        assert table.models[3].call_site is site
+
+    def test_clear(self):
+        """Test clear removes all calls and names."""
+        table, _ = create_table()
+        table.clear()
+        assert len(table) == 0
+        assert not table.names
+        assert not table.when
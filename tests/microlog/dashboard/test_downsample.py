@@ -0,0 +1,55 @@
+"""Tests for the downsampling of status samples in the timeline"""
+
+# pylint: disable=missing-class-docstring
+# pylint: disable=missing-function-docstring
+
+from array import array
+
+from microlog.dashboard import downsample
+
+
+class Sample:
+    def __init__(self, cpu, memory):
+        self.cpu = cpu
+        self.memory = memory
+
+
+class TestDownsample:
+    def test_m4_keeps_spikes(self):
+        """Test each bucket keeps its first, minimum, maximum, and last sample."""
+        times = array("d", [n * 0.1 for n in range(20)])
+        cpu = array("d", [50.0] * 20)
+        cpu[3] = 100.0
+        cpu[14] = 0.0
+        series = downsample.m4(times, {"cpu": cpu}, 1.0)
+        series_times, values = series["cpu"]
+
+        assert list(values) == [50.0, 100.0, 50.0, 50.0, 0.0, 50.0]
+        assert series_times[1] == times[3]
+        assert series_times[4] == times[14]
+
+    def test_levels(self):
+        """Test levels are cached until new samples arrive, and narrow buckets use all samples."""
+        downsampler = downsample.Downsampler(("cpu", "memory"), base_width=0.5)
+        for n in range(100):
+            downsampler.add(n * 0.1, Sample(n % 7, 1000 + n))
+
+        assert len(downsampler.get_series(0.1)["cpu"][0]) == 100
+        series = downsampler.get_series(2.0)
+        assert downsampler.get_series(1.5) is series
+        assert len(series["memory"][0]) < 100
+        assert max(series["cpu"][1]) == 6
+
+        downsampler.add(10.0, Sample(99, 0))
+        assert max(downsampler.get_series(2.0)["cpu"][1]) == 99
+
+    def test_get_range(self):
+        """Test only the viewport is returned, with one sample beyond each edge."""
+        downsampler = downsample.Downsampler(("cpu",))
+        for n in range(10):
+            downsampler.add(float(n), Sample(n, 0))
+        times, values = downsampler.get(3.5, 5.5, 0.001)["cpu"]
+        assert list(times) == [3.0, 4.0, 5.0, 6.0]
+        assert list(values) == [3.0, 4.0, 5.0, 6.0]
+        downsampler.clear()
+        assert len(downsampler) == 0
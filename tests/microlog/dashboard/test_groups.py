@@ -0,0 +1,49 @@
+"""Tests for the statistics of similar calls in the dashboard"""
+
+# pylint: disable=missing-class-docstring
+# pylint: disable=missing-function-docstring
+
+import pytest
+
+from microlog.dashboard import groups
+
+
+def create_group():
+    index = groups.GroupIndex()
+    for name, duration in [("a", 0.2), ("b", 0.1), ("c", 0.9), ("d", 0.2)]:
+        index.add(("load", "main"), name, duration)
+    index.add(("save", "main"), "e", 1.0)
+    return index.get(("load", "main"))
+
+
+class TestGroups:
+    def test_statistics(self):
+        """Test the count, total, mean, and standard deviation of a group."""
+        group = create_group()
+        assert group.count == 4
+        assert group.total == pytest.approx(1.4)
+        assert group.mean == pytest.approx(0.35)
+        assert group.stddev == pytest.approx(0.3201, abs=1e-4)
+
+    def test_anomalies(self):
+        """Test calls well above the mean are anomalies."""
+        group = create_group()
+        assert group.get_anomalies() == ["c"]
+        assert group.count_anomalies() == 1
+        assert group.is_anomaly(0.9)
+        assert not group.is_anomaly(0.4)
+
+    def test_slowest(self):
+        """Test calls are sorted by duration, slowest first."""
+        assert create_group().get_slowest() == ["c", "d", "a", "b"]
+        assert create_group().get_slowest(2) == ["c", "d"]
+        assert create_group().get_slowest(10) == ["c", "d", "a", "b"]
+
+    def test_update(self):
+        """Test calls added later are included on the next lookup, and unknown keys are empty."""
+        index = groups.GroupIndex()
+        index.add("load", "a", 1.0)
+        assert index.get("load").count == 1
+        index.add("load", "b", 3.0)
+        assert index.get("load").mean == 2.0
+        assert index.get("missing").count == 0
@@ -0,0 +1,103 @@
+"""Tests for microlog.dashboard.icicle."""
+
+from microlog.dashboard import icicle
+
+
+TREE = {
+    "name": "",
+    "base": 10.0,
+    "target": 12.0,
+    "children": [
+        {
+            "name": "app..main",
+            "base": 10.0,
+            "target": 12.0,
+            "children": [
+                {"name": "app..small", "base": 1.0, "target": 1.0, "children": []},
+                {"name": "app..large", "base": 4.0, "target": 8.0, "children": []},
+                {"name": "app..gone", "base": 2.0, "target": 0.0, "children": []},
+            ],
+        }
+    ],
+}
+
+
+def test_layout_is_left_heavy():
+    """Test the widest children come first and removed paths are not shown."""
+    blocks = icicle.layout(TREE)
+
+    assert [(block.name, block.depth, block.x, block.w) for block in blocks] == [
+        ("app..main", 0, 0.0, 12.0),
+        ("app..large", 1, 0.0, 8.0),
+        ("app..small", 1, 8.0, 1.0),
+    ]
+    assert "change: +4.000s (+100.0%)" in blocks[1].describe()
+
+
+def test_colors():
+    """Test slower paths are red, faster paths blue, and unchanged paths white."""
+    assert icicle.get_color(1.0, 2.0) == "rgb(255,127,127)"
+    assert icicle.get_color(2.0, 1.0) == "rgb(127,127,255)"
+    assert icicle.get_color(1.0, 1.0) == "rgb(255,255,255)"
+
+
+STACKS = {
+    "name": "",
+    "total": 10.0,
+    "count": 1,
+    "children": [
+        {
+            "name": "app..main",
+            "total": 10.0,
+            "count": 1,
+            "children": [
+                {"name": "app..small", "total": 1.0, "count": 100, "children": []},
+                {"name": "app..large", "total": 6.0, "count": 2, "children": []},
+            ],
+        }
+    ],
+}
+
+
+def test_layout_stacks():
+    """Test identical stack paths are shown once, widest first."""
+    frames = icicle.layout_stacks(STACKS)
+
+    assert [(frame.name, frame.depth, frame.x, frame.w) for frame in frames] == [
+        ("app..main", 0, 0.0, 10.0),
+        ("app..large", 1, 0.0, 6.0),
+        ("app..small", 1, 6.0, 1.0),
+    ]
+    assert "calls: 100" in frames[2].describe()
+
+
+def test_layout_sandwich():
+    """Test callers are stacked above the function and callees below it."""
+    callers = {
+        "name": "app..parse",
+        "total": 3.0,
+        "count": 3,
+        "children": [
+            {
+                "name": "app..load",
+                "total": 3.0,
+                "count": 3,
+                "children": [{"name": "app..main", "total": 2.0, "count": 2, "children": []}],
+            },
+        ],
+    }
+    callees = {
+        "name": "app..parse",
+        "total": 3.0,
+        "count": 3,
+        "children": [{"name": "app..scan", "total": 1.0, "count": 9, "children": []}],
+    }
+
+    frames = icicle.layout_sandwich(callers, callees)
+
+    assert [(frame.name, frame.depth, frame.w) for frame in frames] == [
+        ("app..main", 0, 2.0),
+        ("app..load", 1, 3.0),
+        ("app..parse", 2, 3.0),
+        ("app..scan", 3, 1.0),
+    ]
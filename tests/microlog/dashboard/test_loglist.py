@@ -0,0 +1,62 @@
+"""Tests for the entries of the log tab"""
+
+# pylint: disable=missing-class-docstring
+# pylint: disable=missing-function-docstring
+
+from microlog.dashboard import loglist
+
+
+def create_index():
+    index = loglist.LogIndex()
+    index.add_all([
+        loglist.LogEntry(2.0, "Training the model"),
+        loglist.LogEntry(0.5, "Loading data from disk"),
+        loglist.LogEntry(1.0, "Data loaded, 1000 rows"),
+    ])
+    return index
+
+
+class TestLogIndex:
+    def test_sorted(self):
+        """Test entries are sorted by time, also when added out of order."""
+        index = create_index()
+        index.add(loglist.LogEntry(0.1, "Starting"))
+        assert [entry.when for entry in index.entries] == [0.1, 0.5, 1.0, 2.0]
+
+    def test_filter(self):
+        """Test each term of a query must occur in a word of the message."""
+        index = create_index()
+        assert index.filter("") == [0, 1, 2]
+        assert index.filter("DATA") == [0, 1]
+        assert index.filter("load rows") == [1]
+        assert index.filter("odel") == [2]
+        assert index.filter("missing") == []
+
+    def test_filter_after_add(self):
+        """Test new entries are included in the filter results."""
+        index = create_index()
+        assert index.filter("model") == [2]
+        index.add(loglist.LogEntry(3.0, "Saving the model"))
+        assert index.filter("model") == [2, 3]
+        index.add(loglist.LogEntry(0.0, "Model config"))
+        assert index.filter("model") == [0, 3, 4]
+
+    def test_find(self):
+        """Test jumping to a point in time, in all rows and in filtered rows."""
+        index = create_index()
+        assert index.find(index.filter(""), 0.7) == 1
+        assert index.find(index.filter("data"), 5.0) == 2
+
+    def test_lazy_html(self):
+        """Test messages are converted to HTML once, when first needed."""
+        converted = []
+
+        def convert(message):
+            converted.append(message)
+            return f"<b>{message}</b>"
+
+        entry = loglist.LogEntry(0.0, "hello", convert)
+        assert not converted
+        assert entry.get_html() == "<b>hello</b>"
+        assert entry.get_html() == "<b>hello</b>"
+        assert converted == ["hello"]
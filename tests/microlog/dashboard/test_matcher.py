@@ -0,0 +1,51 @@
+"""Tests for the cached span search of the dashboard"""
+
+# pylint: disable=missing-class-docstring
+# pylint: disable=missing-function-docstring
+
+from microlog.dashboard import matcher
+
+
+class TestMatcher:
+    def test_bitmap(self):
+        """Test a query is evaluated once per text, ignoring case."""
+        compiled = []
+
+        def compile_query(query):
+            compiled.append(query)
+            return matcher.compile_regex(query)
+
+        search = matcher.Matcher(compile_query)
+        load = search.add("app.load", "App.load")
+        search.add("app.train", "app.train")
+
+        assert search.add("app.load", "App.load") == load
+        assert search.get_bitmap("LOAD|train$") == bytearray([1, 1])
+        assert search.get_bitmap("load") == bytearray([1, 0])
+        assert search.get_bitmap("load") == bytearray([1, 0])
+        assert compiled == ["load|train$", "load"]
+
+    def test_new_texts(self):
+        """Test texts added after a query was used are evaluated on the next lookup."""
+        search = matcher.Matcher(matcher.compile_substring)
+        search.add(1, "fetch")
+        assert search.matches("tch", 0)
+        index = search.add(2, "match")
+        assert search.matches("tch", index)
+        assert not search.matches("fet", index)
+        assert search.matches("", index)
+
+    def test_invalid_regex(self):
+        """Test a query that is not a valid regular expression is matched as plain text."""
+        search = matcher.Matcher(matcher.compile_regex)
+        search.add("a", "list[int]")
+        search.add("b", "list")
+        assert search.get_bitmap("list[") == bytearray([1, 0])
+
+    def test_max_queries(self):
+        """Test only the most recent queries are remembered."""
+        search = matcher.Matcher(matcher.compile_substring, max_queries=2)
+        search.add("a", "a")
+        for query in ["a", "b", "a", "c"]:
+            search.get_bitmap(query)
+        assert list(search.bitmaps) == ["a", "c"]
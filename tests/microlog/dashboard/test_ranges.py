@@ -0,0 +1,113 @@
+"""Tests for the statistics of time ranges selected with the timeline brush"""
+
+# pylint: disable=missing-class-docstring
+# pylint: disable=missing-function-docstring
+
+import pytest
+
+from microlog.dashboard import ranges
+from microlog.dashboard import samples
+
+
+class Sample:
+    def __init__(self, cpu, memory):
+        self.cpu = cpu
+        self.memory = memory
+
+
+def create_index():
+    index = ranges.RangeIndex()
+    for when, duration, thread, depth, name, parent in [
+        (0.0, 10.0, 1, 0, "app..main", None),
+        (1.0, 4.0, 1, 1, "app..load", "app..main"),
+        (2.0, 2.0, 1, 2, "app..parse", "app..load"),
+        (6.0, 2.0, 1, 1, "app..load", "app..main"),
+        (8.5, 1.0, 1, 1, "app..save", "app..main"),
+        (0.0, 4.0, 2, 0, "app..worker", None),
+    ]:
+        index.add_call(when, duration, thread, depth, name, parent)
+    for when, kind in [(2.0, 3), (6.5, 6), (3.5, 3)]:
+        index.add_log(when, kind)
+    return index
+
+
+def create_samples():
+    index = samples.SampleIndex(("cpu", "memory"))
+    for when, cpu, memory in [(0.0, 10, 100), (4.0, 50, 300), (8.0, 30, 200)]:
+        index.add(when, Sample(cpu, memory))
+    return index
+
+
+class TestRangeIndex:
+    def test_total_and_self_time(self):
+        """Test calls running at the start or end of the range only count their part inside it."""
+        statistics = create_index().get_statistics(3.0, 7.0)
+        assert dict(statistics.total) == {
+            "app..main": 4.0, "app..load": 3.0, "app..parse": 1.0, "app..worker": 1.0,
+        }
+        assert statistics.total[0] == ("app..main", 4.0)
+        assert dict(statistics.self_time) == {
+            "app..main": 1.0, "app..load": 2.0, "app..parse": 1.0, "app..worker": 1.0,
+        }
+
+    def test_top(self):
+        """Test only the functions with the most time are returned."""
+        statistics = create_index().get_statistics(0.0, 10.0, top=2)
+        assert statistics.total == [("app..main", 10.0), ("app..load", 6.0)]
+
+    def test_threads(self):
+        """Test thread utilization."""
+        statistics = create_index().get_statistics(3.0, 7.0)
+        assert statistics.threads == {1: 1.0, 2: 0.25}
+
+    def test_samples_and_logs(self):
+        """Test the CPU average, memory delta, and log counts of a range."""
+        statistics = create_index().get_statistics(3.0, 7.0, create_samples())
+        assert statistics.cpu == 50
+        assert statistics.memory_delta == 200
+        assert statistics.logs == {3: 1, 6: 1}
+
+    def test_samples_in_short_range(self):
+        """Test a range between two samples shows the CPU of the sample before it."""
+        statistics = create_index().get_statistics(4.5, 4.6, create_samples())
+        assert statistics.cpu == 50
+        assert statistics.memory_delta == 0
+
+    def test_add_after_query(self):
+        """Test calls added out of order after a query are included in the next one."""
+        index = create_index()
+        index.get_statistics(0.0, 10.0)
+        index.add_call(0.5, 0.25, 1, 1, "app..init", "app..main")
+        statistics = index.get_statistics(0.0, 1.0)
+        assert dict(statistics.total)["app..init"] == pytest.approx(0.25)
+        assert dict(statistics.self_time)["app..main"] == pytest.approx(0.75)
+
+    @pytest.mark.parametrize("order", [1, -1])
+    def test_recursion(self, order):
+        """Test recursive calls count once in the total time, whichever call is added first."""
+        index = ranges.RangeIndex()
+        calls = [
+            (0.0, 10.0, 1, 0, "app..walk", None),
+            (2.0, 6.0, 1, 1, "app..visit", "app..walk"),
+            (3.0, 4.0, 1, 2, "app..walk", "app..visit"),
+            (4.0, 1.0, 1, 3, "app..walk", "app..walk"),
+        ]
+        for call in calls[::order][:2]:
+            index.add_call(*call)
+        index.get_statistics(0.0, 10.0)
+        for call in calls[::order][2:]:
+            index.add_call(*call)
+
+        statistics = index.get_statistics(0.0, 10.0)
+        assert dict(statistics.total) == {"app..walk": 10.0, "app..visit": 6.0}
+        assert dict(statistics.self_time) == {"app..walk": 8.0, "app..visit": 2.0}
+        statistics = index.get_statistics(4.5, 6.0)
+        assert dict(statistics.total) == {"app..walk": 1.5, "app..visit": 1.5}
+
+    def test_clear(self):
+        """Test clearing removes all calls and log entries."""
+        index = create_index()
+        index.clear()
+        statistics = index.get_statistics(0.0, 10.0)
+        assert len(index) == 0
+        assert (statistics.total, statistics.threads, statistics.logs) == ([], {}, {})
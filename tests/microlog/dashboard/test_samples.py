@@ -0,0 +1,42 @@
+"""Tests for the time-range statistics over status samples"""
+
+# pylint: disable=missing-class-docstring
+# pylint: disable=missing-function-docstring
+
+from microlog.dashboard import samples
+
+
+class Sample:
+    def __init__(self, when, cpu, memory):
+        self.when = when
+        self.cpu = cpu
+        self.memory = memory
+
+
+def create_index():
+    index = samples.SampleIndex(("cpu", "memory"))
+    for when, cpu, memory in [(0.0, 10, 100), (1.0, 50, 200), (3.0, 30, 300), (2.0, 90, 400)]:
+        index.add(when, Sample(when, cpu, memory))
+    return index
+
+
+class TestSampleIndex:
+    def test_get_at(self):
+        """Test the sample at a point in time is the last one taken before it."""
+        index = create_index()
+        assert index.get_at(-1.0).when == 0.0
+        assert index.get_at(1.5).when == 1.0
+        assert index.get_at(2.0).when == 2.0
+        assert index.get_at(3.0) is None
+
+    def test_statistics(self):
+        """Test sums and means over time ranges, including samples added out of order."""
+        index = create_index()
+        assert index.count(1.0, 2.0) == 2
+        assert index.sum("cpu", 1.0, 2.0) == 140
+        assert index.mean("memory", 0.5, 3.0) == 300
+        assert index.mean("cpu", 5.0, 6.0) == 0.0
+        assert index.get_statistics(0.0, 3.0) == {"count": 4.0, "cpu": 45.0, "memory": 250.0}
+        index.clear()
+        assert len(index) == 0
+        assert index.count(0.0, 3.0) == 0
@@ -0,0 +1,50 @@
+"""Tests for the spatial index of the flamegraph"""
+
+# pylint: disable=missing-class-docstring
+# pylint: disable=missing-function-docstring
+
+from microlog.dashboard import spatial
+
+
+def create_index():
+    index = spatial.SpatialIndex()
+    index.add_all([
+        ("main", 0, 0.0, 10.0, "main"),
+        ("main", 1, 0.0, 2.0, "load"),
+        ("main", 1, 3.0, 4.0, "parse"),
+        ("main", 1, 6.0, 9.0, "train"),
+        ("worker", 1, 1.0, 5.0, "fetch"),
+    ])
+    return index
+
+
+class TestSpatialIndex:
+    def test_query(self):
+        """Test only the intervals that intersect the range are returned."""
+        index = create_index()
+
+        assert sorted(index.query(3.5, 6.5)) == ["fetch", "main", "parse", "train"]
+        assert sorted(index.query(3.5, 6.5, {"main"})) == ["main", "parse", "train"]
+        assert index.query(4.0, 6.0, {"main"}) == ["main"]
+        assert len(index) == 5
+
+    def test_find(self):
+        """Test the interval containing a point is found in each selected thread."""
+        index = create_index()
+
+        assert index.find(1, 3.5, {"main"}) == ["parse"]
+        assert index.find(1, 1.5) == ["load", "fetch"]
+        assert index.find(1, 5.0, {"main"}) == []
+        assert index.find(2, 1.0) == []
+
+    def test_out_of_order_and_nested(self):
+        """Test intervals added out of order, or covered by a long interval, are found."""
+        row = spatial.Row()
+        row.add(5.0, 6.0, "late")
+        row.add(0.0, 10.0, "long")
+        row.add(2.0, 3.0, "short")
+
+        assert row.reach == [10.0, 10.0, 10.0]
+        assert list(row.query(7.0, 8.0)) == ["long"]
+        assert row.find(5.5) == "late"
+        assert row.find(8.0) == "long"
@@ -1,6 +1,7 @@
 """Unit tests for microlog.models.Recording class."""
 import pickle
 import sys
+import urllib.error
 from unittest.mock import MagicMock
 from unittest.mock import call
 from unittest.mock import patch
@@ -374,6 +375,67 @@ class TestRecording:
                         "test_app/2023_12_25_10_30_45"
                     )
 
+    @patch("microlog.config.SERVER", "http://localhost:8564/", create=True)
+    @patch("microlog.config.UPLOAD_CHUNK_SIZE", 4)
+    @patch("urllib.request.urlopen")
+    def test_upload_streams_chunks(self, mock_urlopen):
+        """Test upload posts the recording to the server in chunks."""
+        recording = Recording()
+        mock_urlopen.return_value.__enter__.return_value.read.return_value = b"url"
+
+        assert recording.upload("test app/2023_12_25", b"0123456789")
+
+        request = mock_urlopen.call_args[0][0]
+        assert request.full_url == "http://localhost:8564/upload/test_app/2023_12_25"
+        assert request.get_method() == "POST"
+        assert list(request.data) == [b"0123", b"4567", b"89"]
+        assert mock_urlopen.call_args.kwargs["timeout"] == config.UPLOAD_TIMEOUT
+
+    @patch("urllib.request.urlopen", side_effect=TimeoutError("timed out"))
+    def test_upload_timeout(self, _mock_urlopen):
+        """Test upload reports failure when the server does not answer in time."""
+        assert not Recording().upload("app/run", b"0123456789")
+
+    @patch("zstd.compress")
+    @patch("pickle.dumps")
+    def test_save_upload_falls_back_to_write(self, _mock_pickle_dumps, mock_zstd_compress):
+        """Test save writes to config.fs when the upload fails."""
+        recording = Recording()
+        mock_zstd_compress.return_value = b"compressed_data"
+
+        with (
+            patch("urllib.request.urlopen", side_effect=urllib.error.URLError("down")),
+            patch.object(recording, "get_identifier", return_value="app/run"),
+            patch.object(recording, "write") as mock_write,
+            patch.object(recording, "notify_server") as mock_notify_server,
+            patch.object(recording, "show_details"),
+        ):
+            recording.save(upload=True)
+
+        mock_write.assert_called_once_with("app/run", b"compressed_data")
+        mock_notify_server.assert_called_once_with("app/run")
+
+    @patch("zstd.compress")
+    @patch("pickle.dumps")
+    def test_save_upload(self, _mock_pickle_dumps, mock_zstd_compress):
+        """Test save does not touch config.fs when the upload succeeds."""
+        recording = Recording()
+        mock_zstd_compress.return_value = b"compressed_data"
+
+        with (
+            patch.object(recording, "get_identifier", return_value="app/run"),
+            patch.object(recording, "upload", return_value=True) as mock_upload,
+            patch.object(recording, "write") as mock_write,
+            patch.object(recording, "notify_server") as mock_notify_server,
+            patch.object(recording, "show_details") as mock_show_details,
+        ):
+            recording.save(upload=True)
+
+        mock_upload.assert_called_once_with("app/run", b"compressed_data")
+        mock_write.assert_not_called()
+        mock_notify_server.assert_not_called()
+        mock_show_details.assert_called_once_with("app/run")
+
     def test_load_empty_recording(self):
         """Test loading an empty recording."""
         empty_recording = Recording()
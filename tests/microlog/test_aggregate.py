@@ -0,0 +1,168 @@
+"""Tests for microlog.aggregate."""
+
+import logging
+from unittest.mock import patch
+
+import pytest
+
+from microlog import aggregate
+from microlog import config
+from microlog.models import Call
+from microlog.models import CallSite
+from microlog.models import Marker
+from microlog.models import Recording
+from microlog.models import Stack
+from microlog.models import Status
+
+
+MAIN = CallSite("main.py", 1, "app..main")
+LOAD = CallSite("load.py", 2, "app..load")
+PARSE = CallSite("parse.py", 3, "app..parse")
+IMPORT = CallSite("pandas.py", 1, "pandas..<module>")
+
+
+def create_recording():
+    """Create a recording with nesting, recursion, two threads, and markers."""
+    recording = Recording()
+    recording.calls = [
+        Call(0.0, 1, MAIN, MAIN, 0, 10.0),
+        Call(1.0, 1, LOAD, MAIN, 1, 4.0),
+        Call(1.5, 1, LOAD, LOAD, 2, 2.0),
+        Call(2.0, 1, PARSE, LOAD, 3, 1.0),
+        Call(6.0, 1, IMPORT, MAIN, 1, 0.5),
+        Call(0.0, 2, PARSE, MAIN, 0, 3.0),
+    ]
+    recording.markers = [
+        Marker(config.EVENT_KIND_INFO, 1.0, "hello", Stack()),
+        Marker(logging.ERROR, 2.0, "oops", Stack()),
+        Marker(logging.INFO, 3.0, "hi", Stack()),
+    ]
+    recording.statuses = [Status(12.0, 0, 0, 0, 0, 0, 0, 0)]
+    return recording
+
+
+class TestWalk:
+    """Tests for walking calls with their parent stacks."""
+
+    def test_walk_parents(self):
+        """Test each call is visited with its ancestors."""
+        recording = create_recording()
+        parents = {
+            (call.thread_id, call.when): [parent.call_site.name for parent in stack]
+            for call, stack in aggregate.walk(recording.calls)
+        }
+        assert parents[(1, 0.0)] == []
+        assert parents[(1, 2.0)] == ["app..main", "app..load", "app..load"]
+        assert parents[(1, 6.0)] == ["app..main"]
+        assert parents[(2, 0.0)] == []
+
+    def test_walk_unordered_input(self):
+        """Test calls are sorted by time before walking."""
+        recording = create_recording()
+        calls = list(reversed(recording.calls))
+        visited = [call.when for call, _ in aggregate.walk(calls) if call.thread_id == 1]
+        assert visited == [0.0, 1.0, 1.5, 2.0, 6.0]
+
+
+class TestSummarize:
+    """Tests for summarizing a recording."""
+
+    def setup_method(self):
+        """Summarize the test recording."""
+        self.summary = aggregate.summarize(create_recording(), "app/run")
+
+    def test_counts(self):
+        """Test call counts per function."""
+        assert self.summary.functions["app..load"].count == 2
+        assert self.summary.functions["app..parse"].count == 2
+        assert self.summary.call_count == 6
+
+    def test_total_time_ignores_recursion(self):
+        """Test recursive calls are not counted twice in total time."""
+        assert self.summary.functions["app..load"].total == 4.0
+        assert self.summary.functions["app..parse"].total == 4.0
+
+    def test_self_time(self):
+        """Test self time excludes time spent in children."""
+        functions = self.summary.functions
+        assert functions["app..main"].self_time == pytest.approx(5.5)
+        assert functions["app..load"].self_time == pytest.approx(3.0)
+        assert functions["app..parse"].self_time == pytest.approx(4.0)
+
+    def test_top(self):
+        """Test top-N by total and by self time."""
+        assert [stats.name for stats in self.summary.top_total(1)] == ["app..main"]
+        assert [stats.name for stats in self.summary.top_self(1)] == ["app..main"]
+
+    def test_threads(self):
+        """Test per-thread busy time and utilization."""
+        assert self.summary.duration == 12.0
+        assert self.summary.threads_to_list() == [
+            {"thread": 1, "busy": 10.0, "utilization": 0.833},
+            {"thread": 2, "busy": 3.0, "utilization": 0.25},
+        ]
+
+    def test_slow_imports(self):
+        """Test slow nested imports are reported."""
+        assert self.summary.slow_imports == [
+            {"name": "pandas", "when": 6.0, "duration": 0.5}
+        ]
+
+    def test_markers(self):
+        """Test marker counts per kind."""
+        assert self.summary.markers == {"info": 2, "error": 1}
+
+    def test_report(self):
+        """Test the JSON report is limited to the top-N functions."""
+        report = self.summary.report(2)
+        assert len(report["top_total"]) == 2
+        assert report["top_self"][0] == {
+            "name": "app..main", "count": 1, "total": 10.0, "self": 5.5,
+        }
+
+    def test_round_trip(self):
+        """Test a summary survives conversion to and from a dict."""
+        summary = aggregate.Summary.from_dict(self.summary.to_dict())
+        assert summary.report() == self.summary.report()
+
+
+class TestGetSummary:
+    """Tests for caching summaries in memory and in sidecars."""
+
+    def setup_method(self):
+        """Start every test with an empty cache."""
+        aggregate._cache.clear()  # pylint: disable=protected-access
+
+    def test_get_summary_writes_sidecar(self, tmp_path):
+        """Test the summary is computed once, then served from the sidecar."""
+        with (
+            patch("microlog.config.S3_ROOT", str(tmp_path)),
+            patch("microlog.config.fs", config.LocalFileSystem()),
+            patch.object(aggregate, "read_recording", return_value=create_recording()) as mock_read,
+        ):
+            (tmp_path / "app").mkdir()
+            summary = aggregate.get_summary("app/run")
+            assert (tmp_path / "app" / "run.summary.json").exists()
+            assert aggregate.get_summary("app/run") is summary
+            aggregate._cache.clear()  # pylint: disable=protected-access
+            assert aggregate.get_summary("app/run").report() == summary.report()
+            mock_read.assert_called_once_with("app/run")
+
+            aggregate.forget("app/run")
+            assert not (tmp_path / "app" / "run.summary.json").exists()
+
+
+class TestGetEtag:
+    def test_get_etag_changes_when_rewritten(self, tmp_path):
+        """Test the entity tag of a recording changes when the recording is rewritten."""
+        with (
+            patch("microlog.config.S3_ROOT", str(tmp_path)),
+            patch("microlog.config.fs", config.LocalFileSystem()),
+        ):
+            (tmp_path / "app").mkdir()
+            (tmp_path / "app" / "run.zip").write_bytes(b"recording")
+            etag = aggregate.get_etag("app/run")
+            assert etag.startswith('"') and etag.endswith('"')
+            assert aggregate.get_etag("app/run") == etag
+            (tmp_path / "app" / "run.zip").write_bytes(b"downsampled")
+            assert aggregate.get_etag("app/run") != etag
@@ -1,9 +1,15 @@
 """Tests for microlog.analyse."""
 
+import http.server
+import json
+import threading
+from unittest.mock import patch
+
 import openai
 import pytest
 
 import microlog.analyse as analyse
+from microlog import config
 
 
 class DummyCallSite:
@@ -21,3 +27,69 @@ class DummyRecording:
     """A dummy Recording for testing purposes."""
     def __init__(self, calls):
         self.calls = calls
+
+
+class StubOpenAIHandler(http.server.BaseHTTPRequestHandler):
+    """A local OpenAI-compatible chat completions endpoint."""
+    requests: list = []
+
+    def do_POST(self):  # pylint: disable=invalid-name
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        StubOpenAIHandler.requests.append((self.path, body))
+        response = json.dumps({
+            "id": "chatcmpl-1",
+            "object": "chat.completion",
+            "created": 0,
+            "model": body["model"],
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": "Use a cache."},
+                "finish_reason": "stop",
+            }],
+            "usage": {"prompt_tokens": 1, "completion_tokens": 1, "total_tokens": 2},
+        }).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(response)))
+        self.end_headers()
+        self.wfile.write(response)
+
+    def log_message(self, *args):  # pylint: disable=arguments-differ
+        pass
+
+
+@pytest.fixture(name="stub_client")
+def fixture_stub_client():
+    """Run a stub OpenAI server and return a client that talks to it."""
+    StubOpenAIHandler.requests = []
+    stub = http.server.HTTPServer(("127.0.0.1", 0), StubOpenAIHandler)
+    thread = threading.Thread(target=stub.serve_forever, daemon=True)
+    thread.start()
+    yield analyse.create_client(f"http://127.0.0.1:{stub.server_port}/v1", "test-key", "stub")
+    stub.shutdown()
+
+
+def test_request_analysis_uses_client(stub_client):
+    """Test an analysis is requested from an OpenAI-compatible endpoint."""
+    analysis = analyse.request_analysis("app/run\nmy trace", stub_client)
+
+    assert analysis == "app/run\nUse a cache."
+    path, body = StubOpenAIHandler.requests[0]
+    assert path == "/v1/chat/completions"
+    assert body["messages"][1]["content"] == "app/run\nmy trace"
+
+
+def test_analyse_and_store_reuses_sidecar(stub_client, tmp_path):
+    """Test an analysis is stored and reused for an identical prompt only."""
+    (tmp_path / "app").mkdir()
+    with (
+        patch("microlog.config.S3_ROOT", str(tmp_path)),
+        patch("microlog.config.fs", config.LocalFileSystem()),
+        patch("microlog.analyse.client", stub_client),
+    ):
+        assert analyse.analyse_and_store("app/run\nmy trace") == "app/run\nUse a cache."
+        assert analyse.analyse_and_store("app/run\nmy trace") == "app/run\nUse a cache."
+        assert len(StubOpenAIHandler.requests) == 1
+        assert analyse.read_analysis("app/run")["analysis"] == "app/run\nUse a cache."
+        analyse.analyse_and_store("app/run\nanother trace")
+        assert len(StubOpenAIHandler.requests) == 2
@@ -0,0 +1,58 @@
+"""Tests for the storage and server configuration"""
+
+# pylint: disable=missing-class-docstring
+# pylint: disable=missing-function-docstring
+
+import importlib
+import os
+import sys
+from unittest.mock import MagicMock
+from unittest.mock import patch
+
+import pytest
+
+from microlog import config
+
+S3_ENVIRONMENT = {
+    "MICROLOG_S3_ROOT": "bucket/microlog",
+    "MICROLOG_S3_ROOT_BACKUP": "backup/microlog",
+    "MICROLOG_S3_REGION": "us-east-1",
+}
+
+
+@pytest.fixture
+def reload_config():
+    """Reload the configuration with a given environment, restoring it afterwards."""
+    def reload(environment, s3fs=None):
+        with (
+            patch.dict(os.environ, environment, clear=True),
+            patch.dict(sys.modules, {"s3fs": s3fs or MagicMock()}),
+        ):
+            return importlib.reload(config)
+
+    yield reload
+    importlib.reload(config)
+
+
+class TestServer:
+    def test_local_server(self, reload_config):
+        """Test the server defaults to localhost without S3."""
+        assert reload_config({}).SERVER == f"http://localhost:{config.PORT}/"
+
+    def test_server_without_s3(self, reload_config):
+        """Test MICROLOG_SERVER is used when S3 is not configured."""
+        reload_config({"MICROLOG_SERVER": "http://microlog:8564/"})
+        assert config.SERVER == "http://microlog:8564/"
+        assert config.fs is config.local_fs
+
+    def test_server_with_s3(self, reload_config):
+        """Test S3 storage is used with its MICROLOG_SERVER."""
+        reload_config({**S3_ENVIRONMENT, "MICROLOG_SERVER": "http://microlog:8564/"})
+        assert config.SERVER == "http://microlog:8564/"
+        assert config.S3_ROOT == "bucket/microlog"
+
+    def test_s3_requires_server(self, reload_config):
+        """Test S3 without MICROLOG_SERVER falls back to local storage and a local server."""
+        reload_config(S3_ENVIRONMENT)
+        assert config.SERVER == f"http://localhost:{config.PORT}/"
+        assert config.fs is config.local_fs
@@ -0,0 +1,121 @@
+"""Tests for microlog.stacks and microlog.diff."""
+
+from unittest.mock import patch
+
+import pytest
+
+from microlog import diff
+from microlog import stacks
+from microlog.models import Call
+from microlog.models import CallSite
+
+
+MAIN = CallSite("main.py", 1, "app..main")
+LOAD = CallSite("load.py", 2, "app..load")
+PARSE = CallSite("parse.py", 3, "app..parse")
+
+
+def create_calls(load_duration, parse_duration):
+    """Create calls where main calls load twice, and load calls parse once."""
+    return [
+        Call(0.0, 1, MAIN, MAIN, 0, 10.0),
+        Call(1.0, 1, LOAD, MAIN, 1, load_duration),
+        Call(1.5, 1, PARSE, LOAD, 2, parse_duration),
+        Call(6.0, 1, LOAD, MAIN, 1, load_duration),
+        Call(0.0, 2, PARSE, MAIN, 0, 3.0),
+    ]
+
+
+def test_trie_aggregates_by_stack_path():
+    """Test calls with the same stack path are merged, across threads."""
+    trie = stacks.StackTrie(create_calls(2.0, 1.0))
+
+    assert trie.root.total == 13.0
+    main = trie.root.children["app..main"]
+    load = main.children["app..load"]
+    assert (load.count, load.total, load.self_time) == (2, 4.0, 3.0)
+    assert main.self_time == 6.0
+    assert trie.root.children["app..parse"].total == 3.0
+    assert sorted(";".join(path) for path, _ in trie.paths()) == [
+        "app..main", "app..main;app..load", "app..main;app..load;app..parse", "app..parse"
+    ]
+    restored = stacks.StackNode.from_dict(trie.root.to_dict())
+    assert restored.children["app..main"].children["app..load"].total == 4.0
+
+
+def test_compare():
+    """Test the diff holds the base and target time of every stack path."""
+    result = diff.compare(
+        stacks.StackTrie(create_calls(2.0, 1.0)), stacks.StackTrie(create_calls(3.0, 0.5))
+    )
+
+    main = result.children[0]
+    load = main.children[0]
+    parse = load.children[0]
+    assert (load.base, load.target) == (4.0, 6.0)
+    assert (parse.base, parse.target) == (1.0, 0.5)
+    assert load.self_delta == 2.5
+    changes = diff.top_changes(result, 2)
+    assert [path for path, _ in changes] == ["app..main;app..load", "app..main"]
+    assert result.to_dict()["children"][0]["children"][0]["target"] == 6.0
+
+
+def test_compare_leaves_out_short_paths():
+    """Test stack paths below the minimum duration in both recordings are left out."""
+    result = diff.compare(
+        stacks.StackTrie(create_calls(2.0, 0.0001)),
+        stacks.StackTrie(create_calls(2.0, 0.0002)),
+    )
+
+    assert not result.children[0].children[0].children
+
+
+def test_main(capsys):
+    """Test the command line prints the total change and fails above the threshold."""
+    tries = {
+        "app/base": stacks.StackTrie(create_calls(2.0, 1.0)),
+        "app/target": stacks.StackTrie(
+            create_calls(3.0, 1.0) + [Call(20.0, 1, MAIN, MAIN, 0, 2.0)]
+        ),
+    }
+    with (
+        patch("microlog.stacks.get_trie", side_effect=tries.get),
+        patch("sys.argv", ["diff", "app/base", "app/target", "--fail-above", "10"]),
+        pytest.raises(SystemExit) as exit_info,
+    ):
+        diff.main()
+
+    assert exit_info.value.code == 1
+    output = capsys.readouterr().out
+    assert output.startswith("Total: 13.000s => 15.000s (+15.4%)")
+    assert "app..main;app..load" in output
+
+
+def test_sandwich():
+    """Test the callers and callees of a function are merged over all its stack paths."""
+    trie = stacks.StackTrie(create_calls(2.0, 1.0))
+
+    callers, callees = trie.sandwich("app..parse")
+
+    assert (callers.total, callers.count) == (4.0, 2)
+    assert sorted(callers.children) == ["app..load"]
+    assert callers.children["app..load"].children["app..main"].total == 1.0
+    assert (callees.total, callees.count, callees.children) == (4.0, 2, {})
+
+    callers, callees = trie.sandwich("app..load")
+    assert callers.children["app..main"].count == 2
+    assert callees.children["app..parse"].total == 1.0
+
+
+def test_sandwich_counts_recursion_once():
+    """Test recursive calls are only counted at their outermost call."""
+    trie = stacks.StackTrie([
+        Call(0.0, 1, MAIN, MAIN, 0, 10.0),
+        Call(1.0, 1, LOAD, MAIN, 1, 4.0),
+        Call(2.0, 1, LOAD, LOAD, 2, 2.0),
+    ])
+
+    callers, callees = trie.sandwich("app..load")
+
+    assert (callers.total, callers.count) == (4.0, 1)
+    assert callees.children["app..load"].total == 2.0
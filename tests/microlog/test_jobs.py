@@ -0,0 +1,72 @@
+"""Tests for microlog.jobs."""
+
+import threading
+from unittest.mock import patch
+
+from microlog import jobs
+
+
+def wait(job, timeout=5.0):
+    """Wait until a job is no longer pending."""
+    event = threading.Event()
+    for _ in range(int(timeout * 100)):
+        if not job.is_pending():
+            return job
+        event.wait(0.01)
+    raise TimeoutError(job)
+
+
+def test_job_runs_in_background():
+    """Test a submitted job runs the handler and records the result."""
+    queue = jobs.JobQueue(lambda argument: argument.upper())
+    job = queue.submit("key", "hello")
+
+    assert queue.get(job.id) is job
+    assert wait(job).status == jobs.DONE
+    assert job.to_dict()["result"] == "HELLO"
+    assert job.finished >= job.created
+
+
+def test_identical_jobs_are_deduplicated():
+    """Test submitting a pending or completed key returns the same job."""
+    started = threading.Event()
+    release = threading.Event()
+    calls = []
+
+    def handler(argument):
+        calls.append(argument)
+        started.set()
+        release.wait(5)
+        return argument
+
+    queue = jobs.JobQueue(handler)
+    job = queue.submit("key", "prompt")
+    started.wait(5)
+    assert queue.submit("key", "prompt") is job
+    release.set()
+    wait(job)
+    assert queue.submit("key", "prompt") is job
+    assert calls == ["prompt"]
+
+
+def test_failed_jobs_are_retried():
+    """Test a failed job reports its error and a new submit runs it again."""
+    queue = jobs.JobQueue(
+        lambda argument: 1 / 0, lambda argument, error: f"{argument}: {error}"
+    )
+    job = wait(queue.submit("key", "prompt"))
+
+    assert job.status == jobs.FAILED
+    assert job.result == "prompt: division by zero"
+    assert queue.submit("key", "prompt") is not job
+
+
+@patch("microlog.jobs.MAX_JOBS", 2)
+def test_old_jobs_expire():
+    """Test only the most recent jobs are kept."""
+    queue = jobs.JobQueue(lambda argument: argument)
+    first = queue.submit("a", "a")
+    queue.submit("b", "b")
+    queue.submit("c", "c")
+
+    assert queue.get(first.id) is None
@@ -0,0 +1,59 @@
+"""Tests for the self-instrumentation of the server"""
+
+# pylint: disable=missing-class-docstring
+# pylint: disable=missing-function-docstring
+
+from microlog import metrics
+
+
+class TestMetrics:
+    def test_counter(self):
+        """Test counters are rendered per set of labels."""
+        counter = metrics.Counter("test_total", "A test counter.", ("cache", "result"))
+        counter.inc("summary", "hit")
+        counter.inc("summary", "hit", amount=2)
+
+        assert counter.get("summary", "hit") == 3
+        assert counter.render() == ['test_total{cache="summary",result="hit"} 3']
+
+    def test_histogram(self):
+        """Test histogram buckets are cumulative, with a sum and a count."""
+        histogram = metrics.Histogram("test_seconds", "A test histogram.", ("route",), (0.1, 1.0))
+        histogram.observe(0.05, "/zip/")
+        histogram.observe(0.5, "/zip/")
+        histogram.observe(5.0, "/zip/")
+
+        assert histogram.render() == [
+            'test_seconds_bucket{route="/zip/",le="0.1"} 1',
+            'test_seconds_bucket{route="/zip/",le="1"} 2',
+            'test_seconds_bucket{route="/zip/",le="+Inf"} 3',
+            'test_seconds_sum{route="/zip/"} 5.55',
+            'test_seconds_count{route="/zip/"} 3',
+        ]
+
+    def test_registry(self):
+        """Test the registry renders help and type lines for each metric."""
+        registry = metrics.Registry()
+        registry.gauge("test_recordings", "Number of recordings.").set(42)
+
+        assert registry.render() == (
+            "# HELP test_recordings Number of recordings.\n"
+            "# TYPE test_recordings gauge\n"
+            "test_recordings 42\n"
+        )
+
+    def test_get_route(self):
+        """Test request paths are reduced to a small set of routes."""
+        assert metrics.get_route("/zip/app/run") == "/zip/"
+        assert metrics.get_route("/logs?filter=") == "/logs"
+        assert metrics.get_route("/") == "/"
+        assert metrics.get_route("/favicon.ico") == "other"
+
+    def test_storage_read(self):
+        """Test storage reads are timed and their bytes counted."""
+        count = metrics.storage_read_seconds.get_count("test")
+        with metrics.storage_read("test") as read:
+            read(100)
+
+        assert metrics.storage_read_seconds.get_count("test") == count + 1
+        assert metrics.storage_read_bytes.get("test") >= 100
@@ -0,0 +1,138 @@
+"""Tests for performance regression detection"""
+
+# pylint: disable=missing-class-docstring
+# pylint: disable=missing-function-docstring
+
+from unittest.mock import patch
+
+import pytest
+
+from microlog import aggregate
+from microlog import config
+from microlog import regression
+
+
+def create_summary(name, functions):
+    summary = aggregate.Summary(name)
+    for function, (count, total, self_time) in functions.items():
+        summary.functions[function] = aggregate.FunctionStats(function, count, total, self_time)
+    return summary
+
+
+def create_baseline(runs=5):
+    return [
+        create_summary(
+            f"app/2024_01_0{n}",
+            {"load_features": (10, 1.0 + n * 0.01, 0.5), "main": (1, 3.0, 0.1)},
+        )
+        for n in range(runs)
+    ]
+
+
+class TestCompare:
+    def test_slowdown_is_flagged(self):
+        """Test a function that is 30% slower than its baseline is reported."""
+        summary = create_summary(
+            "app/2024_01_09", {"load_features": (10, 1.3, 0.5), "main": (1, 3.0, 0.1)}
+        )
+
+        regressions = regression.compare(summary, create_baseline())
+
+        assert [(found.function, found.metric) for found in regressions] == [
+            ("load_features", "total")
+        ]
+        assert regressions[0].describe().startswith("27% slower in load_features (total 1.300s")
+
+    def test_noise_is_not_flagged(self):
+        """Test changes within the thresholds are not reported."""
+        summary = create_summary(
+            "app/2024_01_09", {"load_features": (12, 1.05, 0.52), "main": (1, 3.1, 0.1)}
+        )
+
+        assert not regression.compare(summary, create_baseline())
+
+    def test_small_absolute_changes_are_not_flagged(self):
+        """Test tiny functions that get relatively much slower are not reported."""
+        baseline = [create_summary(f"app/{n}", {"tiny": (1, 0.001, 0.001)}) for n in range(5)]
+        summary = create_summary("app/9", {"tiny": (1, 0.01, 0.01)})
+
+        assert not regression.compare(summary, baseline)
+
+    def test_more_calls_and_new_functions_are_flagged(self):
+        """Test call count increases and new slow functions are reported."""
+        summary = create_summary(
+            "app/2024_01_09",
+            {"load_features": (100, 1.0, 0.5), "main": (1, 3.0, 0.1), "new": (1, 0.5, 0.5)},
+        )
+
+        regressions = regression.compare(summary, create_baseline())
+
+        assert [(found.function, found.metric) for found in regressions] == [
+            ("new", "total"), ("new", "self"), ("load_features", "count")
+        ]
+        assert regressions[0].describe().startswith("newly slower in new")
+
+    def test_short_history_is_not_compared(self):
+        """Test nothing is reported without enough earlier runs."""
+        summary = create_summary("app/2024_01_09", {"load_features": (10, 9.0, 9.0)})
+
+        assert not regression.compare(summary, create_baseline(2))
+
+
+class TestCheck:
+    @pytest.fixture(autouse=True)
+    def storage(self, tmp_path):
+        with (
+            patch("microlog.config.S3_ROOT", str(tmp_path)),
+            patch("microlog.config.fs", config.LocalFileSystem()),
+        ):
+            (tmp_path / "app").mkdir()
+            for name in ["2024_01_01", "2024_01_02", "2024_01_03", "2024_01_04", "2024_01_05"]:
+                (tmp_path / "app" / f"{name}.zip").write_bytes(b"")
+            regression._cache.clear()  # pylint: disable=protected-access
+            yield tmp_path
+
+    def test_baseline_is_previous_runs(self):
+        """Test the baseline consists of the earlier runs of the same application."""
+        runs = regression.get_application_runs("app")
+        assert runs[-1] == "app/2024_01_05"
+        assert regression.get_baseline("app/2024_01_04", runs + ["other/2024_01_01"], 2) == [
+            "app/2024_01_02", "app/2024_01_03"
+        ]
+
+    def test_report_is_stored(self, storage):
+        """Test the report is stored as a sidecar and read back from it, with downsampled runs in the baseline."""
+        (storage / "app" / "2024_01_01.zip").rename(storage / "app" / "2024_01_01.summary.json")
+        summaries = {
+            summary.name: summary for summary in create_baseline(5)
+        }
+        summaries["app/2024_01_05"] = create_summary(
+            "app/2024_01_05", {"load_features": (10, 2.0, 0.5), "main": (1, 3.0, 0.1)}
+        )
+        with patch("microlog.aggregate.get_summary", side_effect=summaries.get):
+            report = regression.get_report("app/2024_01_05")
+
+        assert report.baseline == ["app/2024_01_01", "app/2024_01_02", "app/2024_01_03", "app/2024_01_04"]
+        assert (storage / "app" / "2024_01_05.regressions.json").exists()
+        regression.forget("app/2024_01_05")
+        regression.write_report(report)
+        with patch("microlog.aggregate.get_summary") as mock_summary:
+            stored = regression.get_report("app/2024_01_05")
+        mock_summary.assert_not_called()
+        assert [found.describe() for found in stored.regressions] == [
+            found.describe() for found in report.regressions
+        ]
+
+    def test_main_reports_latest_run(self, capsys):
+        """Test the command line reports regressions of the latest run and fails."""
+        summaries = {summary.name: summary for summary in create_baseline(5)}
+        summaries["app/2024_01_05"] = create_summary("app/2024_01_05", {"main": (1, 9.0, 0.1)})
+        with (
+            patch("microlog.aggregate.get_summary", side_effect=summaries.get),
+            patch("sys.argv", ["regression", "app"]),
+            pytest.raises(SystemExit) as exit_info,
+        ):
+            regression.main()
+
+        assert exit_info.value.code == 1
+        assert "app/2024_01_05 is 200% slower in main" in capsys.readouterr().out
@@ -0,0 +1,138 @@
+"""Tests for retention of the recordings store"""
+
+# pylint: disable=missing-class-docstring
+# pylint: disable=missing-function-docstring
+
+import datetime
+import json
+import threading
+from unittest.mock import patch
+
+import pytest
+
+from microlog import aggregate
+from microlog import config
+from microlog import retention
+
+NOW = datetime.datetime(2025, 3, 1).timestamp()
+
+
+def create_runs(names):
+    runs = []
+    for name in names:
+        run = retention.Run(f"app/{name}")
+        run.files[".zip"] = f"app/{name}.zip"
+        runs.append(run)
+    return runs
+
+
+def wait(engine):
+    event = threading.Event()
+    while engine.progress.running:
+        event.wait(0.01)
+    return engine.progress
+
+
+class TestPlan:
+    def test_keep_last(self):
+        """Test only the newest runs are kept."""
+        runs = create_runs(["2025_01_01_00_00_00", "2025_01_02_00_00_00", "2025_01_03_00_00_00"])
+
+        result = retention.plan(runs, retention.Policy(keep_last=2), NOW)
+
+        assert [run.name for run in result.delete] == ["app/2025_01_01_00_00_00"]
+        assert not result.downsample
+
+    def test_age_and_downsampling(self):
+        """Test old runs are deleted, and recent ones are downsampled."""
+        runs = create_runs(["2024_01_01_00_00_00", "2025_02_01_00_00_00", "2025_02_28_00_00_00", "custom"])
+
+        result = retention.plan(
+            runs, retention.Policy(max_age_days=90, summary_after_days=7), NOW
+        )
+
+        assert [run.name for run in result.delete] == ["app/2024_01_01_00_00_00"]
+        assert [run.name for run in result.downsample] == ["app/2025_02_01_00_00_00"]
+        assert len(result) == 2
+
+    def test_downsampled_runs_are_not_downsampled_again(self):
+        """Test summary-only runs are left alone until they expire."""
+        run = retention.Run("app/2025_01_01_00_00_00")
+        run.files[".summary.json"] = "app/2025_01_01_00_00_00.summary.json"
+
+        result = retention.plan([run], retention.Policy(summary_after_days=7), NOW)
+
+        assert len(result) == 0
+
+
+class TestRetentionEngine:
+    @pytest.fixture(autouse=True)
+    def storage(self, tmp_path):
+        with (
+            patch("microlog.config.S3_ROOT", str(tmp_path / "microlog")),
+            patch("microlog.config.fs", config.LocalFileSystem()),
+        ):
+            application = tmp_path / "microlog" / "app"
+            application.mkdir(parents=True)
+            for name in ["2024_01_01_00_00_00", "2025_02_01_00_00_00", "2025_02_28_00_00_00"]:
+                (application / f"{name}.zip").write_bytes(b"")
+                (application / f"{name}.regressions.json").write_text("{}")
+            yield tmp_path / "microlog"
+
+    def test_apply_policies(self, storage):
+        """Test a pass deletes, downsamples, and reports what it removed."""
+        (storage / "retention.json").write_text(json.dumps({
+            "default": {"max_age_days": 90, "summary_after_days": 7},
+        }))
+        removed = []
+        engine = retention.RetentionEngine(lambda name, keep_summary: removed.append((name, keep_summary)))
+
+        with patch.object(
+            aggregate, "get_summary", side_effect=lambda name: aggregate.write_summary(aggregate.Summary(name))
+        ):
+            assert engine.apply_policies(NOW)
+            progress = wait(engine).to_dict()
+
+        assert sorted(path.name for path in (storage / "app").iterdir()) == [
+            "2025_02_01_00_00_00.regressions.json",
+            "2025_02_01_00_00_00.summary.json",
+            "2025_02_28_00_00_00.regressions.json",
+            "2025_02_28_00_00_00.zip",
+        ]
+        assert removed == [("app/2025_02_01_00_00_00", True), ("app/2024_01_01_00_00_00", False)]
+        assert (progress["total"], progress["done"], progress["files"]) == (2, 2, 3)
+        assert not progress["running"] and not progress["errors"]
+
+    def test_no_policies(self, storage):
+        """Test nothing is removed when no retention is configured."""
+        engine = retention.RetentionEngine()
+
+        assert engine.apply_policies(NOW)
+        assert wait(engine).total == 0
+        assert len(list((storage / "app").iterdir())) == 6
+
+    @patch("microlog.retention.BATCH_SIZE", 2)
+    def test_bulk_delete(self, storage):
+        """Test runs are deleted with their sidecars, in batches."""
+        engine = retention.RetentionEngine()
+
+        with patch.object(config.fs, "rm", wraps=config.fs.rm) as mock_rm:
+            assert engine.delete(["app/2024_01_01_00_00_00", "app/2025_02_01_00_00_00", "app/2025_02_28_00_00_00"])
+            assert wait(engine).deleted == 3
+
+        assert not list((storage / "app").iterdir())
+        assert [len(call.args[0]) for call in mock_rm.call_args_list] == [4, 2]
+
+    def test_bulk_delete_legacy_and_missing_runs(self, storage):
+        """Test legacy <name>.log.zip recordings are deleted by name, and missing runs are reported."""
+        (storage / "app" / "2023_01_01_00_00_00.log.zip").write_bytes(b"")
+        removed = []
+        engine = retention.RetentionEngine(lambda name, keep_summary: removed.append(name))
+
+        assert engine.delete(["app/2023_01_01_00_00_00", "app/missing"])
+        progress = wait(engine)
+
+        assert not (storage / "app" / "2023_01_01_00_00_00.log.zip").exists()
+        assert removed == ["app/2023_01_01_00_00_00", "app/2023_01_01_00_00_00.log"]
+        assert progress.deleted == 1
+        assert progress.errors == ["Cannot find app/missing"]
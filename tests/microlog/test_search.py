@@ -0,0 +1,102 @@
+"""Tests for cross-recording function search"""
+
+# pylint: disable=missing-class-docstring
+# pylint: disable=missing-function-docstring
+
+from unittest.mock import patch
+
+from microlog import aggregate
+from microlog import config
+from microlog import search
+
+
+def create_summary(name, functions):
+    summary = aggregate.Summary(name)
+    for function, total in functions.items():
+        summary.functions[function] = aggregate.FunctionStats(function, 2, total, total)
+    return summary
+
+
+SUMMARIES = {
+    "app/2024_01_01": create_summary("app/2024_01_01", {"pandas.merge": 1.0, "main..run": 3.0}),
+    "app/2024_01_02": create_summary("app/2024_01_02", {"pandas.merge": 2.0}),
+    "other/2024_01_03": create_summary("other/2024_01_03", {"pandas.merge_asof": 0.5}),
+}
+
+
+class TestFunctionIndex:
+    def setup_method(self):
+        self.index = search.FunctionIndex()
+
+    def index_all(self, tmp_path):
+        with (
+            patch("microlog.config.S3_ROOT", str(tmp_path)),
+            patch("microlog.config.fs", config.LocalFileSystem()),
+            patch("microlog.aggregate.get_summary", side_effect=SUMMARIES.get) as mock_summary,
+        ):
+            for name in SUMMARIES:
+                (tmp_path / name.split("/")[0]).mkdir(exist_ok=True)
+                self.index.apply("update", name)
+            self.index.flush()
+        return mock_summary
+
+    def test_query_exact_and_substring(self, tmp_path):
+        """Test exact names match exactly, and other queries match substrings."""
+        self.index_all(tmp_path)
+
+        results = self.index.query("pandas.merge")
+        assert [result["recording"] for result in results] == ["app/2024_01_02", "app/2024_01_01"]
+        assert results[0] == {
+            "recording": "app/2024_01_02", "function": "pandas.merge", "total": 2.0, "count": 2
+        }
+        results = self.index.query("MERGE")
+        assert [result["recording"] for result in results] == [
+            "other/2024_01_03", "app/2024_01_02", "app/2024_01_01"
+        ]
+        assert [r["recording"] for r in self.index.query("merge", "other")] == ["other/2024_01_03"]
+        assert len(self.index.query("merge", limit=1)) == 1
+
+    def test_shards_are_persisted(self, tmp_path):
+        """Test a new index reads the stored shards instead of the recordings."""
+        self.index_all(tmp_path)
+        assert (tmp_path / "app" / "index.json").exists()
+
+        index = search.FunctionIndex()
+        with (
+            patch("microlog.config.S3_ROOT", str(tmp_path)),
+            patch("microlog.config.fs", config.LocalFileSystem()),
+            patch("microlog.aggregate.get_summary") as mock_summary,
+        ):
+            index.apply("update", "app/2024_01_01")
+            results = index.query("pandas.merge", "app")
+        mock_summary.assert_not_called()
+        assert len(results) == 2
+
+    def test_remove(self, tmp_path):
+        """Test removed recordings no longer match."""
+        self.index_all(tmp_path)
+        self.index.apply("remove", "app/2024_01_01")
+
+        assert [r["recording"] for r in self.index.query("pandas.merge")] == ["app/2024_01_02"]
+        assert not self.index.query("main..run")
+
+    @patch("microlog.search.MAX_FUNCTIONS_PER_RECORDING", 1)
+    def test_functions_per_recording_are_capped(self, tmp_path):
+        """Test only the functions with the highest total time are indexed."""
+        self.index_all(tmp_path)
+
+        assert self.index.query("main..run")
+        assert not self.index.query("pandas.merge", "app")[1:]
+
+    def test_query_unknown_application(self, tmp_path):
+        """Test a query for an application without a shard does not add it to the index."""
+        self.index_all(tmp_path)
+        with (
+            patch("microlog.config.S3_ROOT", str(tmp_path)),
+            patch("microlog.config.fs", config.LocalFileSystem()),
+        ):
+            assert not self.index.query("pandas.merge", "unknown")
+
+        assert "unknown" not in self.index.shards
+        assert "unknown" not in self.index.applications
+        assert not (tmp_path / "unknown").exists()
@@ -9,11 +9,15 @@
 # pylint: disable=wrong-import-position
 
 from io import BytesIO
+import gzip
+import json
 import sys
 from unittest.mock import MagicMock
 from unittest.mock import mock_open
 from unittest.mock import patch
 
+import pytest
+
 
 # Create a proper mock zstd module and make it available globally
 mock_zstd = MagicMock()
@@ -94,9 +98,10 @@ class TestLogServerHandler:
 class TestServer:
     @patch("microlog.config.HOST", "localhost")
     @patch("microlog.config.PORT", 8080)
-    @patch("microlog.server.HTTPServer")
+    @patch("microlog.server.log_watcher")
+    @patch("microlog.server.ThreadingHTTPServer")
     @patch("microlog.server.info")
-    def test_server_start(self, mock_info, mock_http_server):
+    def test_server_start(self, mock_info, mock_http_server, mock_log_watcher):
         """Test Server.start method."""
         mock_server = MagicMock()
         mock_server.serve_forever.return_value = (
@@ -110,14 +115,16 @@ class TestServer:
         mock_info.assert_called_with(
             "Starting Microlog server... http://localhost:8080"
         )
+        mock_log_watcher.start.assert_called_once()
         mock_http_server.assert_called_once()
         mock_server.serve_forever.assert_called_once()
 
     @patch("microlog.config.HOST", "localhost")
     @patch("microlog.config.PORT", 8080)
-    @patch("microlog.server.HTTPServer")
+    @patch("microlog.server.log_watcher")
+    @patch("microlog.server.ThreadingHTTPServer")
     @patch("microlog.server.info")
-    def test_server_start_os_error(self, mock_info, mock_http_server):
+    def test_server_start_os_error(self, mock_info, mock_http_server, mock_log_watcher):
         """Test Server.start handles OSError."""
         mock_server = MagicMock()
         mock_server.serve_forever.side_effect = OSError("Port already in use")
@@ -279,3 +286,523 @@ class TestGetFullPathMethod:
         # After second replacement: "/microlog/index.html" (no change)
         # After leading slash removal: "microlog/index.html"
         assert result == "microlog/index.html"
+
+
+class TestUploadLog:
+    def setup_method(self):
+        """Set up a handler that streams uploads into a temporary directory."""
+        self.handler = create_log_server()
+        self.handler.wfile = BytesIO()
+        self.handler.send_data = MagicMock()
+        self.handler.send_error = MagicMock()
+
+    def upload(self, tmp_path, path, body, headers):
+        self.handler.path = path
+        self.handler.rfile = BytesIO(body)
+        self.handler.headers = headers
+        with (
+            patch("microlog.config.S3_ROOT", str(tmp_path)),
+            patch("microlog.config.fs", server.config.LocalFileSystem()),
+            patch("microlog.config.SERVER", "http://localhost:8564/"),
+            patch.object(server, "log_watcher") as mock_log_watcher,
+            patch.object(server, "search"),
+        ):
+            self.handler.do_POST()
+        return mock_log_watcher
+
+    def test_upload_content_length(self, tmp_path):
+        """Test uploading a recording with a Content-Length body."""
+        mock_log_watcher = self.upload(
+            tmp_path, "/upload/app/2024_01_01", b"recording", {"Content-Length": "9"}
+        )
+
+        assert (tmp_path / "app" / "2024_01_01.zip").read_bytes() == b"recording"
+        assert not (tmp_path / "app" / "2024_01_01.zip.part").exists()
+        mock_log_watcher.save.assert_called_once_with("app/2024_01_01")
+        self.handler.send_data.assert_called_once_with(
+            "text/plain", b"http://localhost:8564/#app/2024_01_01"
+        )
+
+    def test_upload_chunked(self, tmp_path):
+        """Test uploading a recording with a chunked body."""
+        body = b"4\r\nreco\r\n5;ext=1\r\nrding\r\n0\r\nTrailer: x\r\n\r\n"
+        self.upload(
+            tmp_path, "/upload/app/run%201", body, {"Transfer-Encoding": "chunked"}
+        )
+
+        assert (tmp_path / "app" / "run_1.zip").read_bytes() == b"recording"
+
+    def test_upload_truncated_body(self, tmp_path):
+        """Test a truncated upload leaves no partial file and no catalog entry."""
+        mock_log_watcher = self.upload(
+            tmp_path, "/upload/app/run", b"rec", {"Content-Length": "9"}
+        )
+
+        assert not list((tmp_path / "app").iterdir())
+        mock_log_watcher.save.assert_not_called()
+        assert self.handler.send_error.call_args[0][0] == 400
+
+    def test_upload_rejects_bad_names(self, tmp_path):
+        """Test uploads outside <application>/<name> are rejected."""
+        for path in ["/upload/app", "/upload/../run", "/upload/a/b/c", "/upload/app/"]:
+            self.handler.send_error.reset_mock()
+            mock_log_watcher = self.upload(tmp_path, path, b"", {"Content-Length": "0"})
+            assert self.handler.send_error.call_args[0][0] == 400
+            mock_log_watcher.save.assert_not_called()
+
+
+class TestGetAggregate:
+    def test_get_aggregate(self):
+        """Test the aggregate endpoint serves the top-N report as JSON."""
+        handler = create_log_server()
+        handler.path = "/aggregate/my%20app/run?top=3"
+        handler.send_data = MagicMock()
+        summary = MagicMock()
+        summary.report.return_value = {"calls": 0}
+
+        with patch.object(server.aggregate, "get_summary", return_value=summary) as mock_get:
+            handler.do_GET()
+
+        mock_get.assert_called_once_with("my app/run")
+        summary.report.assert_called_once_with(3)
+        handler.send_data.assert_called_once_with("application/json", b'{"calls": 0}')
+
+
+class TestRecordingNames:
+    @pytest.mark.parametrize("path", [
+        *(
+            f"/{route}/..%2F..%2Fetc/passwd?function=main"
+            for route in ("zip", "aggregate", "tiles", "chunks", "stacks", "sandwich", "regressions", "analysis")
+        ),
+        "/diff?base=..%2F..%2Fetc%2Fpasswd&target=app%2Fnew",
+        "/diff?base=app%2Fold&target=..%2F..%2Fetc%2Fpasswd",
+        "/save/../../etc/passwd",
+        "/delete/../../etc/passwd",
+    ])
+    def test_rejects_paths_outside_root(self, path):
+        """Test recording routes answer 400 for names that escape the storage root."""
+        handler = create_log_server()
+        handler.path = path
+        handler.headers = {}
+        handler.send_error = MagicMock()
+        handler.send_data = MagicMock()
+        with (
+            patch.object(server.config, "fs") as mock_fs,
+            patch.object(server, "log_watcher") as mock_log_watcher,
+            patch.object(server, "forget_recording") as mock_forget,
+        ):
+            handler.do_GET()
+
+        assert handler.send_error.call_args[0][0] == 400
+        handler.send_data.assert_not_called()
+        assert not mock_fs.method_calls
+        assert not mock_log_watcher.method_calls
+        mock_forget.assert_not_called()
+
+
+class TestGetTiles:
+    def test_get_tiles(self):
+        """Test the tiles endpoint parses the time range, width and threads."""
+        handler = create_log_server()
+        handler.path = "/tiles/app/run?start=1.5&end=2.5&width=800&threads=1,2"
+        handler.send_data = MagicMock()
+        pyramid = MagicMock()
+        pyramid.query.return_value = {"blocks": []}
+
+        with patch.object(server.tiles, "get_pyramid", return_value=pyramid) as mock_get:
+            handler.do_GET()
+
+        mock_get.assert_called_once_with("app/run")
+        pyramid.query.assert_called_once_with(1.5, 2.5, 800, {1, 2})
+        handler.send_data.assert_called_once_with("application/json", b'{"blocks": []}')
+
+
+class TestGetStacks:
+    def test_get_stacks(self):
+        """Test the stacks endpoint serves the calls merged by stack path."""
+        handler = create_log_server()
+        handler.path = "/stacks/app/run?min_duration=0.5"
+        handler.send_data = MagicMock()
+        trie = server.stacks.StackTrie()
+
+        with patch.object(server.stacks, "get_trie", return_value=trie) as mock_get:
+            handler.do_GET()
+
+        mock_get.assert_called_once_with("app/run")
+        data = json.loads(handler.send_data.call_args.args[1])
+        assert data == {"name": "", "total": 0.0, "count": 0, "children": []}
+
+    def test_get_sandwich(self):
+        """Test the sandwich endpoint serves the callers and callees of a function."""
+        handler = create_log_server()
+        handler.path = "/sandwich/app/run?function=app..main"
+        handler.send_data = MagicMock()
+        trie = MagicMock()
+        trie.sandwich.return_value = server.stacks.StackNode("app..main"), server.stacks.StackNode("app..main")
+
+        with patch.object(server.stacks, "get_trie", return_value=trie):
+            handler.do_GET()
+
+        trie.sandwich.assert_called_once_with("app..main")
+        data = json.loads(handler.send_data.call_args.args[1])
+        assert data["callers"]["name"] == data["callees"]["name"] == "app..main"
+
+
+class TestGetChunks:
+    def test_get_chunks(self):
+        """Test the chunks endpoint streams a recording as lines of JSON."""
+        handler = create_log_server()
+        handler.path = "/chunks/my%20app/run"
+        handler.send_response = MagicMock()
+        handler.send_header = MagicMock()
+        handler.end_headers = MagicMock()
+        handler.wfile = MagicMock()
+        handler.headers = {"If-None-Match": '"v0"'}
+
+        with (
+            patch.object(server.aggregate, "get_etag", return_value='"v1"'),
+            patch.object(server.aggregate, "read_recording", return_value="recording") as mock_read,
+            patch.object(server.stream, "iter_chunks", return_value=iter(["{}", "[]"])) as mock_iter,
+        ):
+            handler.do_GET()
+
+        mock_read.assert_called_once_with("my app/run")
+        mock_iter.assert_called_once_with("recording")
+        handler.send_header.assert_any_call("Content-type", "application/x-ndjson")
+        handler.send_header.assert_any_call("ETag", '"v1"')
+        assert [c.args[0] for c in handler.wfile.write.call_args_list] == [b"{}\n", b"[]\n"]
+
+    def test_get_chunks_not_modified(self):
+        """Test a recording is not sent again when the client has the current version."""
+        handler = create_log_server()
+        handler.path = "/chunks/app/run"
+        handler.headers = {"If-None-Match": '"v1"'}
+        handler.wfile = MagicMock()
+        handler.send_response = MagicMock()
+        handler.send_header = MagicMock()
+        handler.end_headers = MagicMock()
+
+        with (
+            patch.object(server.aggregate, "get_etag", return_value='"v1"') as mock_etag,
+            patch.object(server.aggregate, "read_recording") as mock_read,
+        ):
+            handler.do_GET()
+
+        mock_etag.assert_called_once_with("app/run")
+        handler.send_response.assert_called_once_with(304)
+        handler.send_header.assert_called_once_with("ETag", '"v1"')
+        mock_read.assert_not_called()
+        handler.wfile.write.assert_not_called()
+
+    def test_get_chunks_gzip(self):
+        """Test the chunks are compressed when the client accepts gzip."""
+        handler = create_log_server()
+        handler.path = "/chunks/app/run"
+        handler.send_response = MagicMock()
+        handler.send_header = MagicMock()
+        handler.end_headers = MagicMock()
+        handler.wfile = BytesIO()
+        handler.wfile.flush = MagicMock()
+        handler.headers = {"Accept-Encoding": "gzip, deflate, br"}
+
+        with (
+            patch.object(server.aggregate, "get_etag", return_value='"v1"'),
+            patch.object(server.aggregate, "read_recording"),
+            patch.object(server.stream, "iter_chunks", return_value=iter(["{}", "[]"])),
+        ):
+            handler.do_GET()
+
+        handler.send_header.assert_any_call("Content-Encoding", "gzip")
+        assert gzip.decompress(handler.wfile.getvalue()) == b"{}\n[]\n"
+
+
+class TestLive:
+    def setup_method(self):
+        """Set up a handler and an empty set of live channels."""
+        self.handler = create_log_server()
+        self.handler.wfile = BytesIO()
+        self.handler.send_data = MagicMock()
+        self.handler.send_error = MagicMock()
+        self.handler.send_response = MagicMock()
+        self.handler.send_header = MagicMock()
+        self.handler.end_headers = MagicMock()
+        server.live_channels.clear()
+
+    def post(self, path, body):
+        self.handler.path = path
+        self.handler.rfile = BytesIO(body)
+        self.handler.headers = {"Content-Length": str(len(body))}
+        self.handler.do_POST()
+
+    def get(self, path, headers=None):
+        self.handler.path = path
+        self.handler.headers = headers or {}
+        self.handler.wfile = BytesIO()
+        with patch.object(server, "log_watcher") as mock_log_watcher:
+            mock_log_watcher.get_recording_names.return_value = []
+            self.handler.do_GET()
+        return self.handler.wfile.getvalue().decode("utf-8")
+
+    def test_live_replays_batches_until_done(self):
+        """Test a dashboard receives published batches followed by done."""
+        self.post("/live/app/run", b'{"calls": [1]}')
+        self.post("/live/app/run", b'{"calls": [2]}')
+        channel = server.live_channels["app/run"]
+        self.post("/live/app/run", b'{"done": true}')
+
+        assert "app/run" not in server.live_channels
+        assert channel.done
+        server.live_channels["app/run"] = channel
+        events = self.get("/live/app/run")
+        assert events == (
+            'id: 1\ndata: {"calls": [1]}\n\n'
+            'id: 2\ndata: {"calls": [2]}\n\n'
+            "event: done\ndata: app/run\n\n"
+        )
+
+    def test_live_resumes_after_last_event_id(self):
+        """Test a reconnecting dashboard only receives what it missed."""
+        self.post("/live/app/run", b'{"calls": [1]}')
+        self.post("/live/app/run", b'{"calls": [2]}')
+        server.live_channels["app/run"].close()
+
+        events = self.get("/live/app/run", {"Last-Event-ID": "1"})
+        assert events == 'id: 2\ndata: {"calls": [2]}\n\nevent: done\ndata: app/run\n\n'
+
+    def test_live_of_saved_recording_is_done(self):
+        """Test following a recording that already finished ends right away."""
+        self.handler.path = "/live/app1/log1"
+        self.handler.headers = {}
+        with patch.object(server, "log_watcher") as mock_log_watcher:
+            mock_log_watcher.get_recording_names.return_value = ["app1/log1"]
+            self.handler.do_GET()
+        assert self.handler.wfile.getvalue() == b"event: done\ndata: app1/log1\n\n"
+        assert not server.live_channels
+
+    def test_live_of_unknown_recording_is_released(self):
+        """Test following a recording that never goes live does not keep its channel."""
+        self.handler.path = "/live/app/never"
+        self.handler.headers = {}
+        self.handler.wfile = MagicMock()
+        self.handler.wfile.write.side_effect = BrokenPipeError  # the dashboard went away
+        with (
+            patch.object(server, "log_watcher") as mock_log_watcher,
+            patch.object(server, "LIVE_KEEPALIVE", 0.01),
+        ):
+            mock_log_watcher.get_recording_names.return_value = []
+            self.handler.do_GET()
+        assert not server.live_channels
+
+    def test_live_rejects_bad_names(self):
+        """Test live batches outside <application>/<name> are rejected."""
+        self.post("/live/../run", b"{}")
+        assert self.handler.send_error.call_args[0][0] == 400
+        assert not server.live_channels
+
+
+class TestSearchFunctions:
+    def test_search_functions(self):
+        """Test the search endpoint forwards its query to the function index."""
+        handler = create_log_server()
+        handler.path = "/search?function=main..f&application=app&limit=5"
+        handler.send_data = MagicMock()
+        with patch.object(server.search.index, "query", return_value=[{"recording": "app/run"}]) as mock_query:
+            handler.do_GET()
+
+        mock_query.assert_called_once_with("main..f", "app", 5)
+        handler.send_data.assert_called_once_with(
+            "application/json", b'[{"recording": "app/run"}]'
+        )
+
+    @pytest.mark.parametrize("application", ["..", "app/run", "..%2F..%2Fetc", "app%5Crun"])
+    def test_search_functions_rejects_paths(self, application):
+        """Test the search endpoint only accepts application names."""
+        handler = create_log_server()
+        handler.path = f"/search?function=main..f&application={application}"
+        handler.send_error = MagicMock()
+        with patch.object(server.search.index, "query") as mock_query:
+            handler.do_GET()
+
+        mock_query.assert_not_called()
+        assert handler.send_error.call_args[0][0] == 400
+
+
+class TestGetRegressions:
+    def test_get_regressions(self):
+        """Test the regressions endpoint serves the report of a recording."""
+        handler = create_log_server()
+        handler.path = "/regressions/app/run"
+        handler.send_data = MagicMock()
+        report = server.regression.Report("app/run", ["app/old"], [])
+        with patch.object(server.regression, "get_report", return_value=report) as mock_report:
+            handler.do_GET()
+
+        mock_report.assert_called_once_with("app/run")
+        assert b'"baseline": ["app/old"]' in handler.send_data.call_args[0][1]
+
+
+class TestGetDiff:
+    def test_get_diff(self):
+        """Test the diff endpoint compares the recordings in its query."""
+        handler = create_log_server()
+        handler.path = "/diff?base=app%2Fold&target=app%2Fnew"
+        handler.send_data = MagicMock()
+        with patch.object(
+            server.diff, "compare_recordings", return_value=server.diff.DiffNode("", 1.0, 2.0)
+        ) as mock_compare:
+            handler.do_GET()
+
+        mock_compare.assert_called_once_with("app/old", "app/new", server.diff.MIN_DURATION)
+        handler.send_data.assert_called_once_with(
+            "application/json", b'{"name": "", "base": 1.0, "target": 2.0, "children": []}'
+        )
+
+
+class TestAnalysisJobs:
+    def test_submit_and_poll_analysis(self):
+        """Test an analysis is queued as a job that can be polled by id."""
+        handler = create_log_server()
+        prompt = b"app/run\nmy trace"
+        handler.path = "/analysis/"
+        handler.headers = {"Content-Length": str(len(prompt))}
+        handler.rfile = BytesIO(prompt)
+        handler.send_data = MagicMock()
+        queue = server.jobs.JobQueue(lambda argument: "done")
+        with patch.object(server, "analysis_jobs", queue):
+            with patch.object(queue, "todo"):
+                handler.do_POST()
+                job = json.loads(handler.send_data.call_args[0][1])
+                assert job["status"] == "queued"
+
+                handler.path = f"/job/{job['id']}"
+                handler.do_GET()
+                assert json.loads(handler.send_data.call_args[0][1])["id"] == job["id"]
+
+                handler.send_error = MagicMock()
+                handler.path = "/job/unknown"
+                handler.do_GET()
+                assert handler.send_error.call_args[0][0] == 404
+
+    def test_submit_analysis_rejects_paths(self):
+        """Test an analysis of a recording outside of the storage root is not queued."""
+        handler = create_log_server()
+        prompt = b"../../somewhere/x\nmy trace"
+        handler.path = "/analysis/"
+        handler.headers = {"Content-Length": str(len(prompt))}
+        handler.rfile = BytesIO(prompt)
+        handler.send_error = MagicMock()
+        with patch.object(server, "analysis_jobs") as mock_jobs:
+            handler.do_POST()
+
+        mock_jobs.submit.assert_not_called()
+        assert handler.send_error.call_args[0][0] == 400
+
+
+class TestRetention:
+    def test_bulk_delete(self):
+        """Test a JSON list of recordings is validated and deleted in the background."""
+        handler = create_log_server()
+        body = b'["app/old", "app/older"]'
+        handler.path = "/delete/"
+        handler.headers = {"Content-Length": str(len(body))}
+        handler.rfile = BytesIO(body)
+        handler.send_data = MagicMock()
+        with patch.object(server, "retention_engine") as mock_engine:
+            mock_engine.progress.to_dict.return_value = {"running": True}
+            handler.do_POST()
+
+        mock_engine.delete.assert_called_once_with(["app/old", "app/older"])
+        handler.send_data.assert_called_once_with("application/json", b'{"running": true}')
+
+    def test_bulk_delete_rejects_paths(self):
+        """Test names outside of the storage root are rejected."""
+        handler = create_log_server()
+        body = b'["../etc/passwd"]'
+        handler.path = "/delete/"
+        handler.headers = {"Content-Length": str(len(body))}
+        handler.rfile = BytesIO(body)
+        handler.send_error = MagicMock()
+        with patch.object(server, "retention_engine") as mock_engine:
+            handler.do_POST()
+
+        mock_engine.delete.assert_not_called()
+        assert handler.send_error.call_args[0][0] == 400
+
+
+class TestMetrics:
+    def test_get_metrics(self):
+        """Test the metrics endpoint serves the Prometheus text format and times requests."""
+        handler = create_log_server()
+        handler.path = "/metrics"
+        handler.send_data = MagicMock()
+        count = server.metrics.request_seconds.get_count("/metrics", "GET")
+
+        handler.do_GET()
+
+        content_type, body = handler.send_data.call_args[0]
+        assert content_type.startswith("text/plain")
+        assert b"# TYPE microlog_request_seconds histogram" in body
+        assert server.metrics.request_seconds.get_count("/metrics", "GET") == count + 1
+
+
+class TestLogWatcher:
+    @pytest.fixture(autouse=True)
+    def storage(self, tmp_path):
+        with (
+            patch("microlog.config.S3_ROOT", str(tmp_path)),
+            patch("microlog.config.fs", server.config.LocalFileSystem()),
+            patch.object(server, "search") as mock_search,
+        ):
+            for application in ["app1", "app2"]:
+                (tmp_path / application).mkdir()
+                (tmp_path / application / "2024_01_01.zip").write_bytes(b"")
+            (tmp_path / "retention.json").write_text("{}")
+            self.search = mock_search
+            yield tmp_path
+
+    def test_scan_is_not_done_on_import(self):
+        """Test a new LogWatcher does not scan until it is started."""
+        watcher = server.LogWatcher()
+
+        assert watcher.get_recording_names() == []
+
+    def test_load_logs(self):
+        """Test all applications are listed."""
+        watcher = server.LogWatcher()
+        watcher.load_logs()
+
+        assert sorted(watcher.get_recording_names()) == ["app1/2024_01_01", "app2/2024_01_01"]
+        assert not watcher.is_scanning()
+
+    def test_refresh_lists_only_changed_applications(self, storage):
+        """Test a refresh picks up new and changed applications, and skips the others."""
+        watcher = server.LogWatcher()
+        watcher.load_logs()
+        (storage / "app1" / "2024_01_02.zip").write_bytes(b"")
+        (storage / "app2" / "2024_01_02.zip").write_bytes(b"")
+        (storage / "app3").mkdir()
+        (storage / "app3" / "2024_01_01.zip").write_bytes(b"")
+        watcher.save("app2/2024_01_03")
+
+        with patch.object(watcher, "list_application", wraps=watcher.list_application) as mock_list:
+            watcher.refresh()
+
+        assert sorted(call.args[0] for call in mock_list.call_args_list) == ["app2", "app3"]
+        assert sorted(watcher.get_recording_names()) == [
+            "app1/2024_01_01", "app2/2024_01_01", "app2/2024_01_02", "app3/2024_01_01"
+        ]
+        self.search.index.update.assert_called_once()
+
+    def test_listing_reports_scanning(self):
+        """Test the listing endpoint tells the dashboard when the scan is still running."""
+        handler = create_log_server()
+        handler.path = "/logs?filter="
+        handler.send_data = MagicMock()
+        with patch.object(server, "log_watcher") as mock_log_watcher:
+            mock_log_watcher.get_recording_names.return_value = ["app1/2024_01_01"]
+            mock_log_watcher.is_scanning.return_value = True
+            handler.do_GET()
+
+        handler.send_data.assert_called_once_with(
+            "text/html", b"app1/2024_01_01", {"X-Microlog-Scanning": "true"}
+        )
@@ -0,0 +1,219 @@
+"""Tests for live streaming of in-progress recordings"""
+
+# pylint: disable=missing-class-docstring
+# pylint: disable=missing-function-docstring
+
+import json
+import queue
+from unittest.mock import patch
+
+from microlog import stream
+from microlog.models import Call
+from microlog.models import CallSite
+from microlog.models import Marker
+from microlog.models import Recording
+from microlog.models import Stack
+from microlog.models import Status
+
+
+def create_recording(call_count: int = 3) -> Recording:
+    recording = Recording()
+    main = CallSite("main.py", 1, "main..run")
+    for n in range(call_count):
+        recording.calls.append(Call(n, 1, CallSite("main.py", 10, f"main..f{n}"), main, 1, 0.5))
+    recording.markers.append(
+        Marker(3, 1.0, "hello", Stack(1.0, call_sites=[main]), 0.1)
+    )
+    recording.statuses.append(Status(0.5, 10, 20, 1000, 2000, 500, 30, 40))
+    return recording
+
+
+def create_streamer(recording: Recording) -> stream.LiveStreamer:
+    with patch.object(stream.LiveStreamer, "start"):
+        return stream.LiveStreamer(recording, "app/run 1")
+
+
+class TestBatch:
+    def test_round_trip(self):
+        """Test a batch survives JSON encoding and decoding."""
+        recording = create_recording()
+        batch = json.loads(json.dumps(
+            stream.encode_batch(recording.calls, recording.markers, recording.statuses)
+        ))
+
+        calls, markers, statuses = stream.decode_batch(batch)
+
+        assert [call.call_site.name for call in calls] == ["main..f0", "main..f1", "main..f2"]
+        assert calls[1].when == 1 and calls[1].duration == 0.5 and calls[1].depth == 1
+        assert calls[0].caller_site is calls[1].caller_site
+        assert markers[0].message == "hello"
+        assert [call_site.name for call_site in markers[0].stack] == ["main..run"]
+        assert statuses[0].memory == 1000 and statuses[0].object_count == 40
+
+
+class TestChunks:
+    def test_chunks_are_time_ordered(self):
+        """Test a recording is split into batches of calls, each with the markers and statuses up to it."""
+        recording = create_recording(5)
+        recording.calls.reverse()
+
+        lines = list(stream.iter_chunks(recording, size=2))
+
+        header = json.loads(lines[0])
+        assert header["calls"] == 5 and header["markers"] == 1 and header["statuses"] == 1
+        sites = []
+        batches = [stream.decode_batch(json.loads(line), sites) for line in lines[1:]]
+        assert [[call.when for call in calls] for calls, _, _ in batches] == [[0, 1], [2, 3], [4]]
+        assert [len(markers) for _, markers, _ in batches] == [1, 0, 0]
+        assert [len(statuses) for _, _, statuses in batches] == [1, 0, 0]
+
+    def test_empty_recording(self):
+        """Test an empty recording has a header and one empty batch."""
+        lines = list(stream.iter_chunks(Recording()))
+        assert json.loads(lines[0])["calls"] == 0
+        assert json.loads(lines[1]) == {"calls": [], "markers": [], "statuses": [], "sites": []}
+
+    def test_call_sites_are_sent_once(self):
+        """Test each call site is sent in the first batch that uses it and referred to by index after that."""
+        lines = [json.loads(line) for line in stream.iter_chunks(create_recording(4), size=2)]
+
+        assert [site[2] for batch in lines[1:] for site in batch["sites"]] == [
+            "main..f0", "main..run", "main..f1", "main..f2", "main..f3",
+        ]
+        assert lines[2]["calls"][0][2:4] == [3, 1]
+        sites = []
+        calls = [call for batch in lines[1:] for call in stream.decode_batch(batch, sites)[0]]
+        assert [call.call_site.name for call in calls] == ["main..f0", "main..f1", "main..f2", "main..f3"]
+        assert calls[0].caller_site is calls[-1].caller_site
+
+    def test_reader_handles_any_piece_size(self):
+        """Test the reader decodes the same batches however the response is split."""
+        data = "".join(
+            f"{line}\n" for line in stream.iter_chunks(create_recording(5), size=2)
+        ).encode("utf-8")
+        for piece_size in (1, 7, len(data)):
+            reader = stream.ChunkReader()
+            batches = []
+            for start in range(0, len(data), piece_size):
+                batches.extend(reader.feed(data[start:start + piece_size]))
+            assert reader.header["calls"] == 5
+            assert [len(calls) for calls, _, _ in batches] == [2, 2, 1]
+            assert reader.get_progress() == 1.0
+
+    def test_reader_progress(self):
+        """Test the progress is the fraction of the calls received."""
+        lines = list(stream.iter_chunks(create_recording(4), size=1))
+        reader = stream.ChunkReader()
+        assert reader.get_progress() == 0.0
+        reader.feed("\n".join(lines[:2]).encode("utf-8") + b"\n")
+        assert reader.get_progress() == 0.25
+
+
+class TestLiveStreamer:
+    def test_push_sends_only_new_items(self):
+        """Test consecutive pushes only send what was added in between."""
+        recording = create_recording(2)
+        streamer = create_streamer(recording)
+        assert streamer.url.endswith("/live/app/run_1")
+
+        with patch.object(streamer, "post", return_value=True) as mock_post:
+            streamer.push()
+            recording.calls.append(recording.calls[0])
+            streamer.push()
+            streamer.push()
+
+        assert mock_post.call_count == 2
+        second = mock_post.call_args_list[1][0][0]
+        assert len(second["calls"]) == 1
+        assert not second["markers"] and not second["statuses"]
+
+    def test_push_backs_off_and_retries(self):
+        """Test a failed push is retried later with a longer delay."""
+        streamer = create_streamer(create_recording())
+
+        with patch.object(streamer, "post", return_value=False):
+            assert not streamer.push()
+            assert not streamer.push()
+        assert streamer.delay == stream.config.LIVE_DELAY * 4
+        assert streamer.cursors["calls"] == 0
+
+        with patch.object(streamer, "post", return_value=True):
+            assert streamer.push()
+        assert streamer.delay == stream.config.LIVE_DELAY
+        assert streamer.cursors["calls"] == 3
+
+    @patch("microlog.config.LIVE_MAX_BATCH", 2)
+    @patch("microlog.config.LIVE_MAX_BACKLOG", 4)
+    def test_batches_are_bounded(self):
+        """Test batches are capped and a large backlog is skipped."""
+        recording = create_recording(3)
+        streamer = create_streamer(recording)
+
+        batch, cursors = streamer.next_batch()
+        assert len(batch["calls"]) == 2 and cursors["calls"] == 2
+
+        recording.calls.extend(recording.calls * 3)
+        batch, cursors = streamer.next_batch()
+        assert len(batch["calls"]) == 2 and cursors["calls"] == 12
+        assert streamer.skipped == 10
+
+
+class TestLiveChannel:
+    def drain(self, subscriber):
+        items = []
+        while not subscriber.empty():
+            items.append(subscriber.get_nowait())
+        return items
+
+    def test_subscribers_receive_history_and_new_batches(self):
+        """Test late subscribers catch up from the history."""
+        channel = stream.LiveChannel("app/run")
+        channel.publish("a")
+        subscriber = channel.subscribe()
+        channel.publish("b")
+        channel.close()
+
+        assert self.drain(subscriber) == [(1, "a"), (2, "b"), (2, channel.DONE)]
+
+    @patch("microlog.config.LIVE_SUBSCRIBER_QUEUE", 2)
+    def test_slow_subscriber_is_disconnected(self):
+        """Test a subscriber that falls behind gets an overflow and is dropped."""
+        channel = stream.LiveChannel("app/run")
+        subscriber = channel.subscribe()
+        for message in "abc":
+            channel.publish(message)
+
+        assert self.drain(subscriber) == [(3, channel.OVERFLOW)]
+        assert not channel.subscribers
+        assert self.drain(channel.subscribe(last_sequence=2)) == [(3, "c")]
+
+    @patch("microlog.config.LIVE_SUBSCRIBER_QUEUE", 3)
+    def test_late_subscriber_receives_newest_history(self):
+        """Test a late subscriber receives the newest batches that fit, followed by done."""
+        channel = stream.LiveChannel("app/run")
+        for message in "abcde":
+            channel.publish(message)
+        channel.close()
+
+        assert self.drain(channel.subscribe()) == [(4, "d"), (5, "e"), (5, channel.DONE)]
+
+    @patch("microlog.config.LIVE_SUBSCRIBER_QUEUE", 2)
+    def test_overflow_after_disconnect(self):
+        """Test a subscriber that overflows again after being dropped does not fail."""
+        channel = stream.LiveChannel("app/run")
+        subscriber = channel.subscribe()
+        for message in "abc":
+            channel.publish(message)
+        channel.put(subscriber, (4, "d"))
+        channel.put(subscriber, (5, "e"))
+
+        assert self.drain(subscriber) == [(3, channel.OVERFLOW)]
+
+    def test_unsubscribe(self):
+        """Test unsubscribed queues no longer receive batches."""
+        channel = stream.LiveChannel("app/run")
+        subscriber = channel.subscribe()
+        channel.unsubscribe(subscriber)
+        channel.publish("a")
+
+        assert isinstance(subscriber, queue.Queue) and subscriber.empty()
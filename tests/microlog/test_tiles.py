@@ -0,0 +1,149 @@
+"""Tests for microlog.tiles."""
+
+from unittest.mock import patch
+
+from microlog import tiles
+from microlog.models import Call
+from microlog.models import CallSite
+from microlog.models import Recording
+
+
+MAIN = CallSite("main.py", 1, "app..main")
+TICK = CallSite("tick.py", 2, "app..tick")
+TOCK = CallSite("tock.py", 3, "app..tock")
+
+
+def create_calls():
+    """Create one long call with 100 short calls below it, and a second thread."""
+    calls = [Call(0.0, 1, MAIN, MAIN, 0, 10.0)]
+    for n in range(100):
+        call_site = TICK if n < 50 else TOCK
+        calls.append(Call(n * 0.1, 1, call_site, MAIN, 1, 0.05))
+    calls.append(Call(2.0, 2, MAIN, MAIN, 0, 1.0))
+    return calls
+
+
+class TestMerge:
+    """Tests for merging sub-pixel blocks."""
+
+    def test_wide_blocks_are_kept(self):
+        """Test blocks wider than a pixel are not merged."""
+        blocks = [tiles.Block.from_call(call) for call in create_calls()]
+        assert len(tiles.merge(blocks, 0.01)) == len(blocks)
+
+    def test_sub_pixel_blocks_are_merged_per_row(self):
+        """Test adjacent sub-pixel blocks in the same row are merged."""
+        blocks = sorted(
+            (tiles.Block.from_call(call) for call in create_calls()),
+            key=lambda block: block.when,
+        )
+        merged = tiles.merge(blocks, 0.1)
+        depth1 = [block for block in merged if block.depth == 1]
+        assert len(depth1) == 1
+        assert depth1[0].count == 100
+        assert depth1[0].name == ""
+        assert round(depth1[0].duration, 3) == 9.95
+        assert len(merged) == 3
+
+    def test_merged_block_keeps_common_name(self):
+        """Test a merged run of the same function keeps its name."""
+        blocks = [tiles.Block(n * 0.01, 0.005, 1, 0, "app..tick") for n in range(10)]
+        merged = tiles.merge(blocks, 0.01)
+        assert [(block.name, block.count) for block in merged] == [("app..tick", 10)]
+
+
+class TestLevel:
+    """Tests for querying the blocks of one level."""
+
+    def test_query_rows(self):
+        """Test a long block is found without scanning the rows of short blocks."""
+        blocks = [tiles.Block(0.0, 100.0, 1, 0, "app..main")]
+        blocks.extend(tiles.Block(n, 0.5, 1, 1, "app..tick") for n in range(100))
+        level = tiles.Level(tiles.BASE_RESOLUTION)
+        for block in blocks:
+            level.add(block)
+        assert [len(row) for row in level.rows.values()] == [1, 100]
+        assert [(block.name, block.when) for block in level.query(50.2, 50.4)] == [("app..main", 0.0), ("app..tick", 50)]
+        assert [block.when for block in level.query(10.6, 11.0)] == [0.0, 11]
+        assert level.query(101.0, 102.0) == []
+
+
+class TestPyramid:
+    """Tests for querying the pyramid."""
+
+    def setup_method(self):
+        """Build a pyramid for the test calls."""
+        self.pyramid = tiles.Pyramid(create_calls())
+
+    def test_levels(self):
+        """Test each level is coarser and has no more blocks than the one below."""
+        levels = self.pyramid.levels
+        assert levels[0].resolution == tiles.BASE_RESOLUTION
+        for finer, coarser in zip(levels, levels[1:]):
+            assert coarser.resolution == finer.resolution * 2
+            assert len(coarser.blocks) <= len(finer.blocks)
+
+    def test_query_zoomed_in(self):
+        """Test a zoomed in query returns individual calls in the time range."""
+        result = self.pyramid.query(1.0, 1.2, 1000, {1})
+        assert result["resolution"] == tiles.BASE_RESOLUTION
+        assert result["threads"] == [1, 2]
+        assert [block[0] for block in result["blocks"]] == [0.0, 1.0, 1.1, 1.2]
+        assert all(block[5] == 1 for block in result["blocks"])
+
+    def test_query_zoomed_out(self):
+        """Test a zoomed out query merges sub-pixel calls."""
+        result = self.pyramid.query(0.0, 10.0, 50)
+        assert result["resolution"] <= 0.2
+        rows = {(block[2], block[3]): block for block in result["blocks"]}
+        assert len(result["blocks"]) == 3
+        assert rows[(1, 1)][5] == 100
+        assert rows[(2, 0)][4] == "app..main"
+
+    def test_query_threads(self):
+        """Test a query can be limited to a set of threads."""
+        result = self.pyramid.query(0.0, 10.0, 50, {2})
+        assert [block[2] for block in result["blocks"]] == [2]
+
+    def test_extend(self):
+        """Test calls added in batches in order of start time are all found at every level."""
+        calls = sorted(create_calls(), key=lambda call: call.when)
+        pyramid = tiles.Pyramid()
+        for start in range(0, len(calls), 10):
+            assert pyramid.extend(calls[start:start + 10])
+
+        assert pyramid.threads == [1, 2]
+        for level in pyramid.levels:
+            blocks = level.query(0.0, 10.0)
+            assert sum(block.count for block in blocks) == len(calls)
+        result = pyramid.query(0.0, 10.0, 50)
+        rows = {(block[2], block[3]): block for block in result["blocks"]}
+        assert rows[(1, 1)][5] == 100
+        assert rows[(2, 0)][4] == "app..main"
+
+    def test_extend_out_of_order(self):
+        """Test calls that start before the calls added earlier are refused."""
+        pyramid = tiles.Pyramid()
+        assert pyramid.extend([Call(5.0, 1, MAIN, MAIN, 0, 1.0)])
+        assert not pyramid.extend([Call(4.0, 1, TICK, MAIN, 1, 1.0)])
+        assert sum(block.count for block in pyramid.levels[0].query(0.0, 10.0)) == 1
+
+    def test_empty(self):
+        """Test a pyramid for a recording without calls."""
+        assert tiles.Pyramid([]).query(0, 1, 100)["blocks"] == []
+
+
+class TestGetPyramid:
+    """Tests for caching pyramids."""
+
+    def test_cache(self):
+        """Test a pyramid is built once and can be forgotten."""
+        tiles._cache.clear()  # pylint: disable=protected-access
+        recording = Recording()
+        recording.calls = create_calls()
+        with patch.object(tiles.aggregate, "read_recording", return_value=recording) as mock_read:
+            pyramid = tiles.get_pyramid("app/run")
+            assert tiles.get_pyramid("app/run") is pyramid
+            tiles.forget("app/run")
+            assert tiles.get_pyramid("app/run") is not pyramid
+        assert mock_read.call_count == 2